@@ -1,6 +1,23 @@
 """Export pyfooda ingredients to MealPlanner CSV files."""
 
-import pyfooda as pf
+import pandas as pd
+
+META_COLS = ["foodName", "display_name", "food_category", "portion_unit_name",
+             "portion_gram_weight", "source_count"]
+NUTRIENT_COLS = ["nutrient_id", "nutrientName", "unit_name", "nutrient_category", "drv",
+                 "nutrient_order"]
+
+# Canonical nutrient -> source columns, highest priority first. A later source
+# only fills foods that every earlier source lacks; it is not exported itself.
+NUTRIENT_SOURCES = {
+    "Fiber": ["Fiber", "Fiber (AOAC 2011.25)"],
+    "Total Sugars": ["Total Sugars", "Sugars, Total"],
+    "Vitamin A, RAE": ["Vitamin A, RAE", "Vitamin A"],
+}
+# pyfooda unit codes -> display units. pyfooda keys values by nutrient name, so
+# when a name has several DRV rows (Energy in KCAL and kJ, Vitamin E in MG and
+# MG_ATE) the row whose unit is listed first here describes the exported column.
+UNITS = {"KCAL": "kcal", "G": "g", "MG": "mg", "UG": "µg", "MG_ATE": "mg", "kJ": "kJ"}
 
 MEAT = {
     "beef", "pork", "chicken", "lamb", "duck", "turkey", "bacon", "prosciutto",
@@ -60,7 +77,41 @@ def categorize(ingredient_id: str) -> str:
     return "Other"
 
 
+def canonical_nutrients(nutrients_df: pd.DataFrame) -> pd.DataFrame:
+    """One DRV row per nutrient name, in DRV order, with normalized units."""
+    merged = {src for sources in NUTRIENT_SOURCES.values() for src in sources[1:]}
+    rank = {unit: i for i, unit in enumerate(UNITS)}
+    rows = nutrients_df[~nutrients_df["nutrientName"].isin(merged)].sort_values("nutrient_order")
+    chosen: dict[str, dict] = {}
+    for row in rows.to_dict("records"):
+        current = chosen.get(row["nutrientName"])
+        if current is None:
+            chosen[row["nutrientName"]] = row
+        elif rank.get(row["unit_name"], len(rank)) < rank.get(current["unit_name"], len(rank)):
+            chosen[row["nutrientName"]] = {**row, "nutrient_order": current["nutrient_order"]}
+    out = pd.DataFrame(list(chosen.values()))
+    out["unit_name"] = out["unit_name"].map(lambda unit: UNITS.get(unit, unit))
+    out["nutrient_order"] = range(len(out))
+    return out[NUTRIENT_COLS]
+
+
+def canonical_foods(foods_df: pd.DataFrame, nutrients: pd.DataFrame) -> pd.DataFrame:
+    """Merge duplicate nutrient sources and keep one column per canonical nutrient."""
+    out = foods_df.loc[:, ~foods_df.columns.duplicated()].copy()
+    for name, sources in NUTRIENT_SOURCES.items():
+        present = [src for src in sources if src in out.columns]
+        if present:
+            merged = out[present[0]]
+            for src in present[1:]:
+                merged = merged.fillna(out[src])
+            out[name] = merged
+    names = [n for n in nutrients["nutrientName"] if n in out.columns]
+    return out[META_COLS + names]
+
+
 def export():
+    import pyfooda as pf
+
     ingredients_df = pf.get_ingredients_df()
     nutrients_df = pf.get_drv_df()
 
@@ -74,14 +125,13 @@ def export():
     out = ingredients_df.rename(columns={"ingredient_id": "foodName"})
     out["foodName"] = out["foodName"].astype(str)
 
-    nutrient_cols = nutrients_df["nutrientName"].tolist()
-    meta_cols = ["foodName", "display_name", "food_category", "portion_unit_name",
-                 "portion_gram_weight", "source_count"]
-    out = out[meta_cols + [c for c in nutrient_cols if c in out.columns]]
+    nutrients = canonical_nutrients(nutrients_df)
+    out = canonical_foods(out, nutrients)
+    nutrients = nutrients[nutrients["nutrientName"].isin(out.columns)]
 
     out.to_csv("fooddata.csv", index=False)
-    nutrients_df.to_csv("nutrients.csv", index=False)
-    print(f"Exported {len(out)} ingredients")
+    nutrients.to_csv("nutrients.csv", index=False)
+    print(f"Exported {len(out)} ingredients, {len(nutrients)} nutrients")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Benchmark the build on synthetic corpora and check for regressions.
+
+    python scripts/bench.py                            # 10x and 100x today's corpus
+    python scripts/bench.py --scales 10,100,1000 --save-baseline
+    python scripts/bench.py --scales 10,100,1000 --check --threshold 1.5
+
+Each scale generates ``scale * 26`` meals in the ``{day}_{meal}_{version}.md``
+layout from real ``fooddata.csv`` ids in a temporary tree, then runs
+:func:`build.build_sites` on it, without the build cache, in a fresh process
+(so peak RSS is per scale) and reports the spans :data:`profiling.TRACER`
+recorded, under the same stage names as ``build.py --profile``. Results are
+compared with the stored baseline; a stage slower than ``threshold`` times
+its baseline (plus a small absolute slack) fails the run. A missing baseline
+(or scale) is a warning, and an error with ``--check``.
+
+Meals reference no images unless ``--images`` says so: encoding AVIF/WebP
+derivatives costs about a second per image on one core and would swamp the
+stages that scale with the corpus.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import build
+from profiling import TRACER, peak_rss_mb
+
+BASE_MEALS = 26
+DEFAULT_BASELINE = build.ROOT / "scripts" / "bench_baseline.json"
+# Single runs jitter by tens of ms (GC, page cache); short stages need absolute headroom.
+SLACK_MS = 100.0
+SENTENCES = [
+    "Sear the {ing} until golden, then fold through the pan juices.",
+    "Whisk together with {ing} and season to taste.",
+    "Simmer gently with {ing} for a few minutes before serving.",
+    "Scatter {ing} over the top and finish with a squeeze of lemon.",
+]
+
+
+def generate_corpus(root: Path, meals: int, ingredients: int, images: int, seed: int = 0) -> None:
+    """Write a synthetic project tree (meals, images, data, src) under ``root``."""
+    rng = random.Random(seed)
+    src = build.ROOT
+    shutil.copytree(src / "src", root / "src")
+    shutil.copy2(src / "index.css", root / "index.css")
+    (root / "data").mkdir()
+    for name in ("fooddata.csv", "nutrients.csv", "fooddata.npy", "fooddata.filled.npy", "fooddata.meta.json"):
+        if (src / "data" / name).exists():
+            shutil.copy2(src / "data" / name, root / "data" / name)
+
+    foods, _ = build.load_food_db()
+    ids = foods.food_ids
+    meals_dir = root / "meals"
+    (meals_dir / "images").mkdir(parents=True)
+    real_images = sorted((src / "meals" / "images").glob("*.jpg"))
+
+    for i in range(meals):
+        day = build.DAYS[i % len(build.DAYS)]
+        meal = build.MEALS[(i // len(build.DAYS)) % len(build.MEALS)]
+        version = i // (len(build.DAYS) * len(build.MEALS)) + 1
+        stem = f"{day}_{meal}_{version}"
+        tokens = [f"{{{rng.randint(5, 250)}g {{{rng.choice(ids)}}}}}" for _ in range(ingredients)]
+        sentences = [rng.choice(SENTENCES).format(ing=t) for t in tokens]
+        paragraphs = [" ".join(sentences[j:j + 3]) for j in range(0, len(sentences), 3)]
+        (meals_dir / f"{stem}.md").write_text(
+            f"# Synthetic meal {i + 1}\n<!-- quick:{rng.randint(5, 45)} -->\n\n"
+            f"![Synthetic meal {i + 1}](images/{stem}.jpg)\n\n" + "\n\n".join(paragraphs) + "\n"
+        )
+        if i < images and real_images:
+            shutil.copyfile(real_images[i % len(real_images)], meals_dir / "images" / f"{stem}.jpg")
+
+
+def run_build(root: Path, jobs: int = 1) -> dict:
+    """Build the tree at ``root`` once under the tracer; returns ms per stage.
+
+    Spans of the same stage (per variant, per recipe) are summed. ``depths``
+    keeps each stage's nesting for the report.
+    """
+    build.use_root(root)
+    TRACER.configure(enabled=True)
+    with TRACER.stage("build"):
+        page = build.build_sites({"": {}}, use_cache=False, jobs=jobs)[0]
+    stages: dict[str, float] = {}
+    depths: dict[str, int] = {}
+    for span in sorted(TRACER.spans, key=lambda s: s["start"]):
+        stages[span["name"]] = stages.get(span["name"], 0.0) + span["wall"] * 1000
+        depths.setdefault(span["name"], span["depth"])
+    return {
+        "stages": stages,
+        "depths": depths,
+        "total_ms": stages.pop("build"),
+        "peak_rss_mb": peak_rss_mb(),
+        "html_kb": page.stat().st_size // 1024,
+    }
+
+
+def bench_scale(scale: int, ingredients: int, images: int, jobs: int) -> dict:
+    meals = scale * BASE_MEALS
+    with tempfile.TemporaryDirectory(prefix="mealplanner-bench-") as tmp:
+        root = Path(tmp)
+        generate_corpus(root, meals, ingredients, images)
+        out = subprocess.run(
+            [sys.executable, __file__, "--run", str(root), "--jobs", str(jobs)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["meals"] = meals
+    return result
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    failures = []
+    for scale, result in results.items():
+        base = baseline.get(scale)
+        if not base:
+            continue
+        for stage, ms in result["stages"].items():
+            limit = base["stages"].get(stage, ms) * threshold + SLACK_MS
+            if ms > limit:
+                failures.append(f"{scale}: {stage} {ms:.1f} ms > {limit:.1f} ms")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * threshold:
+            failures.append(
+                f"{scale}: peak RSS {result['peak_rss_mb']:.0f} MB > "
+                f"{base['peak_rss_mb'] * threshold:.0f} MB"
+            )
+    return failures
+
+
+def print_table(results: dict) -> None:
+    header = f"{'stage':<22}" + "".join(f"{scale:>12}" for scale in results)
+    print(header)
+    print("-" * len(header))
+    depths: dict[str, int] = {}
+    for result in results.values():
+        for stage in result["stages"]:
+            depths.setdefault(stage, result["depths"][stage] - 1)
+    for stage, depth in depths.items():
+        row = [r["stages"].get(stage) for r in results.values()]
+        print(f"{'  ' * depth + stage:<22}" + "".join(f"{ms:>10.1f}ms" if ms is not None else f"{'-':>12}"
+                                                      for ms in row))
+    print(f"{'total':<22}" + "".join(f"{r['total_ms']:>10.1f}ms" for r in results.values()))
+    print(f"{'peak_rss':<22}" + "".join(f"{r['peak_rss_mb']:>10.0f}MB" for r in results.values()))
+    print(f"{'index.html':<22}" + "".join(f"{r['html_kb']:>10}KB" for r in results.values()))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10,100",
+                        help=f"comma-separated multiples of today's {BASE_MEALS} meals (default: 10,100)")
+    parser.add_argument("--ingredients", type=int, default=8, help="ingredients per meal (default: 8)")
+    parser.add_argument("--images", type=int, default=0,
+                        help="number of meal images, each encoded to every derivative (default: 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="meal ingestion workers (default: 1)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against / save to")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="fail when a stage exceeds baseline x threshold (default: 1.5)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="fail when the baseline has no results for a benchmarked scale")
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    parser.add_argument("--run", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(run_build(args.run, args.jobs)))
+        return 0
+
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        print(f"Benchmarking {scale}x ({scale * BASE_MEALS} meals)...", file=sys.stderr)
+        results[f"{scale}x"] = bench_scale(scale, args.ingredients, args.images, args.jobs)
+    print_table(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    missing = [scale for scale in results if scale not in baseline]
+    if missing:
+        level = "ERROR" if args.check else "WARNING"
+        print(f"{level}: no baseline for {', '.join(missing)} in {args.baseline} "
+              f"(record one with --save-baseline)", file=sys.stderr)
+        if args.check:
+            return 2
+    failures = compare(results, baseline, args.threshold)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    if failures:
+        return 1
+    if len(missing) < len(results):
+        print(f"No regressions against {args.baseline} (threshold {args.threshold}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
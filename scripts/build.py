@@ -3,28 +3,60 @@
 
 from __future__ import annotations
 
+import argparse
 import json
-import re
+import os
 import shutil
 import subprocess
 import sys
+import tempfile
 from datetime import datetime
 from pathlib import Path
-
-import pandas as pd
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from buildcache import BuildCache, combine, hash_file
+from images import (
+    LINK_MODES, MIME, SIZES, available_formats, build_derivatives, sync_files, tree_files,
+)
+from minify import (
+    markup_names, minify_css, minify_js, precompress, remove_compressed, remove_stale_compressed, script_names,
+)
+from profiling import TRACER
+from recipe import parse_recipe, recipe_ingredients, render_html
+from score import MICRONUTRIENTS
+from shards import SHARD_DIR, write_shards
+from stream import iter_json, write_chunks
+from variants import load_variants, select_meals, variant_drv, variant_key
+
+if TYPE_CHECKING:
+    from fooddb import FoodDB
 
 ROOT = Path(__file__).resolve().parent.parent
 MEALS_DIR = ROOT / "meals"
 DATA_DIR = ROOT / "data"
 DIST_DIR = ROOT / "dist"
 SRC_DIR = ROOT / "src"
-
-INGREDIENT_RE = re.compile(r"\{(\d+(?:\.\d+)?)\s*g\s*\{([^{}]+)\}\}")
-META_RE = re.compile(r"<!--\s*([\s\S]*?)\s*-->")
+SCRIPTS_DIR = ROOT / "scripts"
+CACHE_DIR = ROOT / ".buildcache"
+RECIPE_PARSER = Path(__file__).resolve().with_name("recipe.py")
+
+
+def use_root(root: Path, dist: Path | None = None) -> None:
+    """Point the build at another project tree (and optionally output dir)."""
+    global ROOT, MEALS_DIR, DATA_DIR, DIST_DIR, SRC_DIR, SCRIPTS_DIR, CACHE_DIR
+    ROOT = root
+    MEALS_DIR = root / "meals"
+    DATA_DIR = root / "data"
+    DIST_DIR = dist or root / "dist"
+    SRC_DIR = root / "src"
+    SCRIPTS_DIR = root / "scripts"
+    CACHE_DIR = root / ".buildcache"
 
 MEAL_LABELS = {"morning": "Breakfast", "midday": "Lunch", "evening": "Dinner"}
 DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
 MEALS = ["morning", "midday", "evening"]
+SIMILAR_MEALS = 4  # listed per recipe popup
+PRECACHE_DENSITIES = (1, 2)  # device pixel ratios whose card thumbnail is precached
 
 
 def get_build_version() -> str:
@@ -39,212 +71,204 @@ def get_build_version() -> str:
     except (OSError, subprocess.CalledProcessError):
         return datetime.now().strftime("%Y%m%d%H%M")
 
-MICRONUTRIENTS = [
-    "Protein", "Iron", "Vitamin A, RAE", "Vitamin B-12", "Vitamin C",
-    "Vitamin D (D2 + D3)", "Calcium", "Magnesium", "Zinc", "Selenium",
-    "Potassium", "Folate, total", "Choline",
-]
-
-CATEGORIES = {
-    "beef": "Meat & Offal", "liver": "Meat & Offal", "kidney": "Meat & Offal",
-    "bone_marrow": "Meat & Offal",
-    "sardine": "Fish & Seafood", "herring": "Fish & Seafood", "mackerel": "Fish & Seafood",
-    "anchovy": "Fish & Seafood", "salmon_roe": "Fish & Seafood", "oyster": "Fish & Seafood",
-    "clam": "Fish & Seafood", "cod_liver": "Fish & Seafood", "natto": "Fish & Seafood",
-    "egg": "Dairy & Eggs", "duck_egg": "Dairy & Eggs", "butter": "Dairy & Eggs",
-    "parmesan_cheese": "Dairy & Eggs",
-    "brown_rice": "Grains & Starches", "pasta": "Grains & Starches", "bread": "Grains & Starches",
-    "potato": "Vegetables & Herbs", "sweet_potato": "Vegetables & Herbs", "broccoli": "Vegetables & Herbs",
-    "spinach": "Vegetables & Herbs", "kale": "Vegetables & Herbs", "tomato": "Vegetables & Herbs",
-    "onion": "Vegetables & Herbs", "garlic": "Vegetables & Herbs", "cucumber": "Vegetables & Herbs",
-    "mushroom": "Vegetables & Herbs", "parsley": "Vegetables & Herbs", "scallion": "Vegetables & Herbs",
-    "ginger": "Vegetables & Herbs", "avocado": "Vegetables & Herbs",
-    "tofu": "Legumes & Soy", "black_bean": "Legumes & Soy", "kimchi": "Legumes & Soy",
-    "miso": "Pantry & Ferments", "light_soy_sauce": "Pantry & Ferments",
-    "chicken_broth": "Pantry & Ferments", "olive_oil": "Pantry & Ferments",
-    "sesame_oil": "Pantry & Ferments", "nori": "Pantry & Ferments", "wakame": "Pantry & Ferments",
-    "cumin": "Spices & Herbs", "salt": "Spices & Herbs", "black_pepper": "Spices & Herbs",
-    "lemon": "Fruits", "wakame": "Pantry & Ferments",
-}
-
 
-def load_food_db() -> tuple[dict, dict]:
-    """Load foods and display names from committed CSV data."""
-    food_df = pd.read_csv(DATA_DIR / "fooddata.csv")
-    nut_df = pd.read_csv(DATA_DIR / "nutrients.csv")
-    nutrient_cols = []
-    seen = set()
-    for name in nut_df["nutrientName"]:
-        if name not in seen:
-            seen.add(name)
-            nutrient_cols.append(name)
-
-    foods = {}
-    display_names = {}
-    for _, row in food_df.iterrows():
-        fid = str(row["foodName"])
-        nutrients = {}
-        for col in nutrient_cols:
-            if col in row and pd.notna(row[col]):
-                nutrients[col] = float(row[col])
-        foods[fid] = {
-            "display_name": str(row["display_name"]),
-            "category": str(row.get("food_category", categorize(fid))),
-            "nutrients": nutrients,
-        }
-        display_names[fid] = foods[fid]["display_name"]
+def load_food_db() -> tuple[FoodDB, dict]:
+    """Load the food x nutrient matrix and DRV table (see :func:`fooddb.load`)."""
+    import fooddb
 
-    drv = {}
-    seen = set()
-    for _, row in nut_df.iterrows():
-        name = row["nutrientName"]
-        if name in seen:
-            continue
-        seen.add(name)
-        drv[name] = {
-            "unit": row["unit_name"],
-            "category": row["nutrient_category"],
-            "drv": float(row["drv"]),
-            "order": int(row["nutrient_order"]),
-        }
-    return foods, drv
+    with TRACER.stage("load_food_db") as span:
+        loaded = fooddb.load(DATA_DIR)
+        span["items"] = len(loaded[0])
+    return loaded
 
 
-FOOD_DB: dict = {}
+FOOD_DB: FoodDB | None = None
 DRV_DB: dict = {}
+FOOD_DB_KEY = ""
 
 
-def get_nutrients(ing: str) -> dict | None:
-    food = FOOD_DB.get(ing)
-    return food["nutrients"] if food else None
+def ensure_food_db() -> FoodDB:
+    """Load ``FOOD_DB``/``DRV_DB`` on first use; cached builds may never need them."""
+    global FOOD_DB, DRV_DB
+    if FOOD_DB is None:
+        FOOD_DB, DRV_DB = load_food_db()
+    return FOOD_DB
 
 
 def get_display_name(ing: str) -> str | None:
-    food = FOOD_DB.get(ing)
-    return food["display_name"] if food else None
-
-
-def categorize(ingredient_id: str) -> str:
-    if ingredient_id in CATEGORIES:
-        return CATEGORIES[ingredient_id]
-    if "oil" in ingredient_id:
-        return "Oils & Fats"
-    if "cheese" in ingredient_id:
-        return "Dairy & Eggs"
-    return "Other"
-
-
-def parse_meta(content: str) -> dict:
-    match = META_RE.search(content)
-    if not match:
-        return {}
-    meta = {}
-    for part in match.group(1).split():
-        if ":" in part:
-            k, v = part.split(":", 1)
-            meta[k] = v
-    return meta
-
-
-def parse_ingredients(content: str) -> list[tuple[float, str]]:
-    return [(float(m.group(1)), m.group(2).strip()) for m in INGREDIENT_RE.finditer(content)]
-
-
-def density_label(score: float) -> str:
-    if score >= 8:
-        return "ultra-dense"
-    if score >= 5:
-        return "dense"
-    if score >= 3:
-        return "good"
-    return ""
-
-
-def score_meal(ingredients: list[tuple[float, str]], drv: dict) -> dict:
-    agg: dict[str, float] = {}
-    for qty, ing in ingredients:
-        nutrients = get_nutrients(ing)
-        if not nutrients:
-            continue
-        for name, val in nutrients.items():
-            if val is not None:
-                agg[name] = agg.get(name, 0) + val * qty / 100
+    return FOOD_DB.display_name(ing)
 
-    calories = agg.get("Energy", 0)
-    drv_sum = sum(agg.get(n, 0) / drv.get(n, 1) for n in MICRONUTRIENTS if drv.get(n, 0) > 0)
-    score = (drv_sum / calories * 1000) if calories > 0 else 0
-    return {
-        "score": round(score, 1),
-        "calories": round(calories),
-        "ingredientCount": len(ingredients),
-        "label": density_label(score),
-    }
 
+def score_meals(meals: list[list[tuple[float, str]]], drv: dict) -> list[dict]:
+    """Score many ingredient lists against ``FOOD_DB`` (see :func:`score.score_meals`)."""
+    import score
 
-def link_ingredients(html: str) -> str:
-    def repl(match: re.Match) -> str:
-        qty, ing = match.group(1), match.group(2).strip()
-        display = get_display_name(ing) or ing
-        return (
-            f'<span class="ingredient-link" data-food="{ing}" data-qty="{qty}">'
-            f'<strong>{display}</strong> <span class="qty">{qty}g</span></span>'
-        )
-    return INGREDIENT_RE.sub(repl, html)
+    with TRACER.stage("score_meals", items=len(meals)):
+        return score.score_meals(FOOD_DB, meals, drv)
 
 
-def stamped_image(path: str, stamp: str) -> str:
-    return f"{path}?v={stamp}" if stamp else path
+IMAGE_VARIANTS: dict = {}
+IMAGE_HASHES: dict[str, str] = {}  # page-relative image URL -> short content hash
 
 
-def markdown_to_html(text: str, stamp: str = "") -> str:
-    text = META_RE.sub("", text).strip()
-    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
-    text_parts = []
-    image_parts = []
-    for p in paragraphs:
-        if p.startswith("!["):
-            m = re.match(r"!\[([^\]]*)\]\(([^)]+)\)", p)
-            if m:
-                image_parts.append(
-                    f'<img src="{stamped_image(m.group(2), stamp)}" alt="{m.group(1)}" style="max-width:100%;border-radius:8px">'
-                )
-            continue
-        text_parts.append(f"<p>{link_ingredients(p)}</p>")
-    return "\n".join(text_parts + image_parts)
+def hashed_url(url: str) -> str:
+    """``url?v=<content hash>`` for a file synced into ``dist/images``, so the
+    URL only changes (and clients only re-download it) when its bytes do."""
+    digest = IMAGE_HASHES.get(url)
+    return f"{url}?v={digest}" if digest else url
+
+
+def picture_html(src: str, variant: str, attrs: str) -> str:
+    """``<img>`` for an image, wrapped in ``<picture>`` with srcsets when derivatives exist."""
+    img = f'<img src="{hashed_url(src)}" {attrs}>'
+    formats = IMAGE_VARIANTS.get(Path(src).name, {}).get(variant)
+    if not formats:
+        return img
+    sources = "".join(
+        f'<source type="{MIME[fmt]}" sizes="{SIZES[variant]}" srcset="'
+        + ", ".join(f"{hashed_url(url)} {width}w" for width, url in widths)
+        + '">'
+        for fmt, widths in formats.items()
+    )
+    return f"<picture>{sources}{img}</picture>"
+
+
+def srcset_pick(widths: list[tuple[int, str]], variant: str, density: float) -> str:
+    """URL a browser takes from one ``<source>``'s srcset at ``density``: the
+    narrowest candidate covering the slot's pixels, else the widest. Only for
+    variants with a fixed ``px`` size."""
+    slot = int(SIZES[variant].removesuffix("px")) * density
+    covering = [(w, url) for w, url in widths if w >= slot]
+    return min(covering)[1] if covering else max(widths)[1]
+
 
+def popup_image_html(src: str, alt: str) -> str:
+    return picture_html(
+        src, "popup", f'alt="{alt}" loading="lazy" style="max-width:100%;border-radius:8px"'
+    )
+
+
+def parse_meal(path: Path, recipe: dict | None = None) -> dict:
+    """Render a meal file, or its already parsed ``recipe`` tree, into a ``mealData`` item."""
+    if recipe is None:
+        with TRACER.stage("parse_recipe"):
+            recipe = parse_recipe(path.read_text())
+    with TRACER.stage("render_markdown"):
+        content_html = render_html(recipe, get_display_name, popup_image_html)
+    return {
+        "title": recipe["title"],
+        "meta": recipe["meta"],
+        "image": hashed_url(f"images/{path.stem}.jpg"),
+        "ingredients": [{"foodName": ing, "quantity": qty} for qty, ing in recipe_ingredients(recipe)],
+        "contentHtml": content_html,
+    }
+
+
+def _init_worker(image_variants: dict, image_hashes: dict) -> None:
+    global IMAGE_VARIANTS, IMAGE_HASHES
+    IMAGE_VARIANTS, IMAGE_HASHES = image_variants, image_hashes
+    TRACER.configure()  # spans recorded in a worker would be lost anyway
+    ensure_food_db()  # no-op under fork; otherwise maps the shared sidecar
+
+
+def _ingest_chunk(recipes: list[tuple[Path, dict]]) -> list[dict]:
+    items = [parse_meal(path, recipe) for path, recipe in recipes]
+    ings = [[(i["quantity"], i["foodName"]) for i in item["ingredients"]] for item in items]
+    drv_values = {k: v["drv"] for k, v in DRV_DB.items()}
+    for item, stats in zip(items, score_meals(ings, drv_values)):
+        item["stats"] = stats
+    return items
+
+
+def ingest_meals(recipes: list[tuple[Path, dict]], jobs: int = 1) -> list[dict]:
+    """Render parsed ``(path, recipe)`` pairs in order, fanning out over ``jobs`` processes.
+
+    Workers read the food DB from the memory-mapped sidecar (or inherit it
+    under fork) and score their chunk in one batch; results come back in
+    input order, so the merged ``mealData`` does not depend on ``jobs``.
+    Items come back scored either way.
+    """
+    ensure_food_db()
+    if jobs <= 1 or len(recipes) < 2 * jobs:
+        return _ingest_chunk(recipes)
+    # Stages inside worker processes are not traced; the pool shows up as one span.
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    size = max(1, len(recipes) // (jobs * 4))
+    chunks = [recipes[i:i + size] for i in range(0, len(recipes), size)]
+    with ProcessPoolExecutor(
+        jobs, initializer=_init_worker, initargs=(IMAGE_VARIANTS, IMAGE_HASHES)
+    ) as pool:
+        return [item for chunk in pool.map(_ingest_chunk, chunks) for item in chunk]
+
+
+def load_meals(
+    cache: BuildCache | None = None, deps_key: str = "", jobs: int = 1
+) -> tuple[dict, set[str]]:
+    """Parse and render every meal, re-using cached results for unchanged files.
+
+    A cached meal is keyed on its file digest and ``deps_key`` (a digest of
+    the code, food DB and images rendering depends on) and stored scored, as
+    a copy whose ``contentHtml`` lives in a cache blob rather than in the
+    manifest; every hit returns a fresh dict. Cache misses are ingested with
+    :func:`ingest_meals`; their parsed recipe trees are cached separately on
+    the file and parser alone, so a food DB, image or template change only
+    re-renders.
+    """
+    paths = sorted(MEALS_DIR.glob("*.md"))
+    items: dict[Path, dict] = {}
+    keys: dict[Path, str] = {}
+    missing = []
+    for path in paths:
+        if cache is not None:
+            keys[path] = combine(cache.digest(path), deps_key)
+            item = cache.get("meals", path.stem, keys[path])
+            html = cache.get_text(item["contentHtml"]) if item is not None else None
+            if html is not None:
+                items[path] = {**item, "contentHtml": html}
+                continue
+        missing.append(path)
+
+    recipes = []
+    with TRACER.stage("parse_recipes", items=len(missing)):
+        parser_key = cache.digest(RECIPE_PARSER) if cache is not None else ""
+        for path in missing:
+            key = combine(cache.digest(path), parser_key) if cache is not None else ""
+            recipe = cache.get("recipes", path.stem, key) if cache is not None else None
+            if recipe is None:
+                with TRACER.stage("parse_recipe"):
+                    recipe = parse_recipe(path.read_text())
+                if cache is not None:
+                    cache.put("recipes", path.stem, key, recipe, inputs=[path])
+            recipes.append((path, recipe))
+
+    with TRACER.stage("ingest_meals", items=len(missing), jobs=jobs):
+        ingested = ingest_meals(recipes, jobs) if missing else []
+    for path, item in zip(missing, ingested):
+        items[path] = item
+        if cache is not None:
+            html = cache.put_text(item["contentHtml"])
+            cache.put("meals", path.stem, keys[path], {**item, "contentHtml": html}, inputs=[path], blobs=[html])
 
-def load_meals(stamp: str = "") -> tuple[dict, set[str]]:
     data: dict = {}
     used_ingredients: set[str] = set()
-
-    for path in sorted(MEALS_DIR.glob("*.md")):
+    for path in paths:
         day, meal, version = path.stem.rsplit("_", 2)
-        raw = path.read_text()
-        lines = raw.split("\n")
-        title = lines[0].lstrip("# ").strip()
-        body = "\n".join(lines[1:])
-        meta = parse_meta(body)
-        ingredients = parse_ingredients(body)
-        used_ingredients.update(ing for _, ing in ingredients)
-
-        data.setdefault(day, {}).setdefault(meal, {})[version] = {
-            "title": title,
-            "meta": meta,
-            "image": stamped_image(f"images/{path.stem}.jpg", stamp),
-            "ingredients": [{"foodName": ing, "quantity": qty} for qty, ing in ingredients],
-            "contentHtml": markdown_to_html(body, stamp),
-        }
+        item = items[path]
+        used_ingredients.update(i["foodName"] for i in item["ingredients"])
+        data.setdefault(day, {}).setdefault(meal, {})[version] = item
 
     return data, used_ingredients
 
 
 def load_foods(used: set[str]) -> dict:
+    ensure_food_db()
     foods = {}
     for ing in sorted(used):
         food = FOOD_DB.get(ing)
         if not food:
-            print(f"WARNING: missing nutrients for {ing}", file=sys.stderr)
-            continue
+            continue  # reported with suggestions by check_ingredients()
         foods[ing] = {
             "display_name": food["display_name"],
             "category": food["category"],
@@ -253,10 +277,145 @@ def load_foods(used: set[str]) -> dict:
     return foods
 
 
+def check_ingredients(meal_data: dict) -> int:
+    """Warn about ingredient ids missing from ``fooddata.csv``, with suggestions.
+
+    Uses the trigram name index from :mod:`lint`, so it does not need the
+    food DB; only files with unknown ids are tokenized again, to report each
+    use as ``file:line``. Returns the number of unknown ingredient uses.
+    """
+    from lint import check, lint_files, load_index
+
+    uses = (
+        (MEALS_DIR / f"{day}_{meal}_{version}.md", ing["foodName"])
+        for day, slots in meal_data.items()
+        for meal, versions in slots.items()
+        for version, item in versions.items()
+        for ing in item["ingredients"]
+    )
+    index = load_index(DATA_DIR / "fooddata.csv")
+    issues = check(uses, index)
+    if issues:
+        issues = lint_files(sorted({issue.location for issue in issues}), index, ROOT)
+    for issue in issues:
+        print(f"WARNING: {issue}", file=sys.stderr)
+    return len(issues)
+
+
 def load_drv() -> dict:
+    ensure_food_db()
     return DRV_DB
 
 
+def compact_foods(payload: dict) -> dict:
+    """Replace per-food nutrient dicts with one shared columnar ``foodNutrients`` block."""
+    from fooddb import encode_nutrients
+
+    foods = payload["foods"]
+    return {
+        **payload,
+        "foods": {fid: {k: v for k, v in f.items() if k != "nutrients"} for fid, f in foods.items()},
+        "foodNutrients": encode_nutrients(foods, payload["nutrientNames"]),
+    }
+
+
+def meal_nutrients(meal_data: dict, drv: dict) -> dict:
+    """Per-meal nutrient vectors for the client, keyed like its ``mealKey()``."""
+    from fooddb import encode_meal_nutrients
+
+    meals = {
+        f"{day}-{meal}-{version}": [(i["quantity"], i["foodName"]) for i in item["ingredients"]]
+        for day, slots in meal_data.items()
+        for meal, versions in slots.items()
+        for version, item in versions.items()
+    }
+    names = sorted(drv, key=lambda name: drv[name]["order"])
+    return encode_meal_nutrients(ensure_food_db(), meals, names, {k: v["drv"] for k, v in drv.items()})
+
+
+def meal_swaps(
+    meal_data: dict, drv: dict, cache: BuildCache | None = None, key: str = "", suffix: str = ""
+) -> dict:
+    """Best same-category, same-grams ingredient swaps for the recipe popups.
+
+    Returns ``{"meals", "names"}``: ``meals`` maps ``mealKey()`` to one
+    list per ingredient of ``[food id, score delta, DRV coverage delta]``,
+    keeping only swaps that raise the meal's density score (see
+    :mod:`substitutes`); ``names`` holds the suggested foods' display names.
+    With a ``cache``, each meal's swaps are stored under a digest of its
+    ingredients and ``key`` (the food DB and DRVs), so only meals whose
+    ingredients changed are ranked again.
+    """
+    from substitutes import rank_swaps
+
+    found: dict[str, list] = {}
+    todo = []
+    for day, slots in meal_data.items():
+        for meal, versions in slots.items():
+            for version, item in versions.items():
+                name = f"{day}-{meal}-{version}"
+                ingredients = [(i["quantity"], i["foodName"]) for i in item["ingredients"]]
+                meal_key = combine(key, json.dumps(ingredients))
+                cached = cache.get("swaps", name + suffix, meal_key) if cache is not None else None
+                if cached is None:
+                    todo.append((name, meal_key, ingredients, MEALS_DIR / f"{day}_{meal}_{version}.md"))
+                else:
+                    found[name] = cached
+    if todo:
+        ranked = rank_swaps(ensure_food_db(), [t[2] for t in todo], MICRONUTRIENTS,
+                            {k: v["drv"] for k, v in drv.items()}, same_category=True)
+        for (name, meal_key, _, path), per_ingredient in zip(todo, ranked):
+            kept = [[swap for swap in swaps if swap["scoreDelta"] > 0] for swaps in per_ingredient]
+            found[name] = [
+                [[[s["food"], s["scoreDelta"], s["coverageDelta"]] for s in swaps] for swaps in kept],
+                {s["food"]: s["name"] for swaps in kept for s in swaps},
+            ]
+            if cache is not None:
+                cache.put("swaps", name + suffix, meal_key, found[name], inputs=[path])
+    names: dict[str, str] = {}
+    by_meal = {}
+    for day, slots in meal_data.items():
+        for meal, versions in slots.items():
+            for version in versions:
+                by_meal[f"{day}-{meal}-{version}"], meal_names = found[f"{day}-{meal}-{version}"]
+                names.update(meal_names)
+    return {"meals": by_meal, "names": dict(sorted(names.items()))}
+
+
+def similar_meals(meal_data: dict, drv: dict) -> dict:
+    """Similarity index over every meal version, keyed like ``mealKey()`` (see :mod:`similarity`)."""
+    from similarity import similarity_index
+
+    keys, meals = [], []
+    for day, slots in meal_data.items():
+        for meal, versions in slots.items():
+            for version, item in versions.items():
+                keys.append(f"{day}-{meal}-{version}")
+                meals.append([(i["quantity"], i["foodName"]) for i in item["ingredients"]])
+    names = sorted(drv, key=lambda name: drv[name]["order"])
+    return similarity_index(keys, meals, ensure_food_db(), names, {k: v["drv"] for k, v in drv.items()})
+
+
+def payload_meal_data(meal_data: dict, swaps: dict, similar: dict) -> dict:
+    """``meal_data`` with each item's swaps and its ``SIMILAR_MEALS`` most
+    similar meals of this site (``[key, similarity %]``, plus ``1`` for
+    near-duplicates) added to copies; the cards and caches keep the plain items."""
+    duplicates = {pair for a, b, _ in similar["duplicates"] for pair in ((a, b), (b, a))}
+    present = {f"{day}-{meal}-{version}" for day, slots in meal_data.items()
+               for meal, versions in slots.items() for version in versions}
+    data: dict = {}
+    for day, slots in meal_data.items():
+        for meal, versions in slots.items():
+            for version, item in versions.items():
+                key = f"{day}-{meal}-{version}"
+                nearby = [[other, pct, 1] if (key, other) in duplicates else [other, pct]
+                          for other, pct in similar["neighbors"].get(key, ()) if other in present]
+                data.setdefault(day, {}).setdefault(meal, {})[version] = {
+                    **item, "swaps": swaps["meals"][key], "similar": nearby[:SIMILAR_MEALS],
+                }
+    return data
+
+
 def badge_html(stats: dict, meta: dict) -> str:
     badges = []
     if meta.get("quick"):
@@ -270,25 +429,60 @@ def badge_html(stats: dict, meta: dict) -> str:
     return "".join(badges)
 
 
-def render_meal_sections(meal_data: dict, drv: dict) -> str:
-    sections = []
+def score_all_meals(meal_data: dict, drv: dict) -> None:
+    """Attach ``stats`` to every meal version, scoring the whole corpus at once.
+
+    Meals restored from the build cache already carry their stats.
+    """
+    items = [
+        versions[version]
+        for day in DAYS
+        for meal in MEALS
+        for versions in [meal_data.get(day, {}).get(meal, {})]
+        for version in versions
+        if "stats" not in versions[version]
+    ]
+    if not items:
+        return
+    ensure_food_db()
+    ings = [[(i["quantity"], i["foodName"]) for i in item["ingredients"]] for item in items]
+    drv_values = {k: v["drv"] for k, v in drv.items()}
+    for item, stats in zip(items, score_meals(ings, drv_values)):
+        item["stats"] = stats
+
+
+def iter_meal_sections(meal_data: dict) -> Iterator[str]:
+    """Meal section HTML, one chunk per card, for meals that are already scored."""
+    first = True
     for meal in MEALS:
-        cards = []
+        if not any(meal_data.get(day, {}).get(meal) for day in DAYS):
+            continue
+        if not first:
+            yield "\n"
+        first = False
+        yield f"""
+        <section class="meal-section" data-meal-type="{meal}">
+          <div class="section-header">
+            <h2>{MEAL_LABELS[meal]}</h2>
+            <button class="section-reset" data-meal="{meal}">Reset</button>
+          </div>
+          <div class="meals">"""
         for day in DAYS:
             versions = meal_data.get(day, {}).get(meal, {})
             for version in sorted(versions, key=int):
                 item = versions[version]
-                ings = [(i["quantity"], i["foodName"]) for i in item["ingredients"]]
-                stats = score_meal(ings, {k: v["drv"] for k, v in drv.items()})
-                item["stats"] = stats
+                stats = item["stats"]
                 image = item.get("image", "")
                 image_file = Path(image.split("?")[0]).name
                 img_html = (
-                    f'<img class="meal-thumb" src="{image}" alt="{item["title"]}" loading="lazy">'
+                    picture_html(
+                        f"images/{image_file}", "thumb",
+                        f'class="meal-thumb" alt="{item["title"]}" loading="lazy"',
+                    )
                     if image and (MEALS_DIR / "images" / image_file).exists()
                     else ""
                 )
-                cards.append(f"""
+                yield f"""
                 <div class="meal" data-day="{day}" data-meal="{meal}" data-version="{version}"
                      role="button" tabindex="0">
                   {img_html}
@@ -297,21 +491,9 @@ def render_meal_sections(meal_data: dict, drv: dict) -> str:
                     <span class="meal-badges">{badge_html(stats, item["meta"])}</span>
                   </div>
                   <span class="quantity-circle"></span>
-                </div>""")
-
-        if not cards:
-            continue
-
-        sections.append(f"""
-        <section class="meal-section" data-meal-type="{meal}">
-          <div class="section-header">
-            <h2>{MEAL_LABELS[meal]}</h2>
-            <button class="section-reset" data-meal="{meal}">Reset</button>
-          </div>
-          <div class="meals">{''.join(cards)}</div>
-        </section>""")
-
-    return "\n".join(sections)
+                </div>"""
+        yield """</div>
+        </section>"""
 
 
 def read_css() -> str:
@@ -329,6 +511,7 @@ def read_css() -> str:
   object-fit: cover;
   margin: 0 0 8px;
 }
+.meal picture, .popup-body picture { display: contents; }
 .meal:has(.meal-thumb) {
   flex-direction: column;
   align-items: stretch;
@@ -369,16 +552,55 @@ def read_css() -> str:
 .ingredient-link:hover { background: #eef3ff; }
 .ingredient-link .qty { font-size: 0.85em; color: #667085; }
 .empty-hint { color: #667085; font-style: italic; }
+.tabs .suggest-plan {
+  margin: 6px 10px 6px auto;
+  align-self: center;
+}
 .popup-ingredient-nutrients {
   text-align: left;
   padding-top: 8px;
 }
+.popup-swaps, .popup-similar {
+  margin-top: 24px;
+  padding-top: 20px;
+  border-top: 1px solid var(--border);
+  text-align: left;
+}
+.popup-swaps h3, .popup-similar h3 {
+  margin: 0 0 12px;
+  font-size: 1.05em;
+  font-weight: 600;
+}
+.popup-swaps ul, .popup-similar ul { margin: 0; padding-left: 18px; }
+.popup-swaps li, .popup-similar li { margin-bottom: 6px; }
+.popup-swaps .swap-gain, .popup-similar .similar-note { font-size: 0.85em; color: #667085; }
+.similar-meal {
+  padding: 0;
+  border: 0;
+  background: none;
+  color: #4a7cff;
+  font: inherit;
+  cursor: pointer;
+}
+.similar-meal:hover { text-decoration: underline; }
 """
     return "\n".join(f.read_text() for f in files) + extra
 
 
-def write_pwa_assets(images_dst: Path, version: str) -> list[str]:
-    """Write manifest, service worker, version file, and icons. Returns precache URL list."""
+def write_pwa_assets(
+    images_dst: Path, version: str, extra: list[str] = (), cache: BuildCache | None = None,
+    dist: Path | None = None,
+) -> dict[str, str]:
+    """Write manifest, service worker, version file, and icons.
+
+    Returns the precache manifest baked into ``sw.js``: ``{url: content
+    hash}`` for the page, PWA files, ``extra`` (dist-relative) files and the
+    card thumbnails browsers pick (see :func:`srcset_pick`). The service
+    worker only downloads entries whose hash it has not cached yet, so a
+    rebuild costs clients just the files that changed.
+    Files go to ``dist`` (default ``DIST_DIR``).
+    """
+    dist = dist or DIST_DIR
     pwa_src = SRC_DIR / "pwa"
     manifest = {
         "name": "MealPlanner",
@@ -396,47 +618,48 @@ def write_pwa_assets(images_dst: Path, version: str) -> list[str]:
             {"src": "icon-512.png", "sizes": "512x512", "type": "image/png", "purpose": "maskable"},
         ],
     }
-    (DIST_DIR / "manifest.webmanifest").write_text(json.dumps(manifest, indent=2))
-    (DIST_DIR / "version.json").write_text(json.dumps({"version": version}, indent=2))
+    (dist / "manifest.webmanifest").write_text(json.dumps(manifest, indent=2))
+    (dist / "version.json").write_text(json.dumps({"version": version}, indent=2))
 
     for icon in ("icon-192.png", "icon-512.png", "apple-touch-icon.png"):
-        shutil.copy2(pwa_src / icon, DIST_DIR / icon)
+        shutil.copy2(pwa_src / icon, dist / icon)
 
-    precache = ["./index.html", "./manifest.webmanifest",
-                "./icon-192.png", "./icon-512.png", "./apple-touch-icon.png"]
+    digest = cache.digest if cache is not None else hash_file
+    files = ["index.html", "manifest.webmanifest", "icon-192.png", "icon-512.png",
+             "apple-touch-icon.png", *extra]
+    precache = {f"./{rel}": digest(dist / rel)[:12] for rel in files}
     if images_dst.exists():
-        for img in sorted(images_dst.glob("*.jpg")):
-            precache.append(f"./images/{img.name}")
+        # Card thumbnails are precached as the candidates browsers pick from
+        # the first <source> of their <picture> (see picture_html) at
+        # PRECACHE_DENSITIES. Popup and full-size images, and the formats of
+        # later sources, are cached at runtime when used.
+        thumbs = []
+        for name in sorted(IMAGE_VARIANTS):
+            formats = IMAGE_VARIANTS[name].get("thumb")
+            if formats:
+                widths = next(iter(formats.values()))
+                thumbs += sorted({dist / srcset_pick(widths, "thumb", d) for d in PRECACHE_DENSITIES})
+        for img in thumbs or sorted(images_dst.glob("*.jpg")):
+            rel = img.relative_to(dist).as_posix()
+            precache[f"./{hashed_url(rel)}"] = IMAGE_HASHES.get(rel) or digest(img)[:12]
 
-    sw_template = (pwa_src / "sw.js").read_text()
-    sw_template = sw_template.replace("__CACHE_VERSION__", f"mealplanner-{version}")
     precache_js = json.dumps(precache, separators=(",", ":"))
-    sw_out = f"const PRECACHE_URLS = {precache_js};\n\n" + sw_template
-    (DIST_DIR / "sw.js").write_text(sw_out)
+    sw_out = f"const PRECACHE_MANIFEST = {precache_js};\n\n" + (pwa_src / "sw.js").read_text()
+    (dist / "sw.js").write_text(sw_out)
     return precache
 
 
-def build() -> Path:
-    global FOOD_DB, DRV_DB
-    FOOD_DB, DRV_DB = load_food_db()
-
-    build_version = get_build_version()
-    meal_data, used = load_meals(build_version)
-    foods = load_foods(used)
-    drv = load_drv()
-    meal_sections = render_meal_sections(meal_data, drv)
-    css = read_css()
-    app_js = (SRC_DIR / "static-app.js").read_text()
-
-    payload = {
-        "days": DAYS,
-        "meals": MEALS,
-        "mealData": meal_data,
-        "foods": foods,
-        "drv": drv,
-    }
-
-    html = f"""<!DOCTYPE html>
+def page_shell(css: str, plan: dict) -> tuple[str, str]:
+    """The static markup before and after the meal sections."""
+    feasible = plan.get("feasible", True)
+    suggest_button = (
+        f'<button class="section-reset suggest-plan" id="suggest-plan" title="One version per slot, '
+        f'{plan["calories"]} of {plan["budget"]} kcal'
+        f'{"" if feasible else ": no week fits the budget, this is the lightest"}">'
+        f'Suggested plan · {plan["coverage"]:g}% DRV{"" if feasible else " · over budget"}</button>'
+        if plan.get("plan") else ""
+    )
+    head = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
@@ -456,12 +679,14 @@ def build() -> Path:
   <style>{css}</style>
 </head>
 <body>
-  <div class="meal-sections" id="meal-sections">{meal_sections}</div>
+  <div class="meal-sections" id="meal-sections">"""
+    tail = f"""</div>
 
   <div id="aggregation-section">
     <div class="tabs">
       <button class="tab-button active" data-tab="ingredients">Shopping List</button>
       <button class="tab-button" data-tab="nutrients">Nutrients</button>
+      {suggest_button}
     </div>
     <div class="tab-content active" id="ingredients-tab">
       <div id="shopping-list"><p class="empty-hint">Select meals above to build your shopping list.</p></div>
@@ -476,31 +701,429 @@ def build() -> Path:
     <div id="popup-content"></div>
   </div>
 
-  <script>window.__APP_VERSION__ = {json.dumps(build_version)};</script>
-  <script>window.__DATA__ = {json.dumps(payload, separators=(",", ":"))};</script>
+"""
+    return head, tail
+
+
+def iter_page(
+    css: str, meal_sections: Iterable[str], payload: dict, build_version: str, app_js: str
+) -> Iterator[str]:
+    """The page in chunks: ``meal_sections`` and the JSON payload are streamed
+    through as they are produced (see :func:`stream.write_chunks`)."""
+    head, tail = page_shell(css, payload.get("suggestedPlan") or {})
+    yield head
+    with TRACER.stage("render_cards") as span:
+        for chunk in meal_sections:
+            span["items"] = span.get("items", 0) + chunk.count('<div class="meal"')
+            yield chunk
+    yield f"""{tail}  <script>window.__APP_VERSION__ = {json.dumps(build_version)};</script>
+  <script>window.__DATA__ = """
+    with TRACER.stage("serialize_json") as span:
+        # Opened down to single meal versions and foods.
+        for chunk in iter_json(payload, depth=4):
+            span["bytes"] = span.get("bytes", 0) + len(chunk)
+            yield chunk
+    yield f""";</script>
   <script>{app_js}</script>
 </body>
 </html>"""
 
-    DIST_DIR.mkdir(exist_ok=True)
-    out = DIST_DIR / "index.html"
-    out.write_text(html)
 
+def input_files() -> dict[str, list[Path]]:
+    """Every file the build reads, grouped by what depends on it."""
+    images = MEALS_DIR / "images"
+    return {
+        "code": sorted(SCRIPTS_DIR.glob("*.py")),
+        "data": [DATA_DIR / "fooddata.csv", DATA_DIR / "nutrients.csv"],
+        "meals": sorted(MEALS_DIR.glob("*.md")),
+        "images": sorted(p for p in images.rglob("*") if p.is_file()) if images.exists() else [],
+        "assets": [ROOT / "index.css"] + sorted(p for p in SRC_DIR.rglob("*") if p.is_file()),
+    }
+
+
+def build(
+    use_cache: bool = True,
+    link_mode: str = "copy",
+    cache: BuildCache | None = None,
+    split_data: bool = False,
+    jobs: int = 1,
+    strict: bool = False,
+    minify: bool = True,
+    compress: bool = True,
+    release: bool = False,
+    fast: bool = False,
+) -> Path:
+    """Build ``dist/``. Pass a long-lived ``cache`` to keep parsed meals in memory.
+
+    With ``split_data`` only the card index is inlined; recipe bodies and food
+    nutrients are written to hashed JSON shards that the app fetches on demand.
+    ``strict`` fails the build on ingredient ids missing from the food data.
+    ``minify`` shrinks the inlined CSS and JS (see :mod:`minify`). ``compress``
+    writes ``.gz``/``.br`` siblings of the text files; ``release`` picks the
+    smallest (and slowest) compression and AVIF encoder settings. ``fast`` is the watch-mode profile:
+    no precompression or CSS minification, and ``cache`` is not saved (the
+    caller saves it when done).
+    """
+    return build_sites({"": {}}, use_cache, link_mode, cache, split_data, jobs, strict, minify,
+                       compress, release, fast)[0]
+
+
+def build_sites(
+    variants: dict[str, dict],
+    use_cache: bool = True,
+    link_mode: str = "copy",
+    cache: BuildCache | None = None,
+    split_data: bool = False,
+    jobs: int = 1,
+    strict: bool = False,
+    minify: bool = True,
+    compress: bool = True,
+    release: bool = False,
+    fast: bool = False,
+) -> list[Path]:
+    """Build one site per ``{name: options}`` variant (see :mod:`variants`).
+
+    Variant ``""`` is written to ``dist/`` itself, any other to
+    ``dist/<name>/``. The food DB, image derivatives and parsed meals are
+    loaded once and shared; each site then only costs selecting its meals,
+    scoring against its DRVs, its plan, its page and PWA files and a sync
+    of the image store into its ``images/`` (cheap with ``--link hardlink``).
+    Sites whose inputs did not change are skipped, and plans, swaps and
+    similar meals are keyed on the meals' ingredients, so editing a recipe's
+    text only re-renders it. See :func:`build` for the flags. Returns the pages.
+    """
+    global FOOD_DB, DRV_DB, FOOD_DB_KEY, IMAGE_VARIANTS, IMAGE_HASHES
+    build_version = get_build_version()
+    if cache is None:
+        cache = BuildCache(CACHE_DIR if use_cache else None, root=ROOT)
+    with TRACER.stage("digest_inputs") as span:
+        files = input_files()
+        digests = {group: cache.digest_all(paths) for group, paths in files.items()}
+        span["items"] = sum(map(len, files.values()))
+    formats = available_formats()
+    if fast:
+        minify_page_css, compress = False, False
+    else:
+        minify_page_css = minify
+    db_key = combine(digests["code"], digests["data"])
+    images_key = combine(digests["code"], digests["images"], *formats, f"release={release}")
     images_src = MEALS_DIR / "images"
-    images_dst = DIST_DIR / "images"
-    if images_src.exists():
-        if images_dst.exists():
-            shutil.rmtree(images_dst)
-        shutil.copytree(images_src, images_dst)
-        count = len(list(images_dst.glob("*.jpg")))
-        print(f"Copied {count} images to {images_dst}")
-
-    precache = write_pwa_assets(images_dst, build_version)
-    print(f"PWA ready: v{build_version}, service worker ({len(precache)} precache entries)")
 
+    sites = []
+    synced_images = None
+    for name, options in variants.items():
+        dist = DIST_DIR / name if name else DIST_DIR
+        suffix = f":{name}" if name else ""
+        sync_key = combine(images_key, link_mode)
+        synced = cache.get("images", "synced" + suffix, sync_key)
+        images_ok = not images_src.exists() or synced is not None and all(
+            os.path.exists(os.path.join(dist / "images", rel)) for rel in synced["files"]
+        )
+        synced_images = synced_images or synced
+        build_key = combine(build_version, *digests.values(), *formats, f"split={split_data}",
+                            f"minify={minify},{minify_page_css}", f"compress={compress and (release or 'fast')}",
+                            variant_key(options))
+        out = dist / "index.html"
+        if images_ok and out.exists() and (dist / "sw.js").exists():
+            if cache.get("build", "index" + suffix, build_key) == cache.digest(out):
+                print(f"Up to date: {out}")
+                continue
+        sites.append((name, options, dist, suffix, sync_key, images_ok, build_key))
+    if not sites:
+        return [(DIST_DIR / name if name else DIST_DIR) / "index.html" for name in variants]
+
+    if db_key != FOOD_DB_KEY:
+        FOOD_DB, DRV_DB, FOOD_DB_KEY = None, {}, db_key
+
+    stale = [site for site in sites if not site[5]]
+    if not stale:
+        IMAGE_VARIANTS = synced_images["variants"] if synced_images else {}
+        IMAGE_HASHES = synced_images["hashes"] if synced_images else {}
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CACHE_DIR / "derived" if cache.enabled else Path(tmp)
+            with TRACER.stage("image_derivatives") as span:
+                IMAGE_VARIANTS, derived = build_derivatives(images_src, store, cache, release)
+                span["items"] = len(derived)
+            files = {**tree_files(images_src), **derived}
+            IMAGE_HASHES = {
+                f"images/{rel.as_posix()}": cache.digest(src)[:12] for rel, src in files.items()
+            }
+            for _, _, dist, suffix, sync_key, _, _ in stale:
+                images_dst = dist / "images"
+                with TRACER.stage("image_sync", items=len(files)):
+                    synced = sync_files(files, images_dst, link_mode)
+                cache.put("images", "synced" + suffix, sync_key, {
+                    "variants": IMAGE_VARIANTS,
+                    "hashes": IMAGE_HASHES,
+                    "files": [rel.as_posix() for rel in files],
+                })
+                print(
+                    f"Synced images to {images_dst}: {synced['copied']} copied, "
+                    f"{synced['unchanged']} unchanged, {synced['removed']} removed "
+                    f"({len(derived)} responsive variants)"
+                )
+
+    with TRACER.stage("load_meals") as span:
+        meal_data, used = load_meals(cache, combine(db_key, images_key), jobs)
+        span["items"] = sum(len(v) for meals in meal_data.values() for v in meals.values())
+    foods_key = combine(db_key, *sorted(used))
+    unknown = cache.get("payload", "unknown", foods_key)
+    if unknown != 0:  # warnings are printed on every build until fixed
+        with TRACER.stage("check_ingredients", items=len(used)):
+            unknown = check_ingredients(meal_data)
+        cache.put("payload", "unknown", foods_key, unknown)
+    if unknown and strict:
+        raise SystemExit(f"{unknown} unknown ingredient ids (see warnings above; --strict)")
+    foods = cache.get("payload", "foods", foods_key)
+    if foods is None:
+        with TRACER.stage("load_foods", items=len(used)):
+            foods = load_foods(used)
+        cache.put("payload", "foods", foods_key, foods)
+    drv = cache.get("payload", "drv", db_key)
+    if drv is None:
+        drv = load_drv()
+        cache.put("payload", "drv", db_key, drv)
+    score_all_meals(meal_data, drv)
+    # What plans, swaps and similar meals depend on: every meal's ingredients.
+    meals_key = combine(db_key, json.dumps([
+        [day, meal, version, item["ingredients"]]
+        for day, slots in meal_data.items() for meal, versions in slots.items()
+        for version, item in versions.items()
+    ]))
+    similar = cache.get("payload", "similar", meals_key)
+    if similar is None:
+        with TRACER.stage("similar_meals") as span:
+            similar = similar_meals(meal_data, drv)
+            span["items"] = len(similar["neighbors"])
+        cache.put("payload", "similar", meals_key, similar)
+    for a, b, pct in similar["duplicates"]:
+        print(f"WARNING: meals/{a.replace('-', '_')}.md and meals/{b.replace('-', '_')}.md are "
+              f"near-duplicates ({pct}% ingredient similarity)", file=sys.stderr)
+    with TRACER.stage("read_css") as span:
+        css = read_css()
+        span["bytes"] = len(css)
+    app_js = (SRC_DIR / "static-app.js").read_text()
+    assets_key = combine(digests["code"], digests["assets"])
+    if minify:
+        minified = cache.get("payload", "appJs", assets_key)
+        if minified is None:
+            with TRACER.stage("minify_js") as span:
+                minified = minify_js(app_js)
+                span["bytes"] = len(minified)
+            cache.put("payload", "appJs", assets_key, minified)
+        app_js = minified
+
+    shared = {
+        "meal_data": meal_data, "foods": foods, "drv": drv, "css": css, "app_js": app_js,
+        "db_key": db_key, "meals_key": meals_key, "assets_key": assets_key, "similar": similar,
+        "content_key": combine(db_key, digests["meals"]),
+    }
+    for name, options, dist, suffix, _, _, build_key in sites:
+        with TRACER.stage("write_site", variant=name):
+            out = write_site(dist, options, shared, build_version, split_data, cache, suffix,
+                             minify_page_css, compress, release)
+        cache.put("build", "index" + suffix, build_key, cache.digest(out))
+    if not fast:
+        with TRACER.stage("save_cache"):
+            cache.save()
+    return [(DIST_DIR / name if name else DIST_DIR) / "index.html" for name in variants]
+
+
+def page_names(meal_data: dict, plan: dict, app_js: str) -> set[str]:
+    """Class names and ids the page can use: those in its markup (shell,
+    cards and recipe popups) and any word of the app script."""
+    names = script_names(app_js)
+    names |= markup_names("".join(page_shell("", plan)))
+    for chunk in iter_meal_sections(meal_data):
+        names |= markup_names(chunk)
+    for slots in meal_data.values():
+        for versions in slots.values():
+            for item in versions.values():
+                names |= markup_names(item["contentHtml"])
+    return names
+
+
+def write_site(
+    dist: Path, options: dict, shared: dict, build_version: str, split_data: bool,
+    cache: BuildCache, suffix: str = "", minify: bool = True, compress: bool = True, release: bool = False,
+) -> Path:
+    """Write one variant's page, shards and PWA files into ``dist``."""
+    from planner import DEFAULT_DAILY_KCAL, budget_warning, suggest_plan
+
+    days = [d for d in DAYS if d in options.get("days", DAYS)]
+    meals = [m for m in MEALS if m in options.get("meals", MEALS)]
+    try:
+        drv = variant_drv(shared["drv"], options)
+    except ValueError as exc:
+        raise SystemExit(f"variant {dist.name}: {exc}") from None
+    meal_data = select_meals(shared["meal_data"], options, days, meals, shared["foods"])
+    if "drv" in options:
+        # Scores depend on the DRVs: rescore copies, keeping the shared items intact.
+        meal_data = {
+            day: {meal: {v: {k: x for k, x in item.items() if k != "stats"} for v, item in versions.items()}
+                  for meal, versions in slots.items()}
+            for day, slots in meal_data.items()
+        }
+        score_all_meals(meal_data, drv)
+    if options:
+        used = {i["foodName"] for slots in meal_data.values() for versions in slots.values()
+                for item in versions.values() for i in item["ingredients"]}
+        foods = {fid: food for fid, food in shared["foods"].items() if fid in used}
+    else:
+        foods = shared["foods"]
+
+    meals_key = combine(shared["meals_key"], variant_key(options))
+    plan = cache.get("payload", "plan" + suffix, meals_key)
+    if plan is None:
+        with TRACER.stage("suggest_plan"):
+            plan = suggest_plan(meal_data, days, meals, ensure_food_db(), MICRONUTRIENTS,
+                                {k: v["drv"] for k, v in drv.items()},
+                                options.get("kcal", DEFAULT_DAILY_KCAL))
+        cache.put("payload", "plan" + suffix, meals_key, plan)
+    warning = budget_warning(plan)
+    if warning:
+        print(f"WARNING: {warning}" + (f" (variant {suffix[1:]})" if suffix else ""), file=sys.stderr)
+    vectors = cache.get("payload", "mealNutrients" + suffix, meals_key)
+    if vectors is None:
+        with TRACER.stage("meal_nutrients") as span:
+            vectors = meal_nutrients(meal_data, drv)
+            span["items"] = len(vectors["ids"])
+        cache.put("payload", "mealNutrients" + suffix, meals_key, vectors)
+    with TRACER.stage("rank_swaps") as span:
+        swaps = meal_swaps(meal_data, drv, cache, combine(shared["db_key"], variant_key(options)), suffix)
+        span["items"] = sum(map(len, swaps["meals"].values()))
+    css = shared["css"]
+    if minify:
+        css_key = combine(meals_key, shared["content_key"], shared["assets_key"])
+        css = cache.get("payload", "css" + suffix, css_key)
+        if css is None:
+            with TRACER.stage("minify_css") as span:
+                css = minify_css(shared["css"], page_names(meal_data, plan, shared["app_js"]))
+                span["bytes"] = len(css)
+            cache.put("payload", "css" + suffix, css_key, css)
+
+    payload = {
+        "days": days,
+        "meals": meals,
+        "mealData": payload_meal_data(meal_data, swaps, shared["similar"]),
+        "foods": foods,
+        "drv": drv,
+        "nutrientNames": sorted(drv, key=lambda name: drv[name]["order"]),
+        "mealNutrients": vectors,
+        "suggestedPlan": plan,
+        "swapNames": swaps["names"],
+    }
+    shard_urls: list[str] = []
+    if split_data:
+        with TRACER.stage("write_shards") as span:
+            payload, shard_urls = write_shards(payload, dist)
+            span["items"] = len(shard_urls)
+    else:
+        with TRACER.stage("compact_foods", items=len(foods)):
+            payload = compact_foods(payload)
+        shutil.rmtree(dist / SHARD_DIR, ignore_errors=True)
+
+    # Cards and payload JSON are rendered while the page is written, so no
+    # stage holds the whole document.
+    with TRACER.stage("write_html") as span:
+        dist.mkdir(parents=True, exist_ok=True)
+        out = dist / "index.html"
+        span["bytes"] = write_chunks(
+            out, iter_page(css, iter_meal_sections(meal_data), payload, build_version,
+                           shared["app_js"])
+        )
+
+    with TRACER.stage("write_pwa_assets") as span:
+        precache = write_pwa_assets(dist / "images", build_version, shard_urls, cache, dist)
+        span["items"] = len(precache)
+    text_files = [out, dist / "sw.js", dist / "manifest.webmanifest", *(dist / url for url in shard_urls)]
+    if compress:
+        with TRACER.stage("precompress") as span:
+            span["items"] = precompress(text_files, release, cache)
+            remove_stale_compressed(dist)
+    else:
+        remove_compressed(text_files)
+    print(f"PWA ready: v{build_version}, service worker ({len(precache)} precache entries)")
     print(f"Built {out} ({out.stat().st_size // 1024} KB)")
     return out
 
 
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"ignore and do not update {CACHE_DIR.name}/")
+    parser.add_argument("--link", choices=LINK_MODES, default="copy",
+                        help="how changed images are placed in dist/images (default: copy)")
+    parser.add_argument("--watch", action="store_true",
+                        help="rebuild in-process whenever meals/, data/ or src/ change, without precompressing or minifying CSS")
+    parser.add_argument("--serve", nargs="?", type=int, const=8000, metavar="PORT",
+                        help="watch and serve dist/ with live reload (default port 8000)")
+    parser.add_argument("--split-data", action="store_true",
+                        help="inline only the card index; load recipes and food nutrients "
+                             "from hashed JSON shards on demand")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="parse, render and score meals in N worker processes (0 = all cores)")
+    parser.add_argument("--variants", type=Path, metavar="FILE",
+                        help="build every plan variant in this JSON config into dist/<name>/ "
+                             "from one load of the inputs (see scripts/variants.py)")
+    parser.add_argument("--no-minify", action="store_true",
+                        help="inline CSS and JS as written, without minifying or unused-rule stripping")
+    parser.add_argument("--release", action="store_true",
+                        help="precompress (gzip 9, brotli 11) and encode AVIF (speed 8) at the smallest, "
+                             "slowest settings for deployment")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail when a meal uses an ingredient id missing from fooddata.csv")
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall/CPU time, peak RSS and item counts per build stage")
+    parser.add_argument("--profile-alloc", action="store_true",
+                        help="with --profile, also trace Python allocations per stage (slower)")
+    parser.add_argument("--trace-json", type=Path, metavar="FILE",
+                        help="write build stages as a Chrome trace (chrome://tracing, Perfetto)")
+    parser.add_argument("--cprofile", metavar="STAGE",
+                        help="dump a cProfile of the first run of STAGE to build-STAGE.prof")
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+    variants = {"": {}}
+    if args.variants:
+        try:
+            variants = load_variants(args.variants, DAYS, MEALS)
+        except ValueError as exc:
+            parser.error(str(exc))
+    TRACER.configure(
+        enabled=args.profile or args.profile_alloc or args.trace_json is not None,
+        allocations=args.profile_alloc,
+        cprofile_stage=args.cprofile,
+    )
+
+    def run(**kwargs) -> None:
+        TRACER.reset()
+        with TRACER.stage("build"):
+            build_sites(variants, link_mode=args.link, split_data=args.split_data, jobs=jobs,
+                        strict=args.strict, minify=not args.no_minify, release=args.release, **kwargs)
+        if args.profile or args.profile_alloc:
+            print(TRACER.summary())
+        if args.trace_json:
+            TRACER.write_chrome_trace(args.trace_json)
+            print(f"Trace written to {args.trace_json}")
+
+    if not (args.watch or args.serve is not None):
+        run(use_cache=not args.no_cache)
+        return
+
+    from watch import watch
+
+    cache = BuildCache(CACHE_DIR if not args.no_cache else None, root=ROOT)
+    try:
+        watch(
+            rebuild=lambda: run(cache=cache, fast=True),
+            watched=lambda: [p for paths in input_files().values() for p in paths],
+            directory=DIST_DIR,
+            port=args.serve,
+        )
+    finally:
+        cache.save()
+
+
 if __name__ == "__main__":
-    build()
+    main()
@@ -0,0 +1,164 @@
+"""Persistent content-hash cache for incremental builds (``.buildcache/``)."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable
+
+MANIFEST = "manifest.json"
+BLOBS = "blobs"
+FORMAT = 1
+
+
+def combine(*parts: str) -> str:
+    """Stable digest of several digests/strings."""
+    return hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Content hashes and memoized build results kept between runs.
+
+    File digests are re-used while a file's size and mtime are unchanged, so
+    checking an untouched tree only costs one ``stat()`` per input. Cached
+    values live in named sections and are only returned when the caller's key
+    (usually a :func:`combine` of input digests) matches the stored one.
+    On save, entries not read or written since the last save are dropped
+    unless they were stored with ``inputs`` that all still exist (file
+    digests count their own file as input), so one instance can be reused
+    across builds in a long-lived process while per-file entries skipped by
+    an incremental build survive until their file is deleted. Large strings
+    can be kept out of the manifest with :meth:`put_text`; entries list the
+    blobs they refer to, and blobs no kept entry refers to are deleted on
+    save. A cache created with ``path=None`` never hits and never writes.
+    """
+
+    def __init__(self, path: Path | None, root: Path | None = None) -> None:
+        self.path = path
+        self.root = root
+        self._data: dict[str, dict] = {}
+        self._touched: dict[str, set[str]] = {}
+        if path is not None and (path / MANIFEST).exists():
+            try:
+                data = json.loads((path / MANIFEST).read_text())
+            except (OSError, ValueError):
+                data = {}
+            if data.get("format") == FORMAT:
+                self._data = data.get("sections", {})
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _name(self, path: Path) -> str:
+        if self.root is not None:
+            try:
+                return path.relative_to(self.root).as_posix()
+            except ValueError:
+                pass
+        return str(path)
+
+    def digest(self, path: Path) -> str:
+        """Content hash of ``path``, skipping the read when its stat is unchanged."""
+        st = path.stat()
+        name = self._name(path)
+        files = self._data.setdefault("files", {})
+        self._touched.setdefault("files", set()).add(name)
+        entry = files.get(name)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        sha = hash_file(path)
+        files[name] = [st.st_size, st.st_mtime_ns, sha]
+        return sha
+
+    def digest_all(self, paths: list[Path]) -> str:
+        return combine(*(f"{self._name(p)}:{self.digest(p)}" for p in paths))
+
+    def get(self, section: str, name: str, key: str) -> Any | None:
+        self._touched.setdefault(section, set()).add(name)
+        if not self.enabled:
+            return None
+        entry = self._data.get(section, {}).get(name)
+        if entry and entry["key"] == key:
+            return entry["value"]
+        return None
+
+    def put(
+        self, section: str, name: str, key: str, value: Any, inputs: Iterable[Path] = (),
+        blobs: Iterable[str] = (),
+    ) -> None:
+        """Store ``value`` under ``key``; ``inputs`` keep it across saves that do not touch it
+        and ``blobs`` (digests from :meth:`put_text`) are kept as long as the entry is."""
+        self._touched.setdefault(section, set()).add(name)
+        entry = {"key": key, "value": value}
+        inputs = [self._name(p) for p in inputs]
+        if inputs:
+            entry["inputs"] = inputs
+        blobs = list(blobs)
+        if blobs:
+            entry["blobs"] = blobs
+        self._data.setdefault(section, {})[name] = entry
+
+    def put_text(self, text: str) -> str:
+        """Write ``text`` to its own file under ``blobs/``; returns its digest."""
+        sha = hashlib.sha1(text.encode()).hexdigest()
+        if self.enabled:
+            path = self.path / BLOBS / sha
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(text, encoding="utf-8")
+                tmp.replace(path)
+        return sha
+
+    def get_text(self, sha: str) -> str | None:
+        """The text :meth:`put_text` stored as ``sha``, or None."""
+        if not self.enabled:
+            return None
+        try:
+            return (self.path / BLOBS / sha).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def _exists(self, name: str) -> bool:
+        return os.path.exists(self.root / name if self.root is not None else name)
+
+    def _keep(self, section: str, name: str, entry: Any) -> bool:
+        if name in self._touched.get(section, ()):
+            return True
+        if section == "files":
+            return self._exists(name)
+        inputs = entry.get("inputs") if isinstance(entry, dict) else None
+        return bool(inputs) and all(map(self._exists, inputs))
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        sections = {
+            section: {n: e for n, e in entries.items() if self._keep(section, n, e)}
+            for section, entries in self._data.items()
+        }
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / (MANIFEST + ".tmp")
+        tmp.write_text(json.dumps({"format": FORMAT, "sections": sections}, separators=(",", ":")))
+        tmp.replace(self.path / MANIFEST)
+        self._data = sections
+        self._touched = {}
+        used = {
+            sha for entries in sections.values() for entry in entries.values()
+            if isinstance(entry, dict) for sha in entry.get("blobs", ())
+        }
+        if (self.path / BLOBS).is_dir():
+            for blob in (self.path / BLOBS).iterdir():
+                if blob.name not in used:
+                    blob.unlink()
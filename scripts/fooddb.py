@@ -0,0 +1,337 @@
+"""NumPy-backed food x nutrient matrix used by the build."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from profiling import TRACER
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+SIDECAR_FORMAT = 2
+SIDECAR_FIELDS = ("food_ids", "display_names", "categories", "nutrients", "drv")
+# encode_meal_nutrients shares are uint16 fractions of this.
+SHARE_SCALE = 65535
+
+# Fallback categories for a fooddata.csv exported without ``food_category``.
+CATEGORIES = {
+    "beef": "Meat & Offal", "liver": "Meat & Offal", "kidney": "Meat & Offal",
+    "bone_marrow": "Meat & Offal",
+    "sardine": "Fish & Seafood", "herring": "Fish & Seafood", "mackerel": "Fish & Seafood",
+    "anchovy": "Fish & Seafood", "salmon_roe": "Fish & Seafood", "oyster": "Fish & Seafood",
+    "clam": "Fish & Seafood", "cod_liver": "Fish & Seafood", "natto": "Fish & Seafood",
+    "egg": "Dairy & Eggs", "duck_egg": "Dairy & Eggs", "butter": "Dairy & Eggs",
+    "parmesan_cheese": "Dairy & Eggs",
+    "brown_rice": "Grains & Starches", "pasta": "Grains & Starches", "bread": "Grains & Starches",
+    "potato": "Vegetables & Herbs", "sweet_potato": "Vegetables & Herbs", "broccoli": "Vegetables & Herbs",
+    "spinach": "Vegetables & Herbs", "kale": "Vegetables & Herbs", "tomato": "Vegetables & Herbs",
+    "onion": "Vegetables & Herbs", "garlic": "Vegetables & Herbs", "cucumber": "Vegetables & Herbs",
+    "mushroom": "Vegetables & Herbs", "parsley": "Vegetables & Herbs", "scallion": "Vegetables & Herbs",
+    "ginger": "Vegetables & Herbs", "avocado": "Vegetables & Herbs",
+    "tofu": "Legumes & Soy", "black_bean": "Legumes & Soy", "kimchi": "Legumes & Soy",
+    "miso": "Pantry & Ferments", "light_soy_sauce": "Pantry & Ferments",
+    "chicken_broth": "Pantry & Ferments", "olive_oil": "Pantry & Ferments",
+    "sesame_oil": "Pantry & Ferments", "nori": "Pantry & Ferments", "wakame": "Pantry & Ferments",
+    "cumin": "Spices & Herbs", "salt": "Spices & Herbs", "black_pepper": "Spices & Herbs",
+    "lemon": "Fruits", "wakame": "Pantry & Ferments",
+}
+
+
+class FoodDB:
+    """Dense per-100 g nutrient matrix with stable food and nutrient indexes.
+
+    Row ``i`` holds the nutrients of ``food_ids[i]``; column ``j`` holds
+    ``nutrients[j]``. Missing values are ``NaN``; ``filled`` is the same
+    matrix with them set to 0, computed unless passed in (e.g. memory-mapped).
+    """
+
+    def __init__(
+        self,
+        food_ids: list[str],
+        display_names: list[str],
+        categories: list[str],
+        nutrients: list[str],
+        matrix: np.ndarray,
+        filled: np.ndarray | None = None,
+    ) -> None:
+        self.food_ids = food_ids
+        self.display_names = display_names
+        self.categories = categories
+        self.nutrients = nutrients
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.food_index = {fid: i for i, fid in enumerate(food_ids)}
+        self.nutrient_index = {name: j for j, name in enumerate(nutrients)}
+        # Missing values contribute nothing when summing quantities.
+        self.filled = np.nan_to_num(self.matrix, nan=0.0) if filled is None else filled
+
+    def __len__(self) -> int:
+        return len(self.food_ids)
+
+    def __contains__(self, fid: object) -> bool:
+        return fid in self.food_index
+
+    def get(self, fid: str) -> dict | None:
+        """Return ``{display_name, category, nutrients}`` for a food id."""
+        i = self.food_index.get(fid)
+        if i is None:
+            return None
+        row = self.matrix[i]
+        return {
+            "display_name": self.display_names[i],
+            "category": self.categories[i],
+            "nutrients": {
+                name: float(row[j])
+                for j, name in enumerate(self.nutrients)
+                if not np.isnan(row[j])
+            },
+        }
+
+    def display_name(self, fid: str) -> str | None:
+        i = self.food_index.get(fid)
+        return self.display_names[i] if i is not None else None
+
+    def column(self, name: str) -> int | None:
+        return self.nutrient_index.get(name)
+
+    def totals(self, meals: Iterable[Iterable[tuple[float, str]]]) -> np.ndarray:
+        """Nutrient totals for many meals in one sparse-quantity x matrix product.
+
+        Each meal is a list of ``(grams, food_id)``; unknown foods are skipped.
+        Returns a ``(len(meals), len(nutrients))`` array.
+        """
+        meals = list(meals)
+        meal_rows: list[int] = []
+        food_rows: list[int] = []
+        grams: list[float] = []
+        for m, ingredients in enumerate(meals):
+            for qty, fid in ingredients:
+                i = self.food_index.get(fid)
+                if i is None:
+                    continue
+                meal_rows.append(m)
+                food_rows.append(i)
+                grams.append(qty)
+
+        out = np.zeros((len(meals), len(self.nutrients)))
+        if not grams:
+            return out
+        contrib = self.filled[food_rows] * np.asarray(grams)[:, None] / 100
+        np.add.at(out, np.asarray(meal_rows), contrib)
+        return out
+
+
+def encode_nutrients(foods: dict[str, dict], names: list[str]) -> dict:
+    """Columnar payload block for ``{food_id: {"nutrients": {...}}}``.
+
+    Values are a row-major ``len(ids) x len(names)`` little-endian float32
+    matrix and ``mask`` a little-endian bitset of present values, both
+    base64-encoded; the client decodes them with ``decodeFoodNutrients()``.
+    """
+    ids = list(foods)
+    col = {name: j for j, name in enumerate(names)}
+    values = np.zeros((len(ids), len(names)), dtype="<f4")
+    present = np.zeros((len(ids), len(names)), dtype=bool)
+    for i, fid in enumerate(ids):
+        for name, value in foods[fid]["nutrients"].items():
+            j = col.get(name)
+            if j is not None:
+                values[i, j] = value
+                present[i, j] = True
+    return {
+        "ids": ids,
+        "values": base64.b64encode(values.tobytes()).decode("ascii"),
+        "mask": base64.b64encode(np.packbits(present, bitorder="little").tobytes()).decode("ascii"),
+    }
+
+
+def encode_meal_nutrients(
+    foods: FoodDB, meals: dict[str, list[tuple[float, str]]], names: list[str], drv: dict[str, float]
+) -> dict:
+    """Columnar per-meal nutrient vectors for ``{meal_key: [(grams, food_id), ...]}``.
+
+    ``values``/``mask`` hold each meal's nutrient totals in the
+    :func:`encode_nutrients` layout and ``percent`` the same totals as
+    percent of ``drv`` (0 where no DRV). ``shares`` is a row-major
+    little-endian uint16 matrix with one row per ingredient (meals
+    concatenated in order, in ingredient order) giving that ingredient's
+    share of its meal's total for every nutrient, in 1/65535 steps. Everything for all meals is computed in
+    one gather over the food matrix.
+    """
+    ids = list(meals)
+    cols = np.array([foods.column(name) if foods.column(name) is not None else -1 for name in names])
+    known = cols >= 0
+    counts = np.array([len(meals[key]) for key in ids], dtype=np.int64)
+    rows = np.array([foods.food_index.get(fid, -1) for key in ids for _, fid in meals[key]], dtype=np.int64)
+    grams = np.array([qty for key in ids for qty, _ in meals[key]], dtype=np.float64)
+
+    # Per-ingredient amounts (ingredients x names); NaN where the food or value is unknown.
+    amounts = np.full((len(rows), len(names)), np.nan)
+    found = rows >= 0
+    amounts[np.ix_(found, known)] = foods.matrix[np.ix_(rows[found], cols[known])] * grams[found, None] / 100
+
+    meal_of_row = np.repeat(np.arange(len(ids)), counts)
+    totals = np.zeros((len(ids), len(names)))
+    np.add.at(totals, meal_of_row, np.nan_to_num(amounts))
+    present = np.zeros((len(ids), len(names)), dtype=bool)
+    np.logical_or.at(present, meal_of_row, ~np.isnan(amounts))
+
+    divisors = np.array([drv.get(name, 0) for name in names], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(divisors > 0, totals / divisors * 100, 0.0)
+        shares = np.where(totals[meal_of_row] > 0, np.nan_to_num(amounts) / totals[meal_of_row], 0.0)
+
+    def b64(array: np.ndarray) -> str:
+        return base64.b64encode(array.tobytes()).decode("ascii")
+
+    return {
+        "ids": ids,
+        "values": b64(totals.astype("<f4")),
+        "mask": b64(np.packbits(present, bitorder="little")),
+        "percent": b64(percent.astype("<f4")),
+        "shares": b64(np.rint(np.clip(shares, 0, 1) * SHARE_SCALE).astype("<u2")),
+    }
+
+
+def _source_state(sources: list[Path]) -> dict[str, list]:
+    return {p.name: [p.stat().st_size, p.stat().st_mtime_ns] for p in sources}
+
+
+def _source_hashes(sources: list[Path]) -> dict[str, str]:
+    return {p.name: hashlib.sha1(p.read_bytes()).hexdigest() for p in sources}
+
+
+def load_sidecar(base: Path, sources: list[Path]) -> tuple[FoodDB, dict] | None:
+    """Memory-map a food DB written by :func:`write_sidecar`, if it is still fresh.
+
+    The sidecar is ``<base>.npy`` (the nutrient matrix), ``<base>.filled.npy``
+    (the same with missing values as 0, so loading copies neither) plus
+    ``<base>.meta.json`` (ids, names, categories, nutrient columns and the DRV
+    table). It is fresh when the source CSVs have the recorded size and
+    mtime, or failing that the recorded content hash; returns ``None`` when
+    it must be rebuilt or any part is missing or malformed.
+    """
+    meta_path = base.with_suffix(".meta.json")
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or meta.get("format") != SIDECAR_FORMAT:
+        return None
+    if any(not isinstance(meta.get(field), (list, dict)) for field in SIDECAR_FIELDS):
+        return None
+    state = _source_state(sources)
+    if meta.get("state") != state:
+        if meta.get("hashes") != _source_hashes(sources):
+            return None
+        meta["state"] = state
+        try:
+            meta_path.write_text(json.dumps(meta))
+        except OSError:
+            pass
+    try:
+        matrix = np.load(base.with_suffix(".npy"), mmap_mode="r")
+        filled = np.load(base.with_suffix(".filled.npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    shape = (len(meta["food_ids"]), len(meta["nutrients"]))
+    if matrix.shape != shape or filled.shape != shape:
+        return None
+    foods = FoodDB(
+        food_ids=meta["food_ids"],
+        display_names=meta["display_names"],
+        categories=meta["categories"],
+        nutrients=meta["nutrients"],
+        matrix=matrix,
+        filled=filled,
+    )
+    return foods, meta["drv"]
+
+
+def write_sidecar(base: Path, sources: list[Path], foods: FoodDB, drv: dict) -> None:
+    """Write the binary sidecar read by :func:`load_sidecar`; best effort."""
+    meta = {
+        "format": SIDECAR_FORMAT,
+        "state": _source_state(sources),
+        "hashes": _source_hashes(sources),
+        "food_ids": foods.food_ids,
+        "display_names": foods.display_names,
+        "categories": foods.categories,
+        "nutrients": foods.nutrients,
+        "drv": drv,
+    }
+    try:
+        np.save(base.with_suffix(".npy"), foods.matrix)
+        np.save(base.with_suffix(".filled.npy"), foods.filled)
+        base.with_suffix(".meta.json").write_text(json.dumps(meta))
+    except OSError:
+        pass
+
+
+def categorize(ingredient_id: str) -> str:
+    if ingredient_id in CATEGORIES:
+        return CATEGORIES[ingredient_id]
+    if "oil" in ingredient_id:
+        return "Oils & Fats"
+    if "cheese" in ingredient_id:
+        return "Dairy & Eggs"
+    return "Other"
+
+
+def read_csv(data_dir: Path) -> tuple[FoodDB, dict]:
+    """Load the food x nutrient matrix and DRV table from committed CSV data."""
+    import pandas as pd
+
+    food_df = pd.read_csv(data_dir / "fooddata.csv")
+    nut_df = pd.read_csv(data_dir / "nutrients.csv")
+    duplicated = sorted(set(nut_df["nutrientName"][nut_df["nutrientName"].duplicated()]))
+    if duplicated:
+        # pandas renames repeated CSV columns to "Name.1", ...; only the first is read.
+        print(f"WARNING: duplicate nutrients {duplicated} in nutrients.csv; using the first "
+              f"column of each (re-export with data/fooddata.py)", file=sys.stderr)
+        nut_df = nut_df.drop_duplicates("nutrientName")
+    nutrient_cols = [n for n in nut_df["nutrientName"] if n in food_df.columns]
+
+    food_ids = [str(v) for v in food_df["foodName"].tolist()]
+    if "food_category" in food_df.columns:
+        categories = [str(v) for v in food_df["food_category"].tolist()]
+    else:
+        categories = [categorize(fid) for fid in food_ids]
+    foods = FoodDB(
+        food_ids=food_ids,
+        display_names=[str(v) for v in food_df["display_name"].tolist()],
+        categories=categories,
+        nutrients=nutrient_cols,
+        matrix=food_df[nutrient_cols].to_numpy(dtype=np.float64, na_value=np.nan),
+    )
+
+    drv = {
+        name: {"unit": unit, "category": category, "drv": float(value), "order": int(order)}
+        for name, unit, category, value, order in zip(
+            nut_df["nutrientName"], nut_df["unit_name"], nut_df["nutrient_category"],
+            nut_df["drv"], nut_df["nutrient_order"],
+        )
+    }
+    return foods, drv
+
+
+def load(data_dir: Path = DATA_DIR) -> tuple[FoodDB, dict]:
+    """The food DB and DRV table of ``data_dir``.
+
+    Maps the binary sidecar (``fooddata.npy`` etc.) when it is up to date,
+    so pandas is only imported when the CSVs changed; otherwise reads the
+    CSVs and rewrites the sidecar.
+    """
+    sources = [data_dir / "fooddata.csv", data_dir / "nutrients.csv"]
+    base = data_dir / "fooddata"
+    loaded = load_sidecar(base, sources)
+    if loaded is None:
+        with TRACER.stage("read_food_csv"):
+            loaded = read_csv(data_dir)
+        write_sidecar(base, sources, *loaded)
+    return loaded
@@ -0,0 +1,198 @@
+"""Image stages of the build: responsive derivatives and differential sync into ``dist/``."""
+
+from __future__ import annotations
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from buildcache import BuildCache, hash_file
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+FICLONE = 0x40049409  # Linux ioctl; supported by btrfs, XFS and similar
+
+# Target widths per display slot: meal cards are at most 260 CSS px wide,
+# recipe popups take 70% of the viewport (94% on phones).
+VARIANTS = {"thumb": (260, 520), "popup": (640, 1024)}
+SIZES = {"thumb": "260px", "popup": "(max-width: 600px) 94vw, 70vw"}
+FORMATS = ("avif", "webp")
+# libavif speed 10 encodes about 4x faster than 8 for ~10% larger files;
+# release builds take the slower, smaller setting.
+ENCODE_OPTIONS = {"avif": {"quality": 50, "speed": 10}, "webp": {"quality": 72}}
+RELEASE_ENCODE_OPTIONS = {**ENCODE_OPTIONS, "avif": {"quality": 50, "speed": 8}}
+MIME = {"avif": "image/avif", "webp": "image/webp"}
+DERIVED_DIR = "derived"
+SOURCE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+
+
+def available_formats() -> tuple[str, ...]:
+    """Derivative formats the installed Pillow can encode (none without Pillow)."""
+    try:
+        from PIL import features
+    except ImportError:
+        return ()
+    return tuple(fmt for fmt in FORMATS if features.check(fmt))
+
+
+def _options_tag(options: dict) -> str:
+    """``{"quality": 50, "speed": 10}`` -> ``"q50s10"``, part of a stored variant's name."""
+    return "".join(f"{key[0]}{value}" for key, value in sorted(options.items()))
+
+
+def _encode(src: Path, targets: list[tuple[int, str, Path]], options: dict[str, dict]) -> None:
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        for width, fmt, out in targets:
+            height = max(1, round(im.height * width / im.width))
+            resized = im.resize((width, height), Image.Resampling.LANCZOS)
+            tmp = out.with_name(f".{out.name}.tmp")
+            resized.save(tmp, format=fmt.upper(), **options[fmt])
+            tmp.replace(out)
+
+
+def build_derivatives(
+    src_dir: Path, store: Path, cache: BuildCache, release: bool = False
+) -> tuple[dict[str, dict[str, dict[str, list[tuple[int, str]]]]], dict[Path, Path]]:
+    """Downscaled AVIF/WebP variants of every source image, encoded at most once.
+
+    Encoded files live in ``store`` under their source's content hash and
+    encoder settings (:data:`RELEASE_ENCODE_OPTIONS` with ``release``), so an
+    image is only re-encoded when its bytes or the settings change; encodes
+    run on a thread pool (Pillow releases the GIL while encoding). Returns
+    ``{image name: {variant: {format: [(width, url), ...]}}}`` with URLs
+    relative to the page, plus the ``{dist-relative path: store file}``
+    mapping to sync into ``dist/images``.
+    """
+    formats = available_formats()
+    options = RELEASE_ENCODE_OPTIONS if release else ENCODE_OPTIONS
+    tags = {fmt: _options_tag(options[fmt]) for fmt in formats}
+    variants: dict = {}
+    files: dict[Path, Path] = {}
+    if not formats or not src_dir.exists():
+        return variants, files
+
+    from PIL import Image
+
+    store.mkdir(parents=True, exist_ok=True)
+    used: set[Path] = set()
+    jobs = []
+    for src in sorted(p for p in src_dir.iterdir() if p.suffix.lower() in SOURCE_SUFFIXES):
+        sha = cache.digest(src)
+        orig_width = cache.get("image-width", src.name, sha)
+        if orig_width is None:
+            with Image.open(src) as im:
+                orig_width = im.width
+            cache.put("image-width", src.name, sha, orig_width, inputs=[src])
+        todo = []
+        entry = variants.setdefault(src.name, {})
+        for variant, widths in VARIANTS.items():
+            for width in sorted({min(w, orig_width) for w in widths}):
+                for fmt in formats:
+                    cached = store / f"{sha}-{width}-{tags[fmt]}.{fmt}"
+                    if cached not in used and not cached.exists():
+                        todo.append((width, fmt, cached))
+                    used.add(cached)
+                    rel = Path(DERIVED_DIR) / f"{src.stem}.{variant}-{width}.{fmt}"
+                    files[rel] = cached
+                    entry.setdefault(variant, {}).setdefault(fmt, []).append(
+                        (width, f"images/{rel.as_posix()}")
+                    )
+        if todo:
+            jobs.append((src, todo))
+
+    if jobs:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(lambda job: _encode(*job, options), jobs))
+
+    if cache.enabled:
+        for stale in store.iterdir():
+            if stale not in used:
+                stale.unlink()
+    return variants, files
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with src.open("rb") as s, dst.open("wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def _place(src: Path, dst: Path, mode: str) -> None:
+    """Write ``src`` to ``dst`` via a temp file, never writing through an old link."""
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    if mode == "hardlink":
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+    elif mode != "reflink" or not _reflink(src, tmp):
+        shutil.copy2(src, tmp)
+    tmp.replace(dst)
+
+
+def _unchanged(src: Path, dst: Path) -> bool:
+    try:
+        s, d = src.stat(), dst.stat()
+    except FileNotFoundError:
+        return False
+    if s.st_size != d.st_size:
+        return False
+    if s.st_mtime_ns == d.st_mtime_ns or os.path.samestat(s, d):
+        return True
+    if hash_file(src) == hash_file(dst):
+        shutil.copystat(src, dst)
+        return True
+    return False
+
+
+def tree_files(src_dir: Path) -> dict[Path, Path]:
+    """``{relative path: file}`` for every file under ``src_dir``."""
+    if not src_dir.exists():
+        return {}
+    return {p.relative_to(src_dir): p for p in sorted(src_dir.rglob("*")) if p.is_file()}
+
+
+def sync_files(files: dict[Path, Path], dst_dir: Path, mode: str = "copy") -> dict[str, int]:
+    """Make ``dst_dir`` contain exactly ``files`` (relative path -> source), touching only what changed.
+
+    Files whose size and mtime match are skipped; same-size files with a
+    different mtime are compared by content hash. New or changed files are
+    copied (or hard-linked/reflinked, falling back to a copy) and files with
+    no source counterpart are removed.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"unknown link mode {mode!r}; expected one of {LINK_MODES}")
+    stats = {"copied": 0, "unchanged": 0, "removed": 0}
+    wanted = set(files)
+    for rel, src in sorted(files.items()):
+        dst = dst_dir / rel
+        if _unchanged(src, dst):
+            stats["unchanged"] += 1
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        _place(src, dst, mode)
+        stats["copied"] += 1
+
+    if dst_dir.exists():
+        for dst in sorted(dst_dir.rglob("*"), reverse=True):
+            if dst.is_dir():
+                if not any(dst.iterdir()):
+                    dst.rmdir()
+            elif dst.relative_to(dst_dir) not in wanted:
+                dst.unlink()
+                stats["removed"] += 1
+    return stats
+
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Check meal files for unknown ingredient ids and suggest close matches.
+
+    python scripts/lint.py                     # every meals/*.md
+    python scripts/lint.py meals/monday_*.md   # selected files
+
+Ids are looked up in a trigram index over the ``foodName`` and
+``display_name`` columns of ``fooddata.csv``, kept in
+``data/fooddata.names.json`` and rebuilt only when the CSV changes, so
+linting never loads the nutrient data or runs a build.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from recipe import parse_recipe
+
+ROOT = Path(__file__).resolve().parent.parent
+INDEX_FORMAT = 1
+SUGGESTIONS = 3
+CUTOFF = 0.3
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Issue(NamedTuple):
+    location: str
+    food_id: str
+    suggestions: list[tuple[str, float]]
+
+    def __str__(self) -> str:
+        hint = ", ".join(f"{fid} ({score:.2f})" for fid, score in self.suggestions)
+        return f"{self.location}: unknown ingredient id '{self.food_id}'" + (
+            f"; did you mean: {hint}" if hint else ""
+        )
+
+
+class FoodNameIndex:
+    """Trigram index over food ids and display names.
+
+    Every food contributes two entries (its id with ``_`` read as a space,
+    and its display name); a query is scored against each entry by the Dice
+    coefficient of their trigram sets, using the posting lists so only
+    entries sharing at least one trigram are looked at.
+    """
+
+    def __init__(self, ids: list[str], entries: list[list[int]], postings: dict[str, list[int]]) -> None:
+        self.ids = ids
+        self.entries = entries  # [food row, trigram count] per entry
+        self.postings = postings
+        self.known = set(ids)
+
+    @classmethod
+    def build(cls, ids: list[str], names: list[str]) -> FoodNameIndex:
+        entries: list[list[int]] = []
+        postings: dict[str, list[int]] = {}
+        for row, keys in enumerate(zip(ids, names)):
+            for key in dict.fromkeys(normalize(k) for k in keys):
+                grams = trigrams(key)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(len(entries))
+                entries.append([row, len(grams)])
+        return cls(ids, entries, postings)
+
+    def __contains__(self, food_id: object) -> bool:
+        return food_id in self.known
+
+    def suggest(self, query: str, k: int = SUGGESTIONS, cutoff: float = CUTOFF) -> list[tuple[str, float]]:
+        """Up to ``k`` ``(food_id, score)`` pairs, best first, scoring at least ``cutoff``."""
+        grams = trigrams(query)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for entry in self.postings.get(gram, ()):
+                shared[entry] = shared.get(entry, 0) + 1
+        best: dict[int, float] = {}
+        for entry, count in shared.items():
+            row, size = self.entries[entry]
+            score = 2 * count / (len(grams) + size)
+            if score > best.get(row, 0.0):
+                best[row] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], self.ids[item[0]]))
+        return [(self.ids[row], round(score, 2)) for row, score in ranked[:k] if score >= cutoff]
+
+    def to_json(self) -> dict:
+        return {"ids": self.ids, "entries": self.entries, "postings": self.postings}
+
+
+def _state(csv_path: Path) -> list[int]:
+    st = csv_path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def read_food_names(csv_path: Path) -> tuple[list[str], list[str]]:
+    with csv_path.open(newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        i, j = header.index("foodName"), header.index("display_name")
+        rows = [(row[i], row[j]) for row in reader]
+    return [fid for fid, _ in rows], [name for _, name in rows]
+
+
+def load_index(csv_path: Path) -> FoodNameIndex:
+    """Load ``<csv>.names.json`` next to ``csv_path``, rebuilding it when the CSV changed.
+
+    Like the binary food sidecar it is trusted while the CSV's size and
+    mtime match, then by content hash; writing it back is best effort.
+    """
+    index_path = csv_path.with_suffix(".names.json")
+    try:
+        data = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        data = {}
+    if data.get("format") == INDEX_FORMAT:
+        if data["state"] == _state(csv_path):
+            return FoodNameIndex(data["ids"], data["entries"], data["postings"])
+        if data["sha1"] == hashlib.sha1(csv_path.read_bytes()).hexdigest():
+            data["state"] = _state(csv_path)
+            try:
+                index_path.write_text(json.dumps(data, separators=(",", ":")))
+            except OSError:
+                pass
+            return FoodNameIndex(data["ids"], data["entries"], data["postings"])
+
+    index = FoodNameIndex.build(*read_food_names(csv_path))
+    data = {
+        "format": INDEX_FORMAT,
+        "state": _state(csv_path),
+        "sha1": hashlib.sha1(csv_path.read_bytes()).hexdigest(),
+        **index.to_json(),
+    }
+    try:
+        index_path.write_text(json.dumps(data, separators=(",", ":")))
+    except OSError:
+        pass
+    return index
+
+
+def check(ingredients: Iterable[tuple[str, str]], index: FoodNameIndex) -> list[Issue]:
+    """Issues for ``(location, food_id)`` pairs whose id is not in ``index``."""
+    suggestions: dict[str, list[tuple[str, float]]] = {}
+    issues = []
+    for location, food_id in ingredients:
+        if food_id in index:
+            continue
+        if food_id not in suggestions:
+            suggestions[food_id] = index.suggest(food_id)
+        issues.append(Issue(location, food_id, suggestions[food_id]))
+    return issues
+
+
+def lint_files(paths: Iterable[Path], index: FoodNameIndex, root: Path) -> list[Issue]:
+    """Check every ingredient token in ``paths``, reporting ``file:line``."""
+    def tokens():
+        for path in paths:
+            name = path.relative_to(root).as_posix() if path.is_relative_to(root) else str(path)
+            for token in parse_recipe(path.read_text())["ingredients"]:
+                yield f"{name}:{token['line']}", token["food"]
+
+    return check(tokens(), index)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, help="meal files (default: meals/*.md)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    index = load_index(ROOT / "data" / "fooddata.csv")
+    paths = [p.resolve() for p in args.paths] or sorted((ROOT / "meals").glob("*.md"))
+    issues = lint_files(paths, index, ROOT)
+    for issue in issues:
+        print(issue)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Checked {len(paths)} files against {len(index.ids)} foods in {elapsed:.0f} ms: "
+          f"{len(issues)} unknown ingredient ids", file=sys.stderr)
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""Minify the inlined CSS and JS and precompress text assets in ``dist/``.
+
+Everything here is conservative and dependency-free. The JS minifier only
+removes comments and whitespace: line breaks are kept, so automatic
+semicolon insertion is unaffected; spaces next to ``+``, ``-`` and ``/``
+are kept; and template literals (which hold HTML) only lose the
+indentation after their line breaks. Unused-rule stripping only drops a CSS selector when a class
+or id it requires outside of a ``:not()``/``:has()``-style argument appears
+neither in the generated markup nor anywhere in the app script.
+"""
+
+from __future__ import annotations
+
+import gzip
+import re
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from buildcache import combine
+
+if TYPE_CHECKING:
+    from buildcache import BuildCache
+
+PRECOMPRESS_MIN_BYTES = 1024
+COPY_CHUNK = 1 << 16
+COMPRESSED_SUFFIXES = (".gz", ".br")
+# (gzip level, brotli quality): quick enough for every build, and the
+# smallest output for --release builds that get deployed.
+COMPRESS_LEVELS = (6, 5)
+RELEASE_COMPRESS_LEVELS = (9, 11)
+
+_CSS_TOKEN_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*[\s\S]*?\*/')
+_MARKUP_NAMES_RE = re.compile(r'\b(?:class|id)="([^"]*)"')
+_SELECTOR_NAME_RE = re.compile(r"[.#](-?[A-Za-z_][\w-]*)")
+_JS_WORD_RE = re.compile(r"[A-Za-z_][\w-]*")
+_JS_IDENT_RE = re.compile(r"[\w$]+")
+_TEMPLATE_INDENT_RE = re.compile(r"\n[ \t]+")
+# A space that separates neither two words nor +, - or / signs (a + +b,
+# a / /re/) is redundant.
+_JS_SPACE_RE = re.compile(r"(?<=[^\w$+\-/]) | (?=[^\w$+\-/])")
+_JS_REGEX_PRECEDES = set("(,=:[!&|?{};+-*%<>~^") | {""}
+_JS_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "void", "delete", "throw"}
+
+
+def markup_names(html: str) -> set[str]:
+    """Class names and ids used in ``class``/``id`` attributes of ``html``."""
+    return {name for value in _MARKUP_NAMES_RE.findall(html) for name in value.split()}
+
+
+def script_names(js: str) -> set[str]:
+    """Every identifier-like word in a script: a superset of the class names
+    and ids it can put into markup or query, however they are assembled."""
+    return set(_JS_WORD_RE.findall(js))
+
+
+def _split_top(text: str, sep: str) -> list[str]:
+    """Split on ``sep`` outside parentheses and brackets."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _selector_used(selector: str, used: set[str]) -> bool:
+    # Arguments of functional pseudo-classes (:not(.x), :has(.y)) are ignored.
+    outer, depth = [], 0
+    for ch in selector:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0:
+            outer.append(ch)
+    return all(name in used for name in _SELECTOR_NAME_RE.findall("".join(outer)))
+
+
+def _squeeze(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return re.sub(r":\s+", ":", text)
+
+
+def _css_blocks(css: str) -> Iterable[tuple[str, str | None]]:
+    """Top-level ``(prelude, body)`` pairs; ``body`` is ``None`` for ``@import ...;``-style rules."""
+    i, n = 0, len(css)
+    while i < n:
+        j = i
+        while j < n and css[j] not in "{;":
+            j += 1
+        prelude = css[i:j].strip()
+        if j >= n:
+            if prelude:
+                yield prelude, None
+            return
+        if css[j] == ";":
+            yield prelude, None
+            i = j + 1
+            continue
+        depth, k = 1, j + 1
+        while k < n and depth:
+            if css[k] == "{":
+                depth += 1
+            elif css[k] == "}":
+                depth -= 1
+            k += 1
+        yield prelude, css[j + 1:k - 1]
+        i = k
+
+
+def minify_css(css: str, used: set[str] | None = None) -> str:
+    """Minified ``css``; with ``used`` names, selectors needing other classes/ids are dropped.
+
+    Rules inside ``@media``/``@supports`` are filtered the same way; other
+    at-rules (``@keyframes``, ``@font-face``, ...) are kept whole.
+    """
+    strings: list[str] = []
+
+    def protect(m: re.Match) -> str:
+        if m.group(1) is None:
+            return " "  # comment
+        strings.append(m.group(1))
+        return f"\0{len(strings) - 1}\0"
+
+    def emit(text: str) -> list[str]:
+        out = []
+        for prelude, body in _css_blocks(text):
+            if body is None:
+                out.append(_squeeze(prelude) + ";")
+            elif prelude.startswith("@"):
+                if re.match(r"@(media|supports|layer|container)\b", prelude):
+                    inner = "".join(emit(body))
+                    if inner:
+                        out.append(_squeeze(prelude) + "{" + inner + "}")
+                else:
+                    out.append(_squeeze(prelude) + "{" + _squeeze(body) + "}")
+            else:
+                selectors = [s.strip() for s in _split_top(prelude, ",")]
+                if used is not None:
+                    selectors = [s for s in selectors if _selector_used(s, used)]
+                declarations = _squeeze(body).rstrip(";")
+                if selectors and declarations:
+                    out.append(",".join(_squeeze(s) for s in selectors) + "{" + declarations + "}")
+        return out
+
+    result = "".join(emit(_CSS_TOKEN_RE.sub(protect, css)))
+    return re.sub(r"\0(\d+)\0", lambda m: strings[int(m.group(1))], result)
+
+
+def minify_js(js: str) -> str:
+    """Strip comments and collapse whitespace outside string, template and regex literals."""
+    out: list[str] = []
+    code: list[str] = []  # pending code text, squeezed when a literal starts
+    braces: list[int] = []  # open-brace counts of the ${...} expressions we are in
+    i, n = 0, len(js)
+    last = ""  # last significant code character or word, for regex detection
+
+    def flush() -> None:
+        text = re.sub(r"[ \t]+", " ", "".join(code))
+        out.append(_JS_SPACE_RE.sub("", re.sub(r" ?\n\s*", "\n", text)))
+        code.clear()
+
+    def literal_end(start: int, quote: str) -> int:
+        j = start + 1
+        while j < n and js[j] != quote:
+            j += 2 if js[j] == "\\" else 1
+        return j + 1
+
+    def template_end(start: int) -> int:
+        """End of template text starting at ``start`` (at the closing ` or at ``${``)."""
+        j = start
+        while j < n and js[j] != "`" and not js.startswith("${", j):
+            j += 2 if js[j] == "\\" else 1
+        return j
+
+    while i < n:
+        ch = js[i]
+        if js.startswith("//", i):
+            i = js.find("\n", i)
+            i = n if i < 0 else i
+        elif js.startswith("/*", i):
+            end = js.find("*/", i + 2)
+            end = n - 2 if end < 0 else end
+            code.append("\n" if "\n" in js[i:end] else " ")
+            i = end + 2
+        elif ch in "'\"":
+            flush()
+            end = literal_end(i, ch)
+            out.append(js[i:end])
+            i, last = end, ch
+        elif ch == "/" and (last in _JS_REGEX_PRECEDES or last in _JS_REGEX_KEYWORDS):
+            flush()
+            j, in_class = i + 1, False
+            while j < n and (js[j] != "/" or in_class):
+                if js[j] == "\\":
+                    j += 1
+                elif js[j] == "[":
+                    in_class = True
+                elif js[j] == "]":
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and js[j].isalpha():  # flags
+                j += 1
+            out.append(js[i:j])
+            i, last = j, "/"
+        elif ch == "`" or (ch == "}" and braces and braces[-1] == 0):
+            # Start of a template, or the end of a ${...} expression inside one.
+            flush()
+            if ch == "}":
+                braces.pop()
+            end = template_end(i + 1)
+            if end < n and js[end] == "`":
+                out.append(_TEMPLATE_INDENT_RE.sub("\n", js[i:end + 1]))
+                i, last = end + 1, "`"
+            else:
+                out.append(_TEMPLATE_INDENT_RE.sub("\n", js[i:end + 2]))
+                braces.append(0)
+                i, last = end + 2, "{"
+        else:
+            if ch == "{" and braces:
+                braces[-1] += 1
+            elif ch == "}" and braces:
+                braces[-1] -= 1
+            if ch.isalnum() or ch in "_$":
+                m = _JS_IDENT_RE.match(js, i)
+                code.append(m.group(0))
+                i, last = m.end(), m.group(0)
+                continue
+            code.append(ch)
+            if not ch.isspace():
+                last = ch
+            i += 1
+    flush()
+    return "".join(out).strip()
+
+
+def precompress(paths: Iterable[Path], release: bool = False, cache: BuildCache | None = None) -> int:
+    """Write ``.gz`` (and, with the optional ``brotli`` package, ``.br``)
+    siblings for every file of at least :data:`PRECOMPRESS_MIN_BYTES`;
+    returns the number written. Output is deterministic (no gzip mtime).
+    Files are compressed in :data:`COPY_CHUNK` reads, so memory does not
+    grow with the size of ``index.html``.
+
+    ``release`` compresses at :data:`RELEASE_COMPRESS_LEVELS` instead of
+    :data:`COMPRESS_LEVELS`. With a ``cache``, files whose content and
+    levels are unchanged since their siblings were written are skipped.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    gzip_level, brotli_quality = RELEASE_COMPRESS_LEVELS if release else COMPRESS_LEVELS
+    levels = f"gz={gzip_level},br={brotli_quality if brotli is not None else '-'}"
+    written = 0
+    for path in paths:
+        if cache is not None:
+            key = combine(cache.digest(path), levels)
+            done = cache.get("compressed", str(path), key)
+            if done is not None and all(path.with_name(path.name + suffix).exists() for suffix in done):
+                continue
+        remove_compressed([path])
+        encoded = []
+        if path.stat().st_size >= PRECOMPRESS_MIN_BYTES:
+            with path.open("rb") as src, path.with_name(path.name + ".gz").open("wb") as dst:
+                with gzip.GzipFile(filename="", mode="wb", compresslevel=gzip_level, fileobj=dst, mtime=0) as out:
+                    shutil.copyfileobj(src, out, COPY_CHUNK)
+            encoded.append(".gz")
+            if brotli is not None:
+                compressor = brotli.Compressor(quality=brotli_quality)
+                with path.open("rb") as src, path.with_name(path.name + ".br").open("wb") as dst:
+                    while chunk := src.read(COPY_CHUNK):
+                        dst.write(compressor.process(chunk))
+                    dst.write(compressor.finish())
+                encoded.append(".br")
+        written += len(encoded)
+        if cache is not None:
+            cache.put("compressed", str(path), key, encoded, inputs=[path])
+    return written
+
+
+def remove_compressed(paths: Iterable[Path]) -> None:
+    """Delete the ``.gz``/``.br`` siblings of ``paths``."""
+    for path in paths:
+        for suffix in COMPRESSED_SUFFIXES:
+            path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def remove_stale_compressed(root: Path) -> int:
+    """Delete ``.gz``/``.br`` files in ``root`` whose uncompressed file is gone."""
+    removed = 0
+    for suffix in COMPRESSED_SUFFIXES:
+        for path in root.rglob(f"*{suffix}"):
+            if not path.with_name(path.name[: -len(suffix)]).exists():
+                path.unlink()
+                removed += 1
+    return removed
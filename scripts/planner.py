@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Suggest a weekly plan: one meal version per day/meal slot.
+
+    python scripts/planner.py                 # 2000 kcal/day budget
+    python scripts/planner.py --kcal 1800 --json plan.json
+
+The plan maximizes weekly coverage of the scored micronutrients (each
+nutrient's weekly total as a fraction of ``days * drv``, capped at 100 % so
+one very rich meal cannot hide a gap elsewhere) while keeping the week's
+calories within ``days * kcal``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from fooddb import FoodDB
+
+DEFAULT_DAILY_KCAL = 2000
+RESTARTS = 8
+
+
+def slot_options(
+    meal_data: dict, days: list[str], meals: list[str], foods: FoodDB, nutrients: list[str], drv: dict
+) -> tuple[list[tuple[str, str]], list[list[str]], list[np.ndarray], list[np.ndarray]]:
+    """Per-slot version ids, coverage rows and calories from one batched product.
+
+    Coverage rows hold each version's nutrient totals divided by the weekly
+    target (``len(days) * drv``) for the nutrients in ``nutrients`` that have
+    a positive DRV and exist in ``foods``.
+    """
+    cols, targets = [], []
+    for name in nutrients:
+        j = foods.column(name)
+        if j is not None and drv.get(name, 0) > 0:
+            cols.append(j)
+            targets.append(drv[name] * len(days))
+    energy = foods.column("Energy")
+
+    slots, versions, ingredients = [], [], []
+    for day in days:
+        for meal in meals:
+            items = meal_data.get(day, {}).get(meal, {})
+            if not items:
+                continue
+            slots.append((day, meal))
+            ids = sorted(items, key=int)
+            versions.append(ids)
+            ingredients.extend(
+                [(i["quantity"], i["foodName"]) for i in items[v]["ingredients"]] for v in ids
+            )
+
+    totals = foods.totals(ingredients)
+    coverage = totals[:, cols] / np.asarray(targets) if cols else np.zeros((len(totals), 0))
+    calories = totals[:, energy] if energy is not None else np.zeros(len(totals))
+    bounds = np.cumsum([0] + [len(v) for v in versions])
+    return (
+        slots,
+        versions,
+        [coverage[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+        [calories[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+    )
+
+
+def _objective(total: np.ndarray) -> np.ndarray:
+    return np.minimum(total, 1.0).mean(axis=-1) if total.shape[-1] else np.zeros(total.shape[:-1])
+
+
+def _ascend(
+    choice: np.ndarray, coverage: list[np.ndarray], calories: list[np.ndarray], budget: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Best-improvement coordinate ascent: re-pick one slot at a time until stable.
+
+    Each step scores every version of a slot at once against the rest of the
+    week, so a sweep costs one small matrix operation per slot.
+    """
+    total = sum(c[v] for c, v in zip(coverage, choice))
+    kcal = sum(k[v] for k, v in zip(calories, choice))
+    value = _objective(total)
+    improved = True
+    while improved:
+        improved = False
+        for s in rng.permutation(len(choice)):
+            rest = total - coverage[s][choice[s]]
+            rest_kcal = kcal - calories[s][choice[s]]
+            scores = np.where(rest_kcal + calories[s] <= budget, _objective(rest + coverage[s]), -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] > value + 1e-12:
+                choice[s], value = best, scores[best]
+                total, kcal = rest + coverage[s][best], rest_kcal + calories[s][best]
+                improved = True
+    return choice
+
+
+def solve(
+    coverage: list[np.ndarray], calories: list[np.ndarray], budget: float,
+    restarts: int = RESTARTS, seed: int = 0,
+) -> tuple[np.ndarray, bool]:
+    """Pick one row per slot maximizing capped coverage under ``budget`` calories.
+
+    Local search from the lowest-calorie week (feasible whenever any week
+    is) and from ``restarts`` random feasible perturbations of it; returns
+    the best choice and whether it meets the budget.
+    """
+    rng = np.random.default_rng(seed)
+    lightest = np.array([int(np.argmin(k)) for k in calories])
+    if sum(k[v] for k, v in zip(calories, lightest)) > budget:
+        return lightest, False
+
+    def value(choice: np.ndarray) -> float:
+        return float(_objective(sum(c[v] for c, v in zip(coverage, choice))))
+
+    best = _ascend(lightest.copy(), coverage, calories, budget, rng)
+    for _ in range(restarts):
+        start = lightest.copy()
+        kcal = sum(k[v] for k, v in zip(calories, start))
+        for s in rng.permutation(len(start)):
+            v = int(rng.integers(len(calories[s])))
+            if kcal - calories[s][start[s]] + calories[s][v] <= budget:
+                kcal += calories[s][v] - calories[s][start[s]]
+                start[s] = v
+        candidate = _ascend(start, coverage, calories, budget, rng)
+        if value(candidate) > value(best):
+            best = candidate
+    return best, True
+
+
+def suggest_plan(
+    meal_data: dict, days: list[str], meals: list[str], foods: FoodDB, nutrients: list[str],
+    drv: dict, daily_kcal: float = DEFAULT_DAILY_KCAL,
+) -> dict:
+    """Suggested plan for the payload: ``{plan: {day: {meal: version}}, ...}``."""
+    slots, versions, coverage, calories = slot_options(meal_data, days, meals, foods, nutrients, drv)
+    if not slots:
+        return {"plan": {}, "coverage": 0.0, "calories": 0, "budget": 0, "feasible": True,
+                "nutrients": {}}
+    budget = daily_kcal * len(days)
+    choice, feasible = solve(coverage, calories, budget)
+    total = sum(c[v] for c, v in zip(coverage, choice))
+    plan: dict = {}
+    for (day, meal), ids, v in zip(slots, versions, choice):
+        plan.setdefault(day, {})[meal] = ids[v]
+    scored = [n for n in nutrients if foods.column(n) is not None and drv.get(n, 0) > 0]
+    return {
+        "plan": plan,
+        "coverage": round(float(_objective(total)) * 100, 1),
+        "calories": round(float(sum(k[v] for k, v in zip(calories, choice)))),
+        "budget": round(budget),
+        "feasible": feasible,
+        "nutrients": {n: round(float(x) * 100, 1) for n, x in zip(scored, total)},
+    }
+
+
+def budget_warning(result: dict) -> str | None:
+    """Why a :func:`suggest_plan` result breaks its calorie budget, or None."""
+    if result.get("feasible", True):
+        return None
+    return (f"no week fits the {result['budget']} kcal budget; the suggested plan is the "
+            f"lightest week ({result['calories']} kcal)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    import build
+    import fooddb
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kcal", type=float, default=DEFAULT_DAILY_KCAL,
+                        help=f"daily calorie budget (default: {DEFAULT_DAILY_KCAL})")
+    parser.add_argument("--json", type=Path, help="also write the plan to this file")
+    args = parser.parse_args(argv)
+
+    foods, nutrients = fooddb.load(build.DATA_DIR)
+    meal_data, _ = build.load_meals()
+    drv = {k: v["drv"] for k, v in nutrients.items()}
+    result = suggest_plan(meal_data, build.DAYS, build.MEALS, foods, build.MICRONUTRIENTS, drv, args.kcal)
+
+    for day, slots in result["plan"].items():
+        for meal, version in slots.items():
+            title = meal_data[day][meal][version]["title"]
+            print(f"{day:<10}{build.MEAL_LABELS[meal]:<11}v{version:<4}{title}")
+    print(f"\nCalories: {result['calories']} / {result['budget']} kcal")
+    print(f"DRV coverage: {result['coverage']}%")
+    for name, pct in result["nutrients"].items():
+        print(f"  {name:<22}{pct:>7.1f}%")
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    warning = budget_warning(result)
+    if warning:
+        print(f"WARNING: {warning}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Per-stage build instrumentation: summaries, Chrome traces and cProfile dumps."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Tracer:
+    """Records nested build stages as spans.
+
+    Every span stores wall and CPU time, the process' peak RSS when it ended
+    and, with ``allocations`` on, the peak traced Python allocation during
+    the span. Callers may set ``span["items"]`` to report how much work a
+    stage did. A disabled tracer only yields a throwaway dict.
+    """
+
+    def __init__(self) -> None:
+        self.configure()
+
+    def configure(
+        self,
+        enabled: bool = False,
+        allocations: bool = False,
+        cprofile_stage: str | None = None,
+        cprofile_out: Path | None = None,
+    ) -> None:
+        self.enabled = enabled or cprofile_stage is not None
+        self.allocations = allocations
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_out = cprofile_out
+        if allocations:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget recorded spans, e.g. between rebuilds in watch mode."""
+        self.spans: list[dict] = []
+        self._stack: list[dict] = []
+        self._origin = time.perf_counter()
+        self._profiler = None
+
+    @contextmanager
+    def stage(self, name: str, **args) -> Iterator[dict]:
+        if not self.enabled:
+            yield {}
+            return
+        span = {"name": name, "depth": len(self._stack), "args": dict(args)}
+        parent = self._stack[-1] if self._stack else None
+        if self.allocations:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent["_peak"] = max(parent.get("_peak", 0), peak)
+            tracemalloc.reset_peak()
+            span["_base"] = current
+        profiler = None
+        if name == self.cprofile_stage and self._profiler is None:
+            import cProfile
+
+            profiler = self._profiler = cProfile.Profile()
+            profiler.enable()
+
+        self._stack.append(span)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield span["args"]
+        finally:
+            span["wall"] = time.perf_counter() - start_wall
+            span["cpu"] = time.process_time() - start_cpu
+            span["start"] = start_wall - self._origin
+            span["rss_mb"] = peak_rss_mb()
+            self._stack.pop()
+            if profiler is not None:
+                profiler.disable()
+                self._dump_profile(profiler)
+            if self.allocations:
+                import tracemalloc
+
+                peak = max(tracemalloc.get_traced_memory()[1], span.pop("_peak", 0))
+                span["alloc_kb"] = max(0, peak - span.pop("_base")) / 1024
+                if parent is not None:
+                    parent["_peak"] = max(parent.get("_peak", 0), peak)
+            self.spans.append(span)
+
+    def _dump_profile(self, profiler) -> None:
+        out = self.cprofile_out or Path(f"build-{self.cprofile_stage}.prof")
+        profiler.dump_stats(out)
+        print(f"cProfile for stage {self.cprofile_stage!r} written to {out} "
+              f"(view with: python -m pstats {out})")
+
+    def summary(self) -> str:
+        """Table of spans aggregated by stage name, in first-start order."""
+        rows: dict[str, dict] = {}
+        for span in sorted(self.spans, key=lambda s: s["start"]):
+            row = rows.setdefault(span["name"], {
+                "depth": span["depth"], "calls": 0, "wall": 0.0, "cpu": 0.0,
+                "alloc_kb": 0.0, "rss_mb": 0.0, "items": 0,
+            })
+            row["calls"] += 1
+            row["wall"] += span["wall"]
+            row["cpu"] += span["cpu"]
+            row["alloc_kb"] = max(row["alloc_kb"], span.get("alloc_kb", 0.0))
+            row["rss_mb"] = max(row["rss_mb"], span["rss_mb"])
+            row["items"] += span["args"].get("items", 0)
+
+        alloc = self.allocations
+        lines = [
+            f"{'stage':<30}{'calls':>7}{'wall ms':>10}{'cpu ms':>10}"
+            + (f"{'alloc KB':>11}" if alloc else "") + f"{'rss MB':>9}{'items':>8}"
+        ]
+        for name, row in rows.items():
+            lines.append(
+                f"{'  ' * row['depth'] + name:<30}{row['calls']:>7}"
+                f"{row['wall'] * 1000:>10.1f}{row['cpu'] * 1000:>10.1f}"
+                + (f"{row['alloc_kb']:>11.0f}" if alloc else "")
+                + f"{row['rss_mb']:>9.0f}{row['items'] or '':>8}"
+            )
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write spans in the Chrome trace-event format (chrome://tracing, Perfetto)."""
+        pid, tid = os.getpid(), threading.get_ident()
+        events = [
+            {
+                "name": span["name"],
+                "ph": "X",
+                "ts": round(span["start"] * 1e6, 1),
+                "dur": round(span["wall"] * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": {
+                    **span["args"],
+                    "cpu_ms": round(span["cpu"] * 1000, 3),
+                    "rss_mb": round(span["rss_mb"], 1),
+                    **({"alloc_kb": round(span["alloc_kb"], 1)} if "alloc_kb" in span else {}),
+                },
+            }
+            for span in sorted(self.spans, key=lambda s: s["start"])
+        ]
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+TRACER = Tracer()
@@ -0,0 +1,134 @@
+"""Single-pass tokenizer for meal markdown files.
+
+A meal file is a ``# Title`` line followed by a body with an optional
+``<!-- key:value ... -->`` meta comment, image paragraphs
+(``![alt](src)``) and text paragraphs containing ingredient tokens
+(``{80g {onion}}``). :func:`parse_recipe` turns it into a JSON-serializable
+tree in one scan of the body; the ingredient list, meta and popup HTML are
+all derived from that tree.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Callable
+
+TOKEN_RE = re.compile(
+    r"(?P<meta><!--\s*(?P<meta_body>[\s\S]*?)\s*-->)"
+    r"|(?P<ingredient>\{(?P<qty>\d+(?:\.\d+)?)\s*g\s*\{(?P<food>[^{}]+)\}\})"
+    r"|(?P<image>!\[(?P<alt>(?:[^\]\n]|\n(?!\n))*)\]\((?P<src>(?:[^)\n]|\n(?!\n))+)\))"
+    r"|(?P<paragraph>\n\n)"
+)
+
+# Ingredient markup in the rendered HTML. scaleContent() in static-app.js
+# rewrites both quantities of each span in one pass, so keep them in this order.
+INGREDIENT_HTML = (
+    '<span class="ingredient-link" data-food="{food}" data-qty="{qty}">'
+    '<strong>{name}</strong> <span class="qty">{qty}g</span></span>'
+)
+
+
+def _strip(parts: list) -> list:
+    """Drop leading/trailing whitespace of a paragraph made of text and token parts."""
+    while parts and isinstance(parts[0], str) and not parts[0].strip():
+        parts.pop(0)
+    while parts and isinstance(parts[-1], str) and not parts[-1].strip():
+        parts.pop()
+    if parts and isinstance(parts[0], str):
+        parts[0] = parts[0].lstrip()
+    if parts and isinstance(parts[-1], str):
+        parts[-1] = parts[-1].rstrip()
+    return parts
+
+
+def parse_recipe(raw: str) -> dict:
+    """Parse a meal file into ``{title, meta, paragraphs, images, ingredients}``.
+
+    ``paragraphs`` is a list of part lists, each part either literal text or
+    an ingredient token ``{"qty": "80", "food": "onion", "line": 5}``;
+    ``ingredients`` lists every token in file order (including any inside
+    image paragraphs) and ``line`` is its 1-based line in the file. Only the
+    first meta comment is read; all of them are dropped from the text, and
+    one on a line of its own separates paragraphs like a blank line. A
+    paragraph starting with ``![`` is an image paragraph: its first image is
+    kept and the rest of the paragraph is ignored.
+    """
+    title, _, body = raw.partition("\n")
+    meta: dict | None = None
+    paragraphs: list[list] = []
+    images: list[dict] = []
+    ingredients: list[dict] = []
+
+    parts: list = []
+    image: dict | None = None
+    skip = False  # inside an image paragraph (or one that only looks like it)
+    line, pos = 2, 0
+
+    def flush() -> None:
+        nonlocal parts, image, skip
+        if image is not None:
+            images.append(image)
+        elif not skip:
+            stripped = _strip(parts)
+            if stripped and not (isinstance(stripped[0], str) and stripped[0].startswith("![")):
+                paragraphs.append(stripped)
+        parts, image, skip = [], None, False
+
+    for m in TOKEN_RE.finditer(body):
+        start = m.start()
+        if start > pos and not skip:
+            parts.append(body[pos:start])
+        line += body.count("\n", pos, start)
+        pos = m.end()
+
+        if m.group("paragraph"):
+            flush()
+        elif m.group("ingredient"):
+            token = {"qty": m.group("qty"), "food": m.group("food").strip(), "line": line}
+            ingredients.append(token)
+            if not skip:
+                parts.append(token)
+        elif m.group("meta"):
+            if meta is None:
+                meta = dict(p.split(":", 1) for p in m.group("meta_body").split() if ":" in p)
+            if body[start - 1:start] in ("", "\n") and body[pos:pos + 1] in ("", "\n"):
+                flush()  # a comment on its own line leaves a blank line behind
+        elif not skip and not any(isinstance(p, dict) or p.strip() for p in parts):
+            image, skip = {"alt": m.group("alt"), "src": m.group("src")}, True
+        elif not skip:
+            parts.append(m.group(0))
+        line += m.group(0).count("\n")
+    if pos < len(body) and not skip:
+        parts.append(body[pos:])
+    flush()
+
+    return {
+        "title": title.lstrip("# ").strip(),
+        "meta": meta or {},
+        "paragraphs": paragraphs,
+        "images": images,
+        "ingredients": ingredients,
+    }
+
+
+def recipe_ingredients(recipe: dict) -> list[tuple[float, str]]:
+    return [(float(t["qty"]), t["food"]) for t in recipe["ingredients"]]
+
+
+def render_html(
+    recipe: dict,
+    display_name: Callable[[str], str | None],
+    image_html: Callable[[str, str], str],
+) -> str:
+    """Popup HTML: text paragraphs with linked ingredients, then the images."""
+    text = [
+        "<p>" + "".join(
+            part if isinstance(part, str)
+            else INGREDIENT_HTML.format(
+                food=part["food"], qty=part["qty"], name=display_name(part["food"]) or part["food"]
+            )
+            for part in paragraph
+        ) + "</p>"
+        for paragraph in recipe["paragraphs"]
+    ]
+    return "\n".join(text + [image_html(img["src"], img["alt"]) for img in recipe["images"]])
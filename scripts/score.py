@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Nutrient-density scoring of ingredient lists, importable and as a CLI.
+
+    python scripts/score.py candidates.jsonl > scored.jsonl
+    generate-meals | python scripts/score.py --min-score 5 > keep.jsonl
+
+Every input line is a JSON ingredient list, either a bare list or an
+object with an ``ingredients`` list (its other fields are passed through).
+An ingredient is ``[grams, food_id]`` or ``{"quantity", "foodName"}`` as in
+the page payload. Each output line adds ``score``, ``calories``,
+``ingredientCount``, ``label`` and the per-micronutrient ``drv`` percentages,
+plus ``unknown`` for ids missing from the food data. Lines are read, scored
+and written in batches, so memory stays bounded however long the stream is.
+
+From Python, load the food DB once and score batches against it::
+
+    import fooddb, score
+    foods, nutrients = fooddb.load()  # or fooddb.load(Path("other/data"))
+    drv = {name: meta["drv"] for name, meta in nutrients.items()}
+    results = score.score_meals(foods, [[(200, "yogurt"), (25, "walnut")]], drv)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
+
+if TYPE_CHECKING:
+    from fooddb import FoodDB
+
+MICRONUTRIENTS = [
+    "Protein", "Iron", "Vitamin A, RAE", "Vitamin B-12", "Vitamin C",
+    "Vitamin D (D2 + D3)", "Calcium", "Magnesium", "Zinc", "Selenium",
+    "Potassium", "Folate, total", "Choline",
+]
+BATCH_SIZE = 1024
+
+
+def density_label(score: float) -> str:
+    if score >= 8:
+        return "ultra-dense"
+    if score >= 5:
+        return "dense"
+    if score >= 3:
+        return "good"
+    return ""
+
+
+def score_meals(
+    foods: FoodDB, meals: list[list[tuple[float, str]]], drv: dict[str, float],
+    nutrients: list[str] = MICRONUTRIENTS, details: bool = False,
+) -> list[dict]:
+    """Score many ingredient lists in one batched matrix product.
+
+    The score is the sum of the ``nutrients``' DRV fractions per 1000 kcal.
+    With ``details`` each result also maps those nutrients to their
+    percentage of the DRV (``drv``).
+    """
+    import numpy as np
+
+    totals = foods.totals(meals)
+    energy_col = foods.column("Energy")
+    calories = totals[:, energy_col] if energy_col is not None else np.zeros(len(meals))
+
+    names, cols, divisors = [], [], []
+    for name in nutrients:
+        j = foods.column(name)
+        if drv.get(name, 0) > 0 and j is not None:
+            names.append(name)
+            cols.append(j)
+            divisors.append(drv[name])
+    fractions = totals[:, cols] / np.asarray(divisors) if cols else np.zeros((len(meals), 0))
+    drv_sum = fractions.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(calories > 0, drv_sum / calories * 1000, 0.0)
+
+    results = [
+        {
+            "score": round(float(score), 1),
+            "calories": round(float(kcal)),
+            "ingredientCount": len(ingredients),
+            "label": density_label(score),
+        }
+        for ingredients, score, kcal in zip(meals, scores, calories)
+    ]
+    if details:
+        for result, row in zip(results, np.round(fractions * 100, 1).tolist()):
+            result["drv"] = dict(zip(names, row))
+    return results
+
+
+def score_meal(foods: FoodDB, ingredients: list[tuple[float, str]], drv: dict[str, float]) -> dict:
+    return score_meals(foods, [ingredients], drv)[0]
+
+
+def parse_ingredients(record) -> list[tuple[float, str]]:
+    """``(grams, food_id)`` pairs of one input record; raises ``ValueError`` on bad input."""
+    items = record.get("ingredients") if isinstance(record, dict) else record
+    if not isinstance(items, list):
+        raise ValueError("expected a list of ingredients or an object with an 'ingredients' list")
+    pairs = []
+    for ing in items:
+        try:
+            if isinstance(ing, dict):
+                qty, fid = ing["quantity"], ing["foodName"]
+            elif isinstance(ing, list):
+                qty, fid = ing
+            else:
+                raise TypeError
+            grams = float(qty)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"bad ingredient {json.dumps(ing)}: expected [grams, food_id]") from None
+        if isinstance(qty, bool) or not math.isfinite(grams) or grams < 0:
+            raise ValueError(f"bad ingredient {json.dumps(ing)}: grams must be a finite number >= 0")
+        pairs.append((grams, str(fid)))
+    return pairs
+
+
+def score_stream(
+    lines: Iterable[str], foods: FoodDB, drv: dict[str, float], batch_size: int = BATCH_SIZE,
+) -> Iterator[dict]:
+    """Score JSONL ``lines`` batch by batch, yielding one result per non-blank line.
+
+    Lines that cannot be read yield ``{"line": n, "error": message}`` and
+    the stream goes on.
+    """
+    numbered = ((n, line) for n, line in enumerate(lines, 1) if line.strip())
+    while batch := list(islice(numbered, batch_size)):
+        results: list[dict | None] = []
+        records, meals = [], []
+        for n, line in batch:
+            try:
+                record = json.loads(line)
+                meals.append(parse_ingredients(record))
+            except ValueError as exc:
+                results.append({"line": n, "error": str(exc)})
+                continue
+            records.append(record)
+            results.append(None)
+        scored = iter(score_meals(foods, meals, drv, details=True))
+        unknown = iter([[fid for _, fid in meal if fid not in foods] for meal in meals])
+        records = iter(records)
+        for result in results:
+            if result is not None:
+                yield result
+                continue
+            record, stats, missing = next(records), next(scored), next(unknown)
+            extra = {k: v for k, v in record.items() if k != "ingredients"} if isinstance(record, dict) else {}
+            yield {**extra, **stats, **({"unknown": missing} if missing else {})}
+
+
+def main(argv: list[str] | None = None) -> int:
+    import fooddb
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", type=Path, help="JSONL file (default: stdin)")
+    parser.add_argument("-o", "--output", type=Path, help="write results here (default: stdout)")
+    parser.add_argument("--min-score", type=float, metavar="SCORE",
+                        help="only output lists scoring at least SCORE (errors are always output)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, metavar="N",
+                        help=f"lists scored per batch (default: {BATCH_SIZE})")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    foods, nutrients = fooddb.load()
+    drv = {name: meta["drv"] for name, meta in nutrients.items()}
+    source: TextIO = args.input.open() if args.input else sys.stdin
+    out: TextIO = args.output.open("w") if args.output else sys.stdout
+    counts = {"scored": 0, "rejected": 0, "errors": 0}
+    try:
+        for result in score_stream(source, foods, drv, max(1, args.batch_size)):
+            if "error" in result:
+                counts["errors"] += 1
+            else:
+                counts["scored"] += 1
+                if args.min_score is not None and result["score"] < args.min_score:
+                    counts["rejected"] += 1
+                    continue
+            out.write(json.dumps(result, separators=(",", ":")) + "\n")
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - started
+    rate = f", {counts['scored'] / elapsed:,.0f}/s" if elapsed > 0 else ""
+    print(f"Scored {counts['scored']} lists in {elapsed * 1000:.0f} ms{rate}: "
+          f"{counts['rejected']} below --min-score, {counts['errors']} unreadable", file=sys.stderr)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
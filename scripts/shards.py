@@ -0,0 +1,75 @@
+"""Split the page payload into lazily loaded, content-hashed JSON shards."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+SHARD_DIR = "data"
+# Recipe fields that are only needed once a recipe popup is opened.
+LAZY_MEAL_FIELDS = ("contentHtml", "swaps", "similar")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "other"
+
+
+def _write(dist_dir: Path, kind: str, name: str, data: dict, written: set[Path]) -> str:
+    body = json.dumps(data, separators=(",", ":"), sort_keys=True).encode()
+    digest = hashlib.sha1(body).hexdigest()[:12]
+    rel = Path(SHARD_DIR) / kind / f"{_slug(name)}.{digest}.json"
+    path = dist_dir / rel
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+    written.add(path)
+    return rel.as_posix()
+
+
+def write_shards(payload: dict, dist_dir: Path) -> tuple[dict, list[str]]:
+    """Move recipe bodies and food nutrients out of ``payload`` into shard files.
+
+    Recipes are grouped per day/meal slot and food nutrients per food
+    category, the latter in the columnar :func:`fooddb.encode_nutrients`
+    format. File names carry a content hash, so unchanged shards keep their
+    URL across builds and can be cached forever. Returns the slimmed payload
+    (with a ``shards`` URL table) and the list of shard URLs; stale shard
+    files are removed. ``payload`` itself is not modified.
+    """
+    from fooddb import encode_nutrients
+
+    written: set[Path] = set()
+    shards: dict[str, dict[str, str]] = {"recipes": {}, "foods": {}}
+
+    meal_index: dict = {}
+    for day, meals in payload["mealData"].items():
+        for meal, versions in meals.items():
+            lazy = {}
+            for version, item in versions.items():
+                meal_index.setdefault(day, {}).setdefault(meal, {})[version] = {
+                    k: v for k, v in item.items() if k not in LAZY_MEAL_FIELDS
+                }
+                lazy[version] = {k: item[k] for k in LAZY_MEAL_FIELDS if k in item}
+            shards["recipes"][f"{day}/{meal}"] = _write(
+                dist_dir, "recipes", f"{day}-{meal}", lazy, written
+            )
+
+    food_index: dict = {}
+    by_category: dict[str, dict] = {}
+    for fid, food in payload["foods"].items():
+        food_index[fid] = {k: v for k, v in food.items() if k != "nutrients"}
+        by_category.setdefault(food["category"], {})[fid] = food
+    for category, foods in sorted(by_category.items()):
+        block = encode_nutrients(foods, payload["nutrientNames"])
+        shards["foods"][category] = _write(dist_dir, "foods", category, block, written)
+
+    shard_root = dist_dir / SHARD_DIR
+    for stale in shard_root.rglob("*.json"):
+        if stale not in written:
+            stale.unlink()
+
+    index = {**payload, "mealData": meal_index, "foods": food_index, "shards": shards}
+    urls = sorted(url for group in shards.values() for url in group.values())
+    return index, urls
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Similar meals and near-duplicate detection by cosine similarity.
+
+    python scripts/similarity.py                # near-duplicate meal pairs
+    python scripts/similarity.py --list -k 5    # and every meal's closest meals
+
+Each meal is described by two unit vectors: its grams per ingredient (over
+the foods the corpus uses) and its nutrient totals as fractions of their
+DRVs. The similarity of two meals is the mean of the two cosines, computed
+for all meals by batched matrix products. From ``APPROXIMATE_FROM`` meals on,
+meals are bucketed by a few rounds of spherical k-means and each one is only
+compared with the meals of its ``PROBES`` closest buckets, which keeps the
+search well below quadratic. Two meals are near-duplicates when their
+ingredient cosine reaches ``NEAR_DUPLICATE``: the same ingredients at
+slightly different grams.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from fooddb import FoodDB
+
+TOP_K = 10
+NEAR_DUPLICATE = 0.95
+APPROXIMATE_FROM = 5000
+PROBES = 5
+KMEANS_ROUNDS = 4
+# Upper bound on the similarity cells held per batch.
+CHUNK_CELLS = 1 << 22
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def meal_vectors(
+    foods: FoodDB, meals: list[list[tuple[float, str]]], nutrients: list[str], drv: dict
+) -> tuple[np.ndarray, np.ndarray]:
+    """Unit ingredient-gram and nutrient-profile vectors, one row per meal.
+
+    Ingredient columns are the food ids used by ``meals`` (known to ``foods``
+    or not); nutrient columns the ``nutrients`` with a positive DRV.
+    """
+    vocab = {fid: j for j, fid in enumerate(sorted({fid for meal in meals for _, fid in meal}))}
+    rows = np.array([m for m, meal in enumerate(meals) for _ in meal], dtype=np.int64)
+    cols = np.array([vocab[fid] for meal in meals for _, fid in meal], dtype=np.int64)
+    grams = np.array([qty for meal in meals for qty, _ in meal], dtype=np.float64)
+    ingredients = np.zeros((len(meals), len(vocab)), dtype=np.float32)
+    np.add.at(ingredients, (rows, cols), grams)
+
+    columns, divisors = [], []
+    for name in nutrients:
+        j = foods.column(name)
+        if j is not None and drv.get(name, 0) > 0:
+            columns.append(j)
+            divisors.append(drv[name])
+    profile = foods.totals(meals)[:, columns] / np.asarray(divisors) if columns else np.zeros((len(meals), 0))
+    return _unit(ingredients), _unit(profile.astype(np.float32))
+
+
+def _merge(best_idx: np.ndarray, best_sim: np.ndarray, rows: np.ndarray, idx: np.ndarray,
+           sim: np.ndarray, k: int) -> None:
+    """Fold candidate ``(idx, sim)`` columns into the running top ``k`` of ``rows``."""
+    idx = np.concatenate([best_idx[rows], idx], axis=1)
+    sim = np.concatenate([best_sim[rows], sim], axis=1)
+    keep = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+    best_idx[rows] = np.take_along_axis(idx, keep, axis=1)
+    best_sim[rows] = np.take_along_axis(sim, keep, axis=1)
+
+
+def _top(sim: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    if sim.shape[1] <= k:
+        idx = np.broadcast_to(np.arange(sim.shape[1]), sim.shape)
+        return idx, sim
+    idx = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+    return idx, np.take_along_axis(sim, idx, axis=1)
+
+
+def _exact(x: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    best_idx = np.zeros((len(x), k), dtype=np.int64)
+    best_sim = np.full((len(x), k), -np.inf, dtype=x.dtype)
+    step = max(1, CHUNK_CELLS // len(x))
+    for start in range(0, len(x), step):
+        sim = x[start:start + step] @ x.T
+        sim[np.arange(len(sim)), np.arange(start, start + len(sim))] = -np.inf
+        idx, top = _top(sim, k)
+        _merge(best_idx, best_sim, np.arange(start, start + len(sim)), idx, top, k)
+    return best_idx, best_sim
+
+
+def _argmax_rows(x: np.ndarray, centroids: np.ndarray, probes: int) -> np.ndarray:
+    """Indexes of the ``probes`` most similar centroids per row."""
+    out = np.zeros((len(x), probes), dtype=np.int64)
+    step = max(1, CHUNK_CELLS // len(centroids))
+    for start in range(0, len(x), step):
+        sim = x[start:start + step] @ centroids.T
+        out[start:start + step] = _top(sim, probes)[0] if probes > 1 else sim.argmax(axis=1)[:, None]
+    return out
+
+
+def _approximate(x: np.ndarray, k: int, probes: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n = max(1, int(np.sqrt(len(x))))
+    centroids = x[rng.choice(len(x), n, replace=False)]
+    for rounds in range(KMEANS_ROUNDS + 1):
+        assign = _argmax_rows(x, centroids, 1)[:, 0]
+        # Meals sorted by bucket: bucket c is members[bounds[c]:bounds[c + 1]].
+        members = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[members], np.arange(n + 1))
+        if rounds == KMEANS_ROUNDS:
+            break
+        filled = bounds[1:] > bounds[:-1]  # empty buckets keep their centroid
+        centroids[filled] = _unit(np.add.reduceat(x[members], bounds[:-1][filled]))
+    probed = _argmax_rows(x, centroids, min(probes, n))
+    grouped = x[members]
+
+    best_idx = np.zeros((len(x), k), dtype=np.int64)
+    best_sim = np.full((len(x), k), -np.inf, dtype=x.dtype)
+    for c in range(n):
+        bucket = members[bounds[c]:bounds[c + 1]]
+        queries = np.flatnonzero((probed == c).any(axis=1))
+        if not len(bucket) or not len(queries):
+            continue
+        step = max(1, CHUNK_CELLS // len(bucket))
+        for start in range(0, len(queries), step):
+            rows = queries[start:start + step]
+            sim = x[rows] @ grouped[bounds[c]:bounds[c + 1]].T
+            sim[rows[:, None] == bucket[None, :]] = -np.inf
+            idx, top = _top(sim, k)
+            _merge(best_idx, best_sim, rows, bucket[idx], top, k)
+    return best_idx, best_sim
+
+
+def nearest(
+    x: np.ndarray, k: int = TOP_K, approximate: bool | None = None, probes: int = PROBES, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """The ``k`` most similar other rows of ``x`` by dot product, best first.
+
+    Returns ``(indexes, similarities)``, both ``len(x) x k``; slots without
+    a neighbour (fewer than ``k + 1`` rows, or none found by the approximate
+    search) have similarity ``-inf``. ``approximate`` defaults to
+    ``len(x) >= APPROXIMATE_FROM``.
+    """
+    k = min(k, max(0, len(x) - 1))
+    if not k:
+        return np.zeros((len(x), 0), dtype=np.int64), np.zeros((len(x), 0), dtype=x.dtype)
+    if approximate is None:
+        approximate = len(x) >= APPROXIMATE_FROM
+    idx, sim = _approximate(x, k, probes, seed) if approximate else _exact(x, k)
+    order = np.lexsort((idx, -sim))
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(sim, order, axis=1)
+
+
+def similarity_index(
+    keys: list[str], meals: list[list[tuple[float, str]]], foods: FoodDB, nutrients: list[str], drv: dict,
+    k: int = TOP_K, approximate: bool | None = None, threshold: float = NEAR_DUPLICATE,
+) -> dict:
+    """Top-``k`` similar meals and near-duplicate pairs for ``{key: meal}``.
+
+    Returns ``{"neighbors": {key: [[other key, similarity %], ...]},
+    "duplicates": [[key, other key, ingredient similarity %], ...]}``.
+    Near-duplicates are looked for among each meal's ``k`` neighbours.
+    """
+    ingredients, profile = meal_vectors(foods, meals, nutrients, drv)
+    # Dot products of these rows are the mean of the two cosines.
+    x = np.hstack([ingredients, profile]) * np.float32(np.sqrt(0.5))
+    idx, sim = nearest(x, k, approximate)
+
+    found = np.isfinite(sim)
+    percent = np.rint(np.where(found, sim, 0) * 100).astype(int)
+    neighbors = {
+        key: [[keys[j], pct] for j, pct, ok in zip(row, pcts, oks) if ok]
+        for key, row, pcts, oks in zip(keys, idx.tolist(), percent.tolist(), found.tolist())
+    }
+    pairs = np.column_stack([np.repeat(np.arange(len(keys)), idx.shape[1]), idx.ravel()])
+    pairs = pairs[np.isfinite(sim.ravel())]
+    cosine = np.zeros(len(pairs))
+    step = max(1, CHUNK_CELLS // max(1, ingredients.shape[1]))
+    for start in range(0, len(pairs), step):
+        a, b = pairs[start:start + step].T
+        cosine[start:start + step] = np.einsum("ij,ij->i", ingredients[a], ingredients[b])
+    close = cosine >= threshold
+    pairs = np.sort(pairs[close], axis=1)
+    pairs, first = np.unique(pairs, axis=0, return_index=True)
+    cosine = cosine[close][first]
+    duplicates = [[keys[a], keys[b], int(np.floor(c * 100))] for (a, b), c in zip(pairs, cosine)]
+    return {"neighbors": neighbors, "duplicates": duplicates}
+
+
+def main(argv: list[str] | None = None) -> int:
+    import build
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", type=int, default=TOP_K, help=f"neighbours per meal (default: {TOP_K})")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE,
+                        help=f"ingredient cosine for near-duplicates (default: {NEAR_DUPLICATE})")
+    parser.add_argument("--approximate", action=argparse.BooleanOptionalAction, default=None,
+                        help=f"bucketed search (default: from {APPROXIMATE_FROM} meals on)")
+    parser.add_argument("--list", action="store_true", help="print every meal's closest meals")
+    args = parser.parse_args(argv)
+
+    foods = build.ensure_food_db()
+    meal_data, _ = build.load_meals()
+    items = {
+        f"{day}_{meal}_{version}": item
+        for day, slots in meal_data.items()
+        for meal, versions in slots.items()
+        for version, item in versions.items()
+    }
+    meals = [[(i["quantity"], i["foodName"]) for i in item["ingredients"]] for item in items.values()]
+    names = sorted(build.DRV_DB, key=lambda name: build.DRV_DB[name]["order"])
+    drv = {k: v["drv"] for k, v in build.DRV_DB.items()}
+    index = similarity_index(list(items), meals, foods, names, drv, args.k, args.approximate, args.threshold)
+
+    if args.list:
+        for stem, neighbors in index["neighbors"].items():
+            print(f"{stem}  {items[stem]['title']}")
+            for other, pct in neighbors:
+                print(f"  {pct:>3}%  {other:<24}{items[other]['title']}")
+    for a, b, pct in index["duplicates"]:
+        print(f"meals/{a}.md ~ meals/{b}.md: {pct}% ingredient similarity")
+    print(f"{len(index['duplicates'])} near-duplicate pairs among {len(items)} meals", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
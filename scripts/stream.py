@@ -0,0 +1,60 @@
+"""Incremental writers for the page: documents are produced as chunks and
+written to disk as they are generated, never held as one string.
+
+This removes the document-sized copies of the output, not the data it is
+made from: the parsed meals, scores and swap lists behind the page stay in
+memory for the whole build, so peak RSS still grows with the corpus.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+BUFFER_SIZE = 1 << 16
+
+
+def iter_json(value, depth: int = 1) -> Iterator[str]:
+    """Compact JSON for ``value`` in chunks, byte-identical to
+    ``json.dumps(value, separators=(",", ":"))``.
+
+    Dicts (with string keys) and lists are opened up to ``depth`` levels
+    deep; anything below that is encoded in one ``json.dumps`` call, so the
+    largest chunk is one such subtree rather than the whole document.
+    """
+    if depth <= 0 or not isinstance(value, (dict, list)):
+        yield json.dumps(value, separators=(",", ":"))
+    elif isinstance(value, dict):
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            yield f',{json.dumps(key)}:' if i else f'{json.dumps(key)}:'
+            yield from iter_json(item, depth - 1)
+        yield "}"
+    else:
+        yield "["
+        for i, item in enumerate(value):
+            if i:
+                yield ","
+            yield from iter_json(item, depth - 1)
+        yield "]"
+
+
+def write_chunks(path: Path, chunks: Iterable[str]) -> int:
+    """Write ``chunks`` to ``path`` as UTF-8 through a buffered temp file.
+
+    The file is swapped in with ``os.replace`` once complete, so readers
+    (the preview server, a deploy in progress) never see a partial page.
+    Returns the size written in bytes.
+    """
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path.stat().st_size
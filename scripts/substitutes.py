@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Rank ingredient swaps that would make meals more nutrient dense.
+
+    python scripts/substitutes.py                          # every meal, any food
+    python scripts/substitutes.py --same-category --by kcal monday_morning_1
+    python scripts/substitutes.py -k 5 --json swaps.json
+
+For every ingredient of a meal, each food in the food DB is tried in its
+place, either at the same grams or at the grams giving the same calories,
+and ranked by the meal's resulting density score (see
+:func:`score.score_meals`), with the change in per-serving DRV coverage
+(each scored nutrient's share of its DRV, capped at 100 %, averaged)
+alongside.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from fooddb import FoodDB
+
+TOP_K = 3
+MODES = ("grams", "kcal")
+# Upper bound on the (ingredient x candidate) cells scored per batch.
+CHUNK_CELLS = 1 << 22
+
+
+def rank_swaps(
+    foods: FoodDB, meals: list[list[tuple[float, str]]], nutrients: list[str], drv: dict,
+    by: str = "grams", same_category: bool = False, k: int = TOP_K,
+) -> list[list[list[dict]]]:
+    """Top ``k`` swaps for every ingredient of every meal, best first.
+
+    ``meals`` are lists of ``(grams, food_id)``; the result has one list per
+    meal with one list of swaps per ingredient (empty for foods missing
+    from ``foods``). A swap is ``{food, name, grams, score, scoreDelta,
+    coverageDelta}``. The density score is linear in the nutrient totals, so
+    all ingredients are scored against all candidates as one (ingredient x
+    food) array per batch, the top ``k`` of every row are picked at once and
+    coverage is only computed for those.
+    """
+    if by not in MODES:
+        raise ValueError(f"unknown swap mode {by!r} (expected one of {', '.join(MODES)})")
+    cols, divisors = [], []
+    for name in nutrients:
+        j = foods.column(name)
+        if j is not None and drv.get(name, 0) > 0:
+            cols.append(j)
+            divisors.append(drv[name])
+    energy = foods.column("Energy")
+    # DRV fractions and calories per gram of every food.
+    per_gram = foods.filled[:, cols] / np.asarray(divisors) / 100 if cols else np.zeros((len(foods), 0))
+    kcal_per_gram = foods.filled[:, energy] / 100 if energy is not None else np.zeros(len(foods))
+    density = per_gram.sum(axis=1)
+    # A per-calorie score means nothing for foods without a known energy value.
+    has_energy = kcal_per_gram > 0
+
+    totals = foods.totals(meals)
+    meal_fractions = totals[:, cols] / np.asarray(divisors) if cols else np.zeros((len(meals), 0))
+    meal_kcal = totals[:, energy] if energy is not None else np.zeros(len(meals))
+
+    pair_meal, pair_pos, pair_row, pair_grams = [], [], [], []
+    for m, ingredients in enumerate(meals):
+        for pos, (qty, fid) in enumerate(ingredients):
+            i = foods.food_index.get(fid)
+            if i is not None:
+                pair_meal.append(m)
+                pair_pos.append(pos)
+                pair_row.append(i)
+                pair_grams.append(qty)
+    pair_meal, pair_row, pair_grams = np.array(pair_meal, int), np.array(pair_row, int), np.array(pair_grams)
+
+    # Each meal without the swapped ingredient.
+    base = meal_fractions[pair_meal] - pair_grams[:, None] * per_gram[pair_row]
+    base_kcal = meal_kcal[pair_meal] - pair_grams * kcal_per_gram[pair_row]
+    old_fractions = meal_fractions[pair_meal]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        old_score = np.where(meal_kcal[pair_meal] > 0,
+                             old_fractions.sum(axis=1) / meal_kcal[pair_meal] * 1000, 0.0)
+    old_coverage = np.minimum(old_fractions, 1.0).mean(axis=1) * 100 if cols else np.zeros(len(pair_row))
+
+    cand = np.zeros((len(pair_row), k), dtype=np.int64)
+    cand_grams, cand_coverage = np.zeros((len(pair_row), k)), np.zeros((len(pair_row), k))
+    cand_score = np.full((len(pair_row), k), -np.inf)
+    base_sum = base.sum(axis=1)
+
+    def rank(pairs: np.ndarray, columns: np.ndarray) -> None:
+        """Fill in the top swaps of ``pairs`` among the foods ``columns`` (sorted)."""
+        n = min(k, len(columns))
+        step = max(1, CHUNK_CELLS // max(1, len(columns)))
+        for start in range(0, len(pairs) if n else 0, step):
+            chunk = pairs[start:start + step]
+            rows, grams = pair_row[chunk], pair_grams[chunk]
+            per_kcal = kcal_per_gram[columns]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if by == "grams":
+                    swap_grams = np.broadcast_to(grams[:, None], (len(rows), len(columns)))
+                else:
+                    swap_grams = (grams * kcal_per_gram[rows])[:, None] / per_kcal[None, :]
+                kcal = swap_grams * per_kcal[None, :]
+                kcal += base_kcal[chunk, None]
+                score = swap_grams * density[columns][None, :]
+                score += base_sum[chunk, None]
+                score /= kcal
+                score *= 1000
+            invalid = kcal <= 0
+            invalid |= ~has_energy[columns][None, :]
+            invalid |= ~(swap_grams > 0) if by == "kcal" else ~(grams > 0)[:, None]
+            if by == "kcal":
+                invalid |= ~np.isfinite(swap_grams)
+            own = np.searchsorted(columns, rows)
+            inside = own < len(columns)
+            inside[inside] = columns[own[inside]] == rows[inside]
+            invalid[np.flatnonzero(inside), own[inside]] = True
+            score[invalid] = -np.inf
+
+            # Top n per row, then coverage for just those (rows x n x nutrients).
+            top = np.argpartition(-score, n - 1, axis=1)[:, :n]
+            top_score = np.take_along_axis(score, top, axis=1)
+            # Rows with more foods tied at the n-th score (identical DB rows)
+            # pick among all of them in the final (score, coverage, id) order.
+            kth = top_score.min(axis=1)
+            ties = np.isfinite(kth) & ((score >= kth[:, None]).sum(axis=1) > n)
+            for r in np.flatnonzero(ties):
+                tied = np.flatnonzero(score[r] >= kth[r])
+                fractions = base[chunk[r]] + swap_grams[r, tied][:, None] * per_gram[columns[tied]]
+                coverage = np.minimum(fractions, 1.0).mean(axis=1) * 100 if cols else np.zeros(len(tied))
+                top[r] = tied[np.lexsort((tied, -coverage, -score[r, tied]))[:n]]
+                top_score[r] = score[r, top[r]]
+            top_grams = np.take_along_axis(swap_grams, top, axis=1)
+            top = columns[top]
+            fractions = base[chunk][:, None, :] + top_grams[:, :, None] * per_gram[top]
+            coverage = np.minimum(fractions, 1.0).mean(axis=2) * 100 if cols else np.zeros(top.shape)
+            order = np.lexsort((top, -coverage, -top_score), axis=1)
+            cand[chunk, :n] = np.take_along_axis(top, order, axis=1)
+            cand_grams[chunk, :n] = np.take_along_axis(top_grams, order, axis=1)
+            cand_score[chunk, :n] = np.take_along_axis(top_score, order, axis=1)
+            cand_coverage[chunk, :n] = np.take_along_axis(coverage, order, axis=1)
+
+    if same_category:
+        # Each category's ingredients only against that category's foods.
+        _, category = np.unique(np.asarray(foods.categories), return_inverse=True)
+        order = np.argsort(category, kind="stable")
+        bounds = np.searchsorted(category[order], np.arange(category.max() + 2)) if len(foods) else [0]
+        for c in np.unique(category[pair_row]):
+            rank(np.flatnonzero(category[pair_row] == c), order[bounds[c]:bounds[c + 1]])
+    else:
+        rank(np.arange(len(pair_row)), np.arange(len(foods)))
+
+    found = np.isfinite(cand_score)
+    columns = [
+        np.round(x, 1).tolist() for x in (
+            cand_grams, np.where(found, cand_score, 0.0),
+            np.where(found, cand_score - old_score[:, None], 0.0), cand_coverage - old_coverage[:, None],
+        )
+    ]
+    result: list[list[list[dict]]] = [[[] for _ in ingredients] for ingredients in meals]
+    ids, names = foods.food_ids, foods.display_names
+    for m, pos, *row in zip(pair_meal.tolist(), pair_pos, cand.tolist(), *columns, found.tolist()):
+        result[m][pos] = [
+            {"food": ids[c], "name": names[c], "grams": g, "score": sc, "scoreDelta": sd, "coverageDelta": cd}
+            for c, g, sc, sd, cd, ok in zip(*row) if ok
+        ]
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    import build
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("meals", nargs="*", metavar="MEAL",
+                        help="meal file stems or paths, e.g. monday_morning_1 (default: every meal)")
+    parser.add_argument("--by", choices=MODES, default="grams",
+                        help="swap at the same grams or at the same calories (default: grams)")
+    parser.add_argument("--same-category", action="store_true",
+                        help="only consider foods of the ingredient's food_category")
+    parser.add_argument("-k", type=int, default=TOP_K, help=f"swaps per ingredient (default: {TOP_K})")
+    parser.add_argument("--json", type=Path, help="also write {meal: {ingredient: swaps}} to this file")
+    args = parser.parse_args(argv)
+
+    foods = build.ensure_food_db()
+    meal_data, _ = build.load_meals()
+    drv = {k: v["drv"] for k, v in build.DRV_DB.items()}
+    wanted = {Path(m).stem for m in args.meals}
+    items = {
+        f"{day}_{meal}_{version}": item
+        for day, slots in meal_data.items()
+        for meal, versions in slots.items()
+        for version, item in versions.items()
+        if not wanted or f"{day}_{meal}_{version}" in wanted
+    }
+    unknown = wanted - set(items)
+    if unknown:
+        parser.error(f"unknown meals: {', '.join(sorted(unknown))}")
+
+    meals = [[(i["quantity"], i["foodName"]) for i in item["ingredients"]] for item in items.values()]
+    swaps = rank_swaps(foods, meals, build.MICRONUTRIENTS, drv, args.by, args.same_category, args.k)
+    report: dict = {}
+    for (stem, item), ingredients, per_ingredient in zip(items.items(), meals, swaps):
+        print(f"{stem}  {item['title']}")
+        for (qty, fid), options in zip(ingredients, per_ingredient):
+            report.setdefault(stem, {})[fid] = options
+            hint = ", ".join(
+                f"{s['food']} {s['grams']:g}g ({s['scoreDelta']:+.1f} score, {s['coverageDelta']:+.1f}% DRV)"
+                for s in options
+            )
+            print(f"  {f'{qty:g}g':>6} {fid:<24}{hint or '-'}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
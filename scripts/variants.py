@@ -0,0 +1,91 @@
+"""Plan variants for batch builds (``build.py --variants variants.json``).
+
+The config maps a variant name (its output directory under ``dist/``) to
+options; every option is optional and ``{}`` is the regular site::
+
+    {
+      "full": {},
+      "pescatarian": {"exclude": ["Meat & Offal"]},
+      "weekdays": {"days": ["monday", "tuesday", "wednesday", "thursday", "friday"]},
+      "iron-focus": {"drv": {"Iron": 18}, "kcal": 1800}
+    }
+
+``days``/``meals`` keep only those slots, ``exclude`` drops every meal
+version using a food id or food category from the list, ``drv`` overrides
+daily reference values per nutrient (scores, DRV percentages and the
+suggested plan follow them) and ``kcal`` sets the plan's daily budget.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+OPTIONS = {"days": list, "meals": list, "exclude": list, "drv": dict, "kcal": (int, float)}
+NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+RESERVED_NAMES = {"images", "data"}  # directories the regular site writes in dist/
+
+
+def load_variants(path: Path, days: list[str], meals: list[str]) -> dict[str, dict]:
+    """Read and validate a variants config; raises ``ValueError`` on bad input."""
+    try:
+        config = json.loads(path.read_text())
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"{path}: {exc}") from None
+    if not isinstance(config, dict) or not config:
+        raise ValueError(f"{path}: expected an object of {{variant name: options}}")
+    for name, options in config.items():
+        if not NAME_RE.fullmatch(name) or name in RESERVED_NAMES:
+            raise ValueError(f"{path}: variant name {name!r} is not a usable directory name")
+        if not isinstance(options, dict):
+            raise ValueError(f"{path}: variant {name!r} must be an object")
+        for key, value in options.items():
+            if key not in OPTIONS:
+                raise ValueError(f"{path}: variant {name!r}: unknown option {key!r} "
+                                 f"(expected one of {', '.join(OPTIONS)})")
+            if not isinstance(value, OPTIONS[key]):
+                raise ValueError(f"{path}: variant {name!r}: {key!r} has the wrong type")
+        for key, known in (("days", days), ("meals", meals)):
+            unknown = set(options.get(key, ())) - set(known)
+            if unknown:
+                raise ValueError(f"{path}: variant {name!r}: unknown {key} {sorted(unknown)}")
+    return config
+
+
+def variant_key(options: dict) -> str:
+    return json.dumps(options, sort_keys=True, separators=(",", ":"))
+
+
+def select_meals(meal_data: dict, options: dict, days: list[str], meals: list[str], foods: dict) -> dict:
+    """The slots and meal versions of ``meal_data`` a variant keeps.
+
+    ``foods`` is the payload food table, used to look up each ingredient's
+    category. Order is kept and items are shared with ``meal_data``, not copied.
+    """
+    excluded = set(options.get("exclude", ()))
+    selected: dict = {}
+    for day, slots in meal_data.items():
+        if day not in days:
+            continue
+        for meal, versions in slots.items():
+            if meal not in meals:
+                continue
+            for version, item in versions.items():
+                if excluded and any(
+                    i["foodName"] in excluded or foods.get(i["foodName"], {}).get("category") in excluded
+                    for i in item["ingredients"]
+                ):
+                    continue
+                selected.setdefault(day, {}).setdefault(meal, {})[version] = item
+    return selected
+
+
+def variant_drv(drv: dict, options: dict) -> dict:
+    """``drv`` with the variant's overrides applied; raises ``ValueError`` for unknown nutrients."""
+    overrides = options.get("drv", {})
+    unknown = set(overrides) - set(drv)
+    if unknown:
+        raise ValueError(f"unknown nutrients in drv overrides: {sorted(unknown)}")
+    return {name: {**meta, "drv": float(overrides[name])} if name in overrides else meta
+            for name, meta in drv.items()}
@@ -0,0 +1,173 @@
+"""Watch mode: rebuild in-process on source changes and serve ``dist/`` with live reload."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import traceback
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable
+
+RELOAD_PATH = "/__reload"
+# Injected into every index.html (the root site's and each variant's) by the
+# preview server only; the built files are untouched.
+# The dev page drops any service worker so reloads never come from a stale cache.
+RELOAD_SNIPPET = f"""<script>
+if ('serviceWorker' in navigator) {{
+  navigator.serviceWorker.getRegistrations().then((regs) => regs.forEach((r) => r.unregister()));
+}}
+new EventSource('{RELOAD_PATH}').onmessage = () => location.reload();
+</script>"""
+
+
+class Reloader:
+    """Build generation counter that SSE clients block on."""
+
+    def __init__(self) -> None:
+        self.generation = 0
+        self._cond = threading.Condition()
+
+    def bump(self) -> None:
+        with self._cond:
+            self.generation += 1
+            self._cond.notify_all()
+
+    def wait(self, seen: int, timeout: float) -> int:
+        with self._cond:
+            self._cond.wait_for(lambda: self.generation != seen, timeout)
+            return self.generation
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    reloader: Reloader
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def end_headers(self) -> None:
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == RELOAD_PATH:
+            self._events()
+        elif path.endswith("/sw.js"):
+            self.send_error(404, "Service worker disabled in preview")
+        elif path.endswith(("/", "/index.html")):
+            self._index(Path(self.translate_path(path.removesuffix("index.html"))) / "index.html")
+        else:
+            super().do_GET()
+
+    def _index(self, page: Path) -> None:
+        try:
+            html = page.read_bytes()
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        body = html.replace(b"</body>", RELOAD_SNIPPET.encode() + b"\n</body>", 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _events(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        seen = self.reloader.generation
+        try:
+            while True:
+                current = self.reloader.wait(seen, timeout=15)
+                if current == seen:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    seen = current
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(directory: Path, port: int, reloader: Reloader) -> ThreadingHTTPServer:
+    handler = partial(type("Handler", (PreviewHandler,), {"reloader": reloader}),
+                      directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def snapshot(paths: Iterable[Path]) -> dict[Path, tuple[int, int]]:
+    state = {}
+    for p in paths:
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        state[p] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def listing(watched: Callable[[], Iterable[Path]]) -> tuple[list[Path], dict[Path, tuple[int, int]]]:
+    """The watched files and a snapshot of the directories holding them."""
+    files = list(watched())
+    return files, snapshot({p.parent for p in files})
+
+
+def watch(
+    rebuild: Callable[[], object],
+    watched: Callable[[], Iterable[Path]],
+    directory: Path,
+    port: int | None = None,
+    interval: float = 0.3,
+) -> None:
+    """Rebuild whenever a watched file changes; optionally serve ``directory``.
+
+    ``rebuild`` runs in this process, so whatever it keeps in memory (food
+    DB, parsed meals) survives between rebuilds. Each poll only stats the
+    watched files and their directories; ``watched`` is re-evaluated when a
+    directory changes, so new and deleted files are noticed too. A failed
+    rebuild, including one that exits (``--strict``, a bad variant config),
+    is reported and the watcher waits for the next change.
+    """
+    def attempt() -> bool:
+        try:
+            rebuild()
+        except SystemExit as exc:
+            print(f"Build failed: {exc}", file=sys.stderr)
+            return False
+        except Exception:
+            traceback.print_exc()
+            return False
+        return True
+
+    reloader = Reloader()
+    attempt()
+    if port is not None:
+        server = serve(directory, port, reloader)
+        print(f"Serving {directory} at http://127.0.0.1:{server.server_address[1]}/")
+    print("Watching for changes (Ctrl+C to stop)")
+
+    files, dirs = listing(watched)
+    state = snapshot(files)
+    try:
+        while True:
+            time.sleep(interval)
+            if snapshot(dirs) != dirs:
+                files, dirs = listing(watched)
+            current = snapshot(files)
+            if current == state:
+                continue
+            state = current
+            started = time.perf_counter()
+            if not attempt():
+                continue
+            print(f"Rebuilt in {(time.perf_counter() - started) * 1000:.0f} ms")
+            reloader.bump()
+    except KeyboardInterrupt:
+        pass
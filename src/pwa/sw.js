@@ -1,24 +1,81 @@
-const CACHE = '__CACHE_VERSION__';
+// PRECACHE_MANIFEST ({url: content hash}) is prepended by the build.
+//
+// Precached responses are stored under `<url>?__rev=<hash>`, so an entry
+// whose hash did not change between builds is already in the cache and is
+// not downloaded again; only new or changed files are fetched on install.
+//
+// Cache names end in the registration scope: the sites of several plan
+// variants (dist/<variant>/) share an origin but never touch each other's caches.
+const SCOPE = self.registration.scope;
+const PRECACHE = `mealplanner-precache:${SCOPE}`;
+const RUNTIME = `mealplanner-runtime:${SCOPE}`;
+
+function ownedCache(name) {
+  if (!name.startsWith('mealplanner-')) return false;
+  const colon = name.indexOf(':');
+  // Names without a scope come from builds before scoped caches; none are in use now.
+  return colon < 0 || name.slice(colon + 1) === SCOPE;
+}
+
+function precacheKey(url, rev) {
+  const key = new URL(url, self.location);
+  key.searchParams.set('__rev', rev);
+  return key.href;
+}
+
+// Request URL -> cache key for every precached file of this build.
+const PRECACHE_KEYS = new Map(
+  Object.entries(PRECACHE_MANIFEST).map(([url, rev]) => [new URL(url, self.location).href, precacheKey(url, rev)])
+);
+const INDEX_URL = new URL('./index.html', self.location).href;
+const SCOPE_URL = new URL('./', self.location).href;
 
 self.addEventListener('install', (event) => {
-  event.waitUntil(
-    caches.open(CACHE).then((cache) => cache.addAll(PRECACHE_URLS))
-  );
+  event.waitUntil((async () => {
+    const cache = await caches.open(PRECACHE);
+    const cached = new Set((await cache.keys()).map((request) => request.url));
+    await Promise.all([...PRECACHE_KEYS].map(async ([url, key]) => {
+      if (cached.has(key)) return;
+      const response = await fetch(url, { cache: 'no-cache' });
+      if (!response.ok) throw new Error(`Precache of ${url} failed: ${response.status}`);
+      await cache.put(key, response);
+    }));
+  })());
   self.skipWaiting();
 });
 
 self.addEventListener('activate', (event) => {
-  event.waitUntil(
-    caches.keys().then((keys) =>
-      Promise.all(keys.filter((k) => k !== CACHE).map((k) => caches.delete(k)))
-    ).then(() => self.clients.claim())
-  );
+  const current = new Set(PRECACHE_KEYS.values());
+  event.waitUntil((async () => {
+    // Drop this scope's other caches (and unscoped ones from older builds) wholesale.
+    const names = await caches.keys();
+    await Promise.all(names.filter((n) => ownedCache(n) && n !== PRECACHE && n !== RUNTIME)
+      .map((n) => caches.delete(n)));
+    const cache = await caches.open(PRECACHE);
+    const keys = await cache.keys();
+    await Promise.all(keys.filter((request) => !current.has(request.url)).map((request) => cache.delete(request)));
+    await self.clients.claim();
+  })());
 });
 
 function isVersionCheck(url) {
   return url.pathname.endsWith('/version.json');
 }
 
+// Hashed URLs (`?v=<hash>`) replace each other: keep only the newest per path.
+async function putRuntime(request, response) {
+  const cache = await caches.open(RUNTIME);
+  const url = new URL(request.url);
+  if (url.searchParams.has('v')) {
+    const keys = await cache.keys();
+    await Promise.all(keys.filter((key) => {
+      const old = new URL(key.url);
+      return old.pathname === url.pathname && old.search !== url.search;
+    }).map((key) => cache.delete(key)));
+  }
+  await cache.put(request, response);
+}
+
 self.addEventListener('fetch', (event) => {
   if (event.request.method !== 'GET') return;
 
@@ -30,8 +87,7 @@ self.addEventListener('fetch', (event) => {
       fetch(event.request)
         .then((response) => {
           if (response && response.status === 200) {
-            const copy = response.clone();
-            caches.open(CACHE).then((cache) => cache.put(event.request, copy));
+            putRuntime(event.request, response.clone());
           }
           return response;
         })
@@ -40,14 +96,23 @@ self.addEventListener('fetch', (event) => {
     return;
   }
 
+  const key = PRECACHE_KEYS.get(url.href === SCOPE_URL ? INDEX_URL : url.href);
+  if (key) {
+    event.respondWith(
+      caches.open(PRECACHE)
+        .then((cache) => cache.match(key))
+        .then((cached) => cached || fetch(event.request))
+    );
+    return;
+  }
+
   // Cache-first: serve cached assets immediately for fast loads.
   event.respondWith(
     caches.match(event.request).then((cached) => {
       if (cached) return cached;
       return fetch(event.request).then((response) => {
         if (response && response.status === 200 && response.type !== 'opaque') {
-          const copy = response.clone();
-          caches.open(CACHE).then((cache) => cache.put(event.request, copy));
+          putRuntime(event.request, response.clone());
         }
         return response;
       });
@@ -62,13 +62,116 @@
     return DATA.foods[id];
   }
 
+  function base64Bytes(text) {
+    const bin = atob(text);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return bytes;
+  }
+
+  // Columnar nutrient block: row-major float32 values plus a presence bitset,
+  // one row per id and one column per entry of DATA.nutrientNames.
+  function decodeFoodNutrients(block) {
+    const names = DATA.nutrientNames;
+    const values = new Float32Array(base64Bytes(block.values).buffer);
+    const mask = base64Bytes(block.mask);
+    const out = {};
+    block.ids.forEach((id, row) => {
+      const nutrients = {};
+      for (let col = 0; col < names.length; col++) {
+        const bit = row * names.length + col;
+        if (mask[bit >> 3] & (1 << (bit & 7))) nutrients[names[col]] = values[bit];
+      }
+      out[id] = nutrients;
+    });
+    return out;
+  }
+
+  function attachNutrients(block) {
+    for (const [id, nutrients] of Object.entries(decodeFoodNutrients(block))) {
+      if (DATA.foods[id]) DATA.foods[id].nutrients = nutrients;
+    }
+  }
+
+  if (DATA.foodNutrients) attachNutrients(DATA.foodNutrients);
+
+  // Per-serving nutrient totals and DRV percentages for every meal, plus each
+  // ingredient's share (uint16, in 1/65535 steps) of its meal's totals,
+  // precomputed by the build so selection changes only sum a few vectors.
+  const mealVectors = new Map();
+
+  function decodeMealNutrients(block) {
+    const n = DATA.nutrientNames.length;
+    const totals = new Float32Array(base64Bytes(block.values).buffer);
+    const percents = new Float32Array(base64Bytes(block.percent).buffer);
+    const mask = base64Bytes(block.mask);
+    const shares = new Uint16Array(base64Bytes(block.shares).buffer);
+    let shareRow = 0;
+    block.ids.forEach((key, row) => {
+      const [day, meal, version] = key.split('-');
+      const count = DATA.mealData[day][meal][version].ingredients.length;
+      const present = [];
+      for (let col = 0; col < n; col++) {
+        const bit = row * n + col;
+        present.push((mask[bit >> 3] & (1 << (bit & 7))) !== 0);
+      }
+      mealVectors.set(key, {
+        totals: totals.subarray(row * n, (row + 1) * n),
+        percents: percents.subarray(row * n, (row + 1) * n),
+        present,
+        shares: shares.subarray(shareRow * n, (shareRow + count) * n),
+      });
+      shareRow += count;
+    });
+  }
+
+  decodeMealNutrients(DATA.mealNutrients);
+
+  const shardRequests = new Map();
+
+  function loadShard(url) {
+    if (!shardRequests.has(url)) {
+      const request = fetch(url)
+        .then((res) => {
+          if (!res.ok) throw new Error(`${url}: HTTP ${res.status}`);
+          return res.json();
+        })
+        .catch((err) => {
+          shardRequests.delete(url);
+          throw err;
+        });
+      shardRequests.set(url, request);
+    }
+    return shardRequests.get(url);
+  }
+
+  // Builds made with --split-data inline only the card index; recipe bodies
+  // and food nutrients are fetched from hashed JSON shards on first use.
+  async function ensureRecipe(day, meal, version) {
+    const versions = DATA.mealData[day][meal];
+    if (versions[version].contentHtml != null) return versions[version];
+    const shard = await loadShard(DATA.shards.recipes[`${day}/${meal}`]);
+    for (const [v, fields] of Object.entries(shard)) {
+      if (versions[v]) Object.assign(versions[v], fields);
+    }
+    return versions[version];
+  }
+
+  async function ensureFoods(ids) {
+    const urls = new Set();
+    for (const id of ids) {
+      const food = getFood(id);
+      if (food && !food.nutrients) urls.add(DATA.shards.foods[food.category]);
+    }
+    await Promise.all([...urls].map(async (url) => attachNutrients(await loadShard(url))));
+  }
+
+  // Ingredient spans come from INGREDIENT_HTML in scripts/recipe.py; both
+  // quantities of a span are rewritten by one match.
   function scaleContent(html, factor) {
-    return html.replace(/data-qty="([\d.]+)"/g, (_, q) => {
+    return html.replace(/data-qty="([\d.]+)"(.*?)<span class="qty">[\d.]+g<\/span>/g, (_, q, between) => {
       const scaled = (parseFloat(q) * factor).toFixed(2).replace(/\.00$/, '');
-      return `data-qty="${scaled}"`;
-    }).replace(/<span class="qty">([\d.]+)g<\/span>/g, (_, q) => {
-      const scaled = (parseFloat(q) * factor).toFixed(2).replace(/\.00$/, '');
-      return `<span class="qty">${scaled}g</span>`;
+      return `data-qty="${scaled}"${between}<span class="qty">${scaled}g</span>`;
     });
   }
 
@@ -76,16 +179,38 @@
     const agg = {};
     for (const { foodName, quantity } of foodList) {
       const food = getFood(foodName);
-      if (!food || !quantity) continue;
+      if (!food || !food.nutrients || !quantity) continue;
       const scale = quantity / 100;
       for (const [name, amount] of Object.entries(food.nutrients)) {
-        agg[name] = (agg[name] || 0) + amount * scale;
+        agg[name] = { total: (agg[name]?.total || 0) + amount * scale };
       }
     }
     return agg;
   }
 
-  function nutrientDrvDisplay(total, drv, unit) {
+  // `selection` is a list of { key, servings }; returns { name: { total, pct } }.
+  function aggregateMeals(selection) {
+    const names = DATA.nutrientNames;
+    const totals = new Float64Array(names.length);
+    const percents = new Float64Array(names.length);
+    const present = new Array(names.length).fill(false);
+    for (const { key, servings } of selection) {
+      const vec = mealVectors.get(key);
+      if (!vec || !servings) continue;
+      for (let j = 0; j < names.length; j++) {
+        totals[j] += vec.totals[j] * servings;
+        percents[j] += vec.percents[j] * servings;
+        present[j] ||= vec.present[j];
+      }
+    }
+    const agg = {};
+    names.forEach((name, j) => {
+      if (present[j]) agg[name] = { total: totals[j], pct: percents[j] };
+    });
+    return agg;
+  }
+
+  function nutrientDrvDisplay(total, drv, unit, precomputedPct) {
     if (!drv || drv <= 0) {
       return {
         metWidth: 0,
@@ -96,7 +221,7 @@
       };
     }
 
-    const pct = (total / drv) * 100;
+    const pct = precomputedPct ?? (total / drv) * 100;
     const metWidth = Math.min(pct, 100);
     const excessWidth = pct > 100 ? Math.min(pct - 100, 100) : 0;
     const roundedPct = Math.round(pct);
@@ -125,14 +250,6 @@
     </div>`;
   }
 
-  function nutrientAmount(foodName, quantity, nutrientName) {
-    const food = getFood(foodName);
-    if (!food || !quantity) return 0;
-    const per100 = food.nutrients[nutrientName];
-    if (per100 == null) return 0;
-    return per100 * quantity / 100;
-  }
-
   function formatMealSource(source) {
     const day = source.day.charAt(0).toUpperCase() + source.day.slice(1);
     const slot = MEAL_SLOT_LABELS[source.meal] || source.meal;
@@ -140,20 +257,50 @@
     return `${source.mealTitle} · ${day} ${slot}${servings}`;
   }
 
+  // `sources` is a list of selected meals ({ key, day, meal, version, mealTitle, servings });
+  // contributions come from the precomputed ingredient shares.
+  function mealContributors(sources, nutrientName) {
+    const n = DATA.nutrientNames.length;
+    const col = DATA.nutrientNames.indexOf(nutrientName);
+    const contributors = [];
+    for (const source of sources) {
+      const vec = mealVectors.get(source.key);
+      if (!vec || col < 0) continue;
+      const item = DATA.mealData[source.day][source.meal][source.version];
+      item.ingredients.forEach((ing, i) => {
+        const share = vec.shares[i * n + col];
+        if (!share) return;
+        contributors.push({
+          ...source,
+          foodName: ing.foodName,
+          quantity: ing.quantity * source.servings,
+          amount: (share / 65535) * vec.totals[col] * source.servings,
+          displayName: getFood(ing.foodName)?.display_name || ing.foodName,
+        });
+      });
+    }
+    return contributors.sort((a, b) => b.amount - a.amount);
+  }
+
+  // The selection's total from the encoded meal totals, not the sum of the
+  // rounded per-ingredient shares.
+  function nutrientTotal(sources, nutrientName) {
+    const col = DATA.nutrientNames.indexOf(nutrientName);
+    let total = 0;
+    for (const source of sources) {
+      const vec = mealVectors.get(source.key);
+      if (vec && col >= 0) total += vec.totals[col] * source.servings;
+    }
+    return total;
+  }
+
   function renderNutrientContributors(container, nutrientName, sources, onBack, hint) {
     const meta = DATA.drv[nutrientName];
     if (!meta) return;
 
-    const contributors = sources
-      .map((source) => ({
-        ...source,
-        amount: nutrientAmount(source.foodName, source.quantity, nutrientName),
-        displayName: getFood(source.foodName)?.display_name || source.foodName,
-      }))
-      .filter((entry) => entry.amount > 0)
-      .sort((a, b) => b.amount - a.amount);
+    const contributors = mealContributors(sources, nutrientName);
 
-    const total = contributors.reduce((sum, entry) => sum + entry.amount, 0);
+    const total = nutrientTotal(sources, nutrientName);
     let html = '';
     if (onBack) {
       html += `<button type="button" class="nutrient-back">← All nutrients</button>`;
@@ -235,7 +382,7 @@
     });
     renderNutrientPanel(
       content.querySelector('.popup-ingredient-nutrients'),
-      [{ foodName, quantity }],
+      aggregateNutrients([{ foodName, quantity }]),
       title,
       { embedded: true },
     );
@@ -245,15 +392,15 @@
     };
   }
 
-  function renderNutrientPanel(container, foodList, title, options) {
+  // `agg` maps nutrient names to { total, pct? }, from aggregateMeals() or aggregateNutrients().
+  function renderNutrientPanel(container, agg, title, options) {
     const opts = options || {};
-    const agg = aggregateNutrients(foodList);
     const byCategory = {};
-    for (const [name, total] of Object.entries(agg)) {
+    for (const [name, { total, pct }] of Object.entries(agg)) {
       const meta = DATA.drv[name];
       if (!meta) continue;
       const cat = meta.category || 'Other';
-      (byCategory[cat] = byCategory[cat] || []).push({ name, total, ...meta });
+      (byCategory[cat] = byCategory[cat] || []).push({ name, total, pct, ...meta });
     }
 
     let html = '';
@@ -269,7 +416,7 @@
       items.sort((a, b) => (a.order || 0) - (b.order || 0));
       html += `<div class="category-section"><div class="category-title">${cat}</div>`;
       for (const n of items) {
-        const drv = nutrientDrvDisplay(n.total, n.drv, n.unit);
+        const drv = nutrientDrvDisplay(n.total, n.drv, n.unit, n.pct);
         const nameClass = opts.interactive ? 'nutrient-name clickable' : 'nutrient-name';
         html += `<div class="${drv.itemClass}">
           <span class="${nameClass}" data-nutrient="${n.name}">${n.name}</span>
@@ -297,8 +444,41 @@
     }
   }
 
-  function openRecipe(day, meal, version) {
-    const item = DATA.mealData[day][meal][version];
+  // item.swaps (from scripts/substitutes.py) holds, per ingredient, the
+  // same-category foods that would most raise the meal's density score.
+  function swapsHtml(item) {
+    const rows = (item.swaps || []).map((swaps, i) => {
+      if (!swaps.length) return '';
+      const ing = item.ingredients[i];
+      const options = swaps.map(([food, score, coverage]) => `${DATA.swapNames[food] || food} <span class="swap-gain">(+${score} score, ${coverage >= 0 ? '+' : ''}${coverage}% DRV)</span>`);
+      return `<li>${getFood(ing.foodName)?.display_name || ing.foodName} → ${options.join(', ')}</li>`;
+    }).join('');
+    return rows ? `<div class="popup-swaps"><h3>Denser swaps</h3><ul>${rows}</ul></div>` : '';
+  }
+
+  // item.similar (from scripts/similarity.py): [mealKey, similarity %] of the
+  // closest meals, with a trailing 1 for near-duplicates.
+  function similarHtml(item) {
+    const rows = (item.similar || []).map(([key, pct, duplicate]) => {
+      const [day, meal, version] = key.split('-');
+      const other = DATA.mealData[day]?.[meal]?.[version];
+      if (!other) return '';
+      const source = formatMealSource({ day, meal, mealTitle: other.title, servings: 1 });
+      const note = `${pct}% similar${duplicate ? ' · near-duplicate' : ''}`;
+      return `<li><button type="button" class="similar-meal" data-key="${key}">${source}</button> <span class="similar-note">${note}</span></li>`;
+    }).join('');
+    return rows ? `<div class="popup-similar"><h3>Similar meals</h3><ul>${rows}</ul></div>` : '';
+  }
+
+  async function openRecipe(day, meal, version) {
+    let item;
+    try {
+      item = await ensureRecipe(day, meal, version);
+      await ensureFoods(item.ingredients.map((ing) => ing.foodName));
+    } catch (err) {
+      console.warn('Could not load recipe:', err);
+      return;
+    }
     const key = mealKey(day, meal, version);
     let people = Math.max(1, mealQuantities.get(key) || 1);
     const popup = document.getElementById('popup');
@@ -319,26 +499,16 @@
           </div>
         </div>
         <div class="popup-body">${scaled}</div>
+        ${swapsHtml(item)}
+        ${similarHtml(item)}
         <div class="popup-nutrients" id="popup-nutrients"></div>`;
 
       content.querySelector('.popup-close').addEventListener('click', closePopups);
 
-      const foodList = item.ingredients.map((ing) => ({
-        foodName: ing.foodName,
-        quantity: ing.quantity,
-      }));
-      const sources = item.ingredients.map((ing) => ({
-        foodName: ing.foodName,
-        quantity: ing.quantity,
-        day,
-        meal,
-        version,
-        mealTitle: item.title,
-        servings: 1,
-      }));
+      const sources = [{ key, day, meal, version, mealTitle: item.title, servings: 1 }];
       renderNutrientPanel(
         content.querySelector('#popup-nutrients'),
-        foodList,
+        aggregateMeals(sources),
         'Nutrition per person',
         {
           embedded: true,
@@ -360,6 +530,10 @@
         if (v >= 1) { people = v; mealQuantities.set(key, people); saveState(); refreshCards(); updateAggregations(); render(); }
       };
 
+      content.querySelectorAll('.similar-meal').forEach((el) => {
+        el.onclick = () => openRecipe(...el.dataset.key.split('-'));
+      });
+
       content.querySelectorAll('.ingredient-link').forEach((el) => {
         el.onclick = (ev) => {
           ev.stopPropagation();
@@ -403,36 +577,23 @@
   }
 
   function updateAggregations() {
-    const allFoods = [];
     const sources = [];
+    const totals = new Map();
     for (const [key, qty] of mealQuantities) {
       if (qty <= 0) continue;
       const [day, meal, version] = key.split('-');
       const item = DATA.mealData[day]?.[meal]?.[version];
       if (!item) continue;
+      sources.push({ key, day, meal, version, mealTitle: item.title, servings: qty });
       for (const ing of item.ingredients) {
-        const quantity = ing.quantity * qty;
-        allFoods.push({ foodName: ing.foodName, quantity });
-        sources.push({
-          foodName: ing.foodName,
-          quantity,
-          day,
-          meal,
-          version,
-          mealTitle: item.title,
-          servings: qty,
-        });
+        totals.set(ing.foodName, (totals.get(ing.foodName) || 0) + ing.quantity * qty);
       }
     }
 
     const shopEl = document.getElementById('shopping-list');
-    if (allFoods.length === 0) {
+    if (sources.length === 0) {
       shopEl.innerHTML = '<p class="empty-hint">Select meals above to build your shopping list.</p>';
     } else {
-      const totals = new Map();
-      for (const { foodName, quantity } of allFoods) {
-        totals.set(foodName, (totals.get(foodName) || 0) + quantity);
-      }
       const byCat = {};
       for (const [id, total] of totals) {
         const cat = getFood(id)?.category || 'Other';
@@ -449,9 +610,15 @@
       html += '</div></div>';
       shopEl.innerHTML = html;
       shopEl.querySelectorAll('.ingredient-link').forEach((el) => {
-        el.onclick = () => {
+        el.onclick = async () => {
           const food = el.dataset.food;
           const qty = parseFloat(el.dataset.qty);
+          try {
+            await ensureFoods([food]);
+          } catch (err) {
+            console.warn('Could not load nutrients:', err);
+            return;
+          }
           const popup = document.getElementById('popup');
           const content = document.getElementById('popup-content');
           popupReturnFn = null;
@@ -461,7 +628,7 @@
           content.querySelector('.popup-close').addEventListener('click', closePopups);
           renderNutrientPanel(
             content.querySelector('.popup-ingredient-nutrients'),
-            [{ foodName: food, quantity: qty }],
+            aggregateNutrients([{ foodName: food, quantity: qty }]),
             `${qty}g of ${getFood(food)?.display_name || food}`,
             { embedded: true },
           );
@@ -472,10 +639,10 @@
     }
 
     const nutEl = document.getElementById('nutrient-aggregate');
-    if (allFoods.length === 0) {
+    if (sources.length === 0) {
       nutEl.innerHTML = '<p class="empty-hint">Select meals to see aggregated nutrients.</p>';
     } else {
-      renderNutrientPanel(nutEl, allFoods, 'Nutrients for selected plan', {
+      renderNutrientPanel(nutEl, aggregateMeals(sources), 'Nutrients for selected plan', {
         interactive: true,
         sources,
       });
@@ -486,6 +653,19 @@
     saveState();
   }
 
+  function applySuggestedPlan() {
+    const plan = DATA.suggestedPlan?.plan;
+    if (!plan) return;
+    for (const key of mealQuantities.keys()) mealQuantities.set(key, 0);
+    for (const [day, slots] of Object.entries(plan)) {
+      for (const [meal, version] of Object.entries(slots)) {
+        mealQuantities.set(mealKey(day, meal, version), 1);
+      }
+    }
+    refreshCards();
+    updateAggregations();
+  }
+
   function init() {
     loadState();
     refreshCards();
@@ -524,6 +704,7 @@
       });
     });
 
+    document.getElementById('suggest-plan')?.addEventListener('click', applySuggestedPlan);
     document.getElementById('overlay').addEventListener('click', handleOverlayClick);
 
     document.querySelectorAll('.tab-button').forEach((btn) => {
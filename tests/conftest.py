@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+NUTRIENTS = [
+    # name, unit, category, drv, order
+    ("Energy", "kcal", "Energy", 2000.0, 0),
+    ("Protein", "g", "Macronutrients", 50.0, 1),
+    ("Iron", "mg", "Minerals", 10.0, 2),
+    ("Vitamin C", "mg", "Vitamins", 100.0, 3),
+]
+FOODS = [
+    # id, category, Energy, Protein, Iron, Vitamin C (per 100 g; "" is missing)
+    ("yogurt", "Dairy & Eggs", 60, 10, 0.1, 1),
+    ("skyr", "Dairy & Eggs", 60, 10, 0.1, 1),  # same row as yogurt: ties
+    ("cheddar", "Dairy & Eggs", 400, 25, 0.2, 0),
+    ("walnut", "Nuts & Seeds", 650, 15, 3, 1),
+    ("spinach", "Vegetables", 23, 3, 3, 30),
+    ("kale", "Vegetables", 50, 4, 1.5, 120),
+    ("oats", "Grains", 380, 13, 4, ""),
+]
+MEALS = {
+    "monday_morning_1": [(150, "yogurt"), (30, "walnut"), (40, "oats")],
+    "monday_morning_2": [(160, "yogurt"), (30, "walnut"), (40, "oats")],
+    "monday_midday_1": [(100, "spinach"), (80, "cheddar")],
+    "monday_midday_2": [(120, "kale"), (60, "oats"), (20, "walnut")],
+}
+
+
+def write_csvs(data_dir: Path, foods=FOODS) -> None:
+    data_dir.mkdir(parents=True, exist_ok=True)
+    names = [name for name, *_ in NUTRIENTS]
+    rows = ["foodName,display_name,food_category," + ",".join(names)]
+    rows += [f"{fid},{fid.title()},{category}," + ",".join(map(str, values))
+             for fid, category, *values in foods]
+    (data_dir / "fooddata.csv").write_text("\n".join(rows) + "\n")
+    rows = ["nutrient_id,nutrientName,unit_name,nutrient_category,drv,nutrient_order"]
+    rows += [f"{1000 + order},{name},{unit},{category},{drv},{order}"
+             for name, unit, category, drv, order in NUTRIENTS]
+    (data_dir / "nutrients.csv").write_text("\n".join(rows) + "\n")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_csvs(tmp_path / "data")
+    return tmp_path / "data"
+
+
+@pytest.fixture
+def food_db(data_dir):
+    import fooddb
+
+    return fooddb.read_csv(data_dir)
+
+
+@pytest.fixture
+def foods(food_db):
+    return food_db[0]
+
+
+@pytest.fixture
+def drv(food_db):
+    return {name: meta["drv"] for name, meta in food_db[1].items()}
+
+
+@pytest.fixture
+def scored():
+    """The nutrients the density score and plans use in these tests."""
+    return ["Protein", "Iron", "Vitamin C"]
+
+
+@pytest.fixture
+def meal_data():
+    """``MEALS`` in the page payload's ``{day: {meal: {version: item}}}`` layout."""
+    data: dict = {}
+    for stem, ingredients in MEALS.items():
+        day, meal, version = stem.split("_")
+        data.setdefault(day, {}).setdefault(meal, {})[version] = {
+            "title": stem,
+            "ingredients": [{"quantity": qty, "foodName": fid} for qty, fid in ingredients],
+        }
+    return data
@@ -0,0 +1,84 @@
+import json
+
+import build
+from buildcache import BuildCache, combine
+from conftest import write_csvs
+
+
+def test_get_needs_the_same_key(tmp_path):
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    cache.put("meals", "a", "k1", {"title": "A"})
+    cache.save()
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    assert cache.get("meals", "a", "k1") == {"title": "A"}
+    assert cache.get("meals", "a", "k2") is None
+    assert BuildCache(None).get("meals", "a", "k1") is None
+
+
+def test_digest_follows_content(tmp_path):
+    path = tmp_path / "meal.md"
+    path.write_text("one")
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    first = cache.digest(path)
+    path.write_text("two")
+    assert cache.digest(path) != first
+    assert combine("a", "b") != combine("b", "a")
+
+
+def test_save_keeps_untouched_entries_while_their_inputs_exist(tmp_path):
+    kept, deleted = tmp_path / "kept.md", tmp_path / "deleted.md"
+    kept.write_text("k")
+    deleted.write_text("d")
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    for path in (kept, deleted):
+        cache.digest(path)
+        cache.put("recipes", path.name, "key", path.stem, inputs=[path])
+    cache.put("build", "page", "key", "no inputs")
+    cache.save()
+
+    # A later save that touches none of them prunes what can no longer be used.
+    deleted.unlink()
+    cache.save()
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    assert cache.get("recipes", "kept.md", "key") == "kept"
+    assert cache.get("recipes", "deleted.md", "key") is None
+    assert cache.get("build", "page", "key") is None
+    assert set(cache._data["files"]) == {"kept.md"}
+
+
+def test_text_blobs_live_outside_the_manifest(tmp_path):
+    (tmp_path / "a.md").write_text("a")
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    kept, dropped = cache.put_text("<p>kept</p>"), cache.put_text("<p>dropped</p>")
+    cache.put("meals", "a", "k", {"contentHtml": kept}, inputs=[tmp_path / "a.md"], blobs=[kept])
+    cache.put("meals", "b", "k", {"contentHtml": dropped}, blobs=[dropped])
+    cache.save()
+    assert "<p>" not in (tmp_path / "cache" / "manifest.json").read_text()
+
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    cache.save()  # "a" survives through its input, "b" and its blob do not
+    assert cache.get_text(kept) == "<p>kept</p>"
+    assert cache.get_text(dropped) is None
+    assert BuildCache(None).get_text(kept) is None
+
+
+def test_cached_meals_are_copies(tmp_path, monkeypatch):
+    write_csvs(tmp_path / "data")
+    (tmp_path / "meals").mkdir()
+    (tmp_path / "meals" / "monday_morning_1.md").write_text("# Bowl\n\nStir {150g {yogurt}} with {30g {walnut}}.\n")
+    for name, path in (("ROOT", tmp_path), ("MEALS_DIR", tmp_path / "meals"), ("DATA_DIR", tmp_path / "data")):
+        monkeypatch.setattr(build, name, path)
+    monkeypatch.setattr(build, "FOOD_DB", None)
+    monkeypatch.setattr(build, "DRV_DB", {})
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+
+    first = build.load_meals(cache)[0]["monday"]["morning"]["1"]
+    assert "stats" in first and "<p>" in first["contentHtml"]
+    first["stats"] = "changed by a later stage"
+    cache.save()
+    manifest = json.loads((tmp_path / "cache" / "manifest.json").read_text())
+    stored = manifest["sections"]["meals"]["monday_morning_1"]["value"]
+    assert stored["stats"] != first["stats"] and stored["contentHtml"] == cache.put_text(first["contentHtml"])
+
+    again = build.load_meals(BuildCache(tmp_path / "cache", root=tmp_path))[0]["monday"]["morning"]["1"]
+    assert again == {**first, "stats": stored["stats"]}
@@ -0,0 +1,96 @@
+import base64
+import json
+import os
+
+import numpy as np
+import pytest
+
+import fooddb
+from conftest import FOODS, MEALS, write_csvs
+
+
+def test_totals_sum_grams_times_per_100g(foods):
+    totals = foods.totals([MEALS["monday_midday_1"], [(50, "walnut")]])
+    protein = foods.column("Protein")
+    assert totals.shape == (2, len(foods.nutrients))
+    assert totals[0, protein] == pytest.approx(3 * 1.0 + 25 * 0.8)
+    assert totals[1, protein] == pytest.approx(7.5)
+
+
+def test_totals_skip_unknown_foods_and_missing_values(foods):
+    totals = foods.totals([[(100, "oats"), (500, "unobtainium")], []])
+    assert totals[0, foods.column("Vitamin C")] == 0
+    assert totals[0, foods.column("Energy")] == pytest.approx(380)
+    assert not totals[1].any()
+    assert np.isnan(foods.matrix[foods.food_index["oats"], foods.column("Vitamin C")])
+
+
+def test_meal_shares_rebuild_each_ingredient_amount(foods, drv):
+    names = ["Protein", "Iron", "Vitamin C"]
+    block = fooddb.encode_meal_nutrients(foods, MEALS, names, drv)
+
+    def decode(field, dtype):
+        return np.frombuffer(base64.b64decode(block[field]), dtype=dtype)
+
+    totals = decode("values", "<f4").reshape(len(MEALS), len(names))
+    shares = decode("shares", "<u2").reshape(-1, len(names)) / fooddb.SHARE_SCALE
+    assert block["ids"] == list(MEALS)
+    assert len(shares) == sum(map(len, MEALS.values()))
+    rows = iter(shares)
+    for meal, total in zip(MEALS.values(), totals):
+        for (grams, fid), share in zip(meal, rows):
+            for j, name in enumerate(names):
+                amount = grams * foods.get(fid)["nutrients"].get(name, 0) / 100
+                # 1/65535 steps: within 0.002% of the meal total (1/255 was 0.4%).
+                assert share[j] * total[j] == pytest.approx(amount, abs=total[j] * 1e-5 + 1e-6)
+
+
+def test_read_csv(food_db):
+    foods, drv = food_db
+    assert foods.food_ids == [fid for fid, *_ in FOODS]
+    assert foods.get("kale")["category"] == "Vegetables"
+    assert "Vitamin C" not in foods.get("oats")["nutrients"]
+    assert drv["Iron"] == {"unit": "mg", "category": "Minerals", "drv": 10.0, "order": 2}
+
+
+def test_load_writes_and_then_maps_the_sidecar(data_dir):
+    foods, drv = fooddb.load(data_dir)
+    assert (data_dir / "fooddata.npy").exists() and (data_dir / "fooddata.filled.npy").exists()
+    mapped, mapped_drv = fooddb.load(data_dir)
+    assert isinstance(mapped.filled, np.memmap)
+    assert mapped.food_ids == foods.food_ids and mapped_drv == drv
+    np.testing.assert_array_equal(mapped.filled, foods.filled)
+    np.testing.assert_array_equal(mapped.totals(MEALS.values()), foods.totals(MEALS.values()))
+
+
+def test_sidecar_is_rebuilt_when_the_csv_changes(data_dir):
+    fooddb.load(data_dir)
+    write_csvs(data_dir, FOODS + [("lentils", "Legumes", 116, 9, 3.3, 1.5)])
+    foods, _ = fooddb.load(data_dir)
+    assert "lentils" in foods
+    assert fooddb.load_sidecar(data_dir / "fooddata", [data_dir / "fooddata.csv", data_dir / "nutrients.csv"])
+
+
+def test_sidecar_survives_a_touch(data_dir):
+    sources = [data_dir / "fooddata.csv", data_dir / "nutrients.csv"]
+    fooddb.load(data_dir)
+    os.utime(sources[0], ns=(0, 0))
+    assert fooddb.load_sidecar(data_dir / "fooddata", sources) is not None
+    # The new stat is recorded, so the next check does not hash again.
+    assert json.loads((data_dir / "fooddata.meta.json").read_text())["state"]["fooddata.csv"][1] == 0
+
+
+@pytest.mark.parametrize("meta", ["[]", '{"format": 2}', "not json"])
+def test_malformed_sidecar_is_ignored(data_dir, meta):
+    sources = [data_dir / "fooddata.csv", data_dir / "nutrients.csv"]
+    fooddb.load(data_dir)
+    (data_dir / "fooddata.meta.json").write_text(meta)
+    assert fooddb.load_sidecar(data_dir / "fooddata", sources) is None
+    assert fooddb.load(data_dir)[0].food_ids == [fid for fid, *_ in FOODS]
+
+
+def test_sidecar_with_a_missing_matrix_is_ignored(data_dir):
+    sources = [data_dir / "fooddata.csv", data_dir / "nutrients.csv"]
+    fooddb.load(data_dir)
+    (data_dir / "fooddata.filled.npy").unlink()
+    assert fooddb.load_sidecar(data_dir / "fooddata", sources) is None
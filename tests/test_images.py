@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import images
+from buildcache import BuildCache
+from images import build_derivatives, sync_files, tree_files
+
+
+@pytest.fixture
+def src(tmp_path):
+    root = tmp_path / "src"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.jpg").write_bytes(b"a" * 100)
+    (root / "sub" / "b.jpg").write_bytes(b"b" * 100)
+    return root
+
+
+def test_sync_copies_then_skips_unchanged_files(src, tmp_path):
+    dst = tmp_path / "dst"
+    assert sync_files(tree_files(src), dst) == {"copied": 2, "unchanged": 0, "removed": 0}
+    assert (dst / "sub" / "b.jpg").read_bytes() == b"b" * 100
+    assert sync_files(tree_files(src), dst) == {"copied": 0, "unchanged": 2, "removed": 0}
+
+
+def test_sync_copies_changed_files_and_removes_deleted_ones(src, tmp_path):
+    dst = tmp_path / "dst"
+    sync_files(tree_files(src), dst)
+    (src / "a.jpg").write_bytes(b"c" * 100)  # same size, new content
+    os.utime(src / "a.jpg", ns=(0, 0))
+    (src / "sub" / "b.jpg").unlink()
+    (dst / "stray.txt").write_text("x")
+    assert sync_files(tree_files(src), dst) == {"copied": 1, "unchanged": 0, "removed": 2}
+    assert (dst / "a.jpg").read_bytes() == b"c" * 100
+    assert sorted(p.name for p in dst.rglob("*")) == ["a.jpg"]
+
+
+def test_same_content_with_a_new_mtime_is_not_copied(src, tmp_path):
+    dst = tmp_path / "dst"
+    sync_files(tree_files(src), dst)
+    os.utime(src / "a.jpg", ns=(0, 0))
+    assert sync_files(tree_files(src), dst)["unchanged"] == 2
+    assert (dst / "a.jpg").stat().st_mtime_ns == 0
+
+
+def test_hardlink_mode_never_writes_through_a_link(src, tmp_path):
+    dst = tmp_path / "dst"
+    sync_files(tree_files(src), dst, "hardlink")
+    assert os.path.samefile(src / "a.jpg", dst / "a.jpg")
+    (src / "a.jpg").unlink()
+    (src / "a.jpg").write_bytes(b"new")
+    sync_files(tree_files(src), dst, "hardlink")
+    assert (dst / "a.jpg").read_bytes() == b"new"
+    with pytest.raises(ValueError, match="unknown link mode"):
+        sync_files({}, dst, "symlink")
+
+
+def test_derivatives_are_encoded_once(tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    from PIL import Image
+
+    if not images.available_formats():
+        pytest.skip("Pillow cannot encode AVIF or WebP")
+    photos = tmp_path / "images"
+    photos.mkdir()
+    Image.new("RGB", (600, 400), "orange").save(photos / "bowl.jpg")
+    store, cache = tmp_path / "store", BuildCache(tmp_path / "cache", root=tmp_path)
+    encoded = []
+    encode = images._encode
+    monkeypatch.setattr(images, "_encode",
+                        lambda src, targets, options: (encoded.extend(targets), encode(src, targets, options)))
+
+    variants, files = build_derivatives(photos, store, cache)
+    widths = {w for _, fmts in variants["bowl.jpg"].items() for entries in fmts.values() for w, _ in entries}
+    assert widths == {260, 520, 600}  # popup widths are capped at the source width
+    assert len(encoded) == len(files) == len(list(store.iterdir()))
+    assert all(path.exists() for path in files.values())
+
+    encoded.clear()
+    assert build_derivatives(photos, store, cache) == (variants, files)
+    assert encoded == []
+
+    Image.new("RGB", (600, 400), "green").save(photos / "bowl.jpg")
+    build_derivatives(photos, store, cache)
+    assert len(encoded) == len(files) == len(list(store.iterdir()))
+
+
+def test_release_only_re_encodes_avif(tmp_path):
+    pytest.importorskip("PIL")
+    from PIL import Image
+
+    if "avif" not in images.available_formats():
+        pytest.skip("Pillow cannot encode AVIF")
+    photos = tmp_path / "images"
+    photos.mkdir()
+    Image.new("RGB", (300, 200), "orange").save(photos / "bowl.jpg")
+    store, cache = tmp_path / "store", BuildCache(tmp_path / "cache", root=tmp_path)
+    dev = build_derivatives(photos, store, cache)[1]
+    release = build_derivatives(photos, store, cache, release=True)[1]
+    assert dev.keys() == release.keys()
+    changed = {rel.suffix for rel in dev if dev[rel] != release[rel]}
+    assert changed == {".avif"}
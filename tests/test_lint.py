@@ -0,0 +1,87 @@
+import json
+
+import build
+import lint
+from conftest import FOODS, write_csvs
+from lint import FoodNameIndex, Issue, check, lint_files, load_index
+
+MEAL = """# Bowl
+
+Spoon {150g {yogurt}} into a bowl
+with {30g {wallnut}}.
+
+Finish with {20g {spinch}} and {5g {wallnut}}.
+"""
+
+
+def test_suggestions_rank_close_ids_first(data_dir):
+    index = load_index(data_dir / "fooddata.csv")
+    assert "walnut" in index and "wallnut" not in index
+    assert index.suggest("wallnut")[0][0] == "walnut"
+    assert index.suggest("spinch")[0][0] == "spinach"
+    assert index.suggest("Kale")[0] == ("kale", 1.0)  # display names count too
+    assert index.suggest("xyzzy") == []
+    assert len(index.suggest("a", cutoff=0)) <= lint.SUGGESTIONS
+
+
+def test_issue_message():
+    issue = Issue("meals/a.md:3", "wallnut", [("walnut", 0.8), ("oats", 0.31)])
+    assert str(issue) == "meals/a.md:3: unknown ingredient id 'wallnut'; did you mean: walnut (0.80), oats (0.31)"
+    assert str(Issue("a.md:1", "xyzzy", [])) == "a.md:1: unknown ingredient id 'xyzzy'"
+
+
+def test_lint_files_reports_file_and_line(tmp_path, data_dir):
+    meal = tmp_path / "meals" / "monday_morning_1.md"
+    meal.parent.mkdir()
+    meal.write_text(MEAL)
+    issues = lint_files([meal], load_index(data_dir / "fooddata.csv"), tmp_path)
+    assert [(i.location, i.food_id) for i in issues] == [
+        ("meals/monday_morning_1.md:4", "wallnut"),
+        ("meals/monday_morning_1.md:6", "spinch"),
+        ("meals/monday_morning_1.md:6", "wallnut"),
+    ]
+    assert issues[0].suggestions is issues[2].suggestions
+
+
+def test_check_skips_known_ids():
+    index = FoodNameIndex.build(["kale"], ["Kale"])
+    assert check([("a:1", "kale")], index) == []
+
+
+def test_index_is_cached_until_the_csv_changes(data_dir):
+    csv = data_dir / "fooddata.csv"
+    load_index(csv)
+    cached = json.loads(csv.with_suffix(".names.json").read_text())
+    assert cached["ids"] == [fid for fid, *_ in FOODS]
+    write_csvs(data_dir, FOODS + [("lentils", "Legumes", 116, 9, 3.3, 1.5)])
+    assert "lentils" in load_index(csv)
+
+
+def test_main_exit_code(tmp_path, monkeypatch, capsys):
+    write_csvs(tmp_path / "data")
+    (tmp_path / "meals").mkdir()
+    (tmp_path / "meals" / "monday_morning_1.md").write_text(MEAL)
+    monkeypatch.setattr(lint, "ROOT", tmp_path)
+    assert lint.main([]) == 1
+    out = capsys.readouterr()
+    assert out.out.splitlines()[0].startswith("meals/monday_morning_1.md:4: unknown ingredient id 'wallnut'")
+    assert "3 unknown ingredient ids" in out.err
+
+    (tmp_path / "meals" / "monday_morning_1.md").write_text("# Ok\n\n{100g {kale}}\n")
+    assert lint.main([]) == 0
+
+
+def test_build_warns_with_file_and_line(tmp_path, monkeypatch, capsys):
+    write_csvs(tmp_path / "data")
+    (tmp_path / "meals").mkdir()
+    (tmp_path / "meals" / "monday_morning_1.md").write_text(MEAL)
+    for name, path in (("ROOT", tmp_path), ("MEALS_DIR", tmp_path / "meals"), ("DATA_DIR", tmp_path / "data")):
+        monkeypatch.setattr(build, name, path)
+    ingredients = [{"quantity": 150, "foodName": "yogurt"}, {"quantity": 30, "foodName": "wallnut"},
+                   {"quantity": 20, "foodName": "spinch"}, {"quantity": 5, "foodName": "wallnut"}]
+    meal_data = {"monday": {"morning": {"1": {"ingredients": ingredients}}}}
+    assert build.check_ingredients(meal_data) == 3
+    warnings = capsys.readouterr().err.splitlines()
+    assert warnings[0].startswith("WARNING: meals/monday_morning_1.md:4: unknown ingredient id 'wallnut'; "
+                                  "did you mean: walnut")
+    assert [w.split(": ")[1] for w in warnings] == ["meals/monday_morning_1.md:" + n for n in "466"]
@@ -0,0 +1,76 @@
+import gzip
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from buildcache import BuildCache
+from minify import minify_css, minify_js, precompress, remove_stale_compressed
+
+NODE = shutil.which("node")
+
+SCRIPT = r'''
+// line comment with "quotes" and `ticks`
+const url = "http://a.test/x  y // not a comment";  /* block
+   comment */
+const quote = 'it\'s  /* kept */';
+const slashes = /[/]+\/ x/g, half = 10 / 2 / 5;
+function test(x) { return /a b/.test(x) ? 1 : 0; }
+const tpl = `a  ${ {b: "}"}.b + `in ${ 1 + 1 }ner` }  // kept`;
+const sum = x => x + +x - -x;
+print(JSON.stringify([url, quote, "a/x/".replace(slashes, "-"), half, test("a b"), tpl, sum(2)]));
+'''
+
+
+def test_strings_keep_their_text():
+    out = minify_js(SCRIPT)
+    assert '"http://a.test/x  y // not a comment"' in out
+    assert "'it\\'s  /* kept */'" in out
+    assert "line comment" not in out and "block" not in out
+
+
+def test_regex_and_division():
+    out = minify_js(SCRIPT)
+    assert "/[/]+\\/ x/g" in out
+    assert "return /a b/.test(x)" in out
+    assert "half=10 / 2 / 5" in out
+
+
+def test_template_literals_and_their_expressions():
+    out = minify_js(SCRIPT)
+    assert '`a  ${{b:"}"}.b + `in ${ 1 + 1 }ner` }  // kept`' in out
+    assert minify_js("const t = `<li>\n      ${x}\n    </li>`;") == "const t=`<li>\n${x}\n</li>`;"
+
+
+def test_unary_operators_keep_their_spaces():
+    assert "x + +x - -x" in minify_js(SCRIPT)
+
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+def test_minified_script_behaves_the_same():
+    def run(js):
+        wrapped = "const print = console.log;\n" + js
+        return subprocess.run([NODE, "-e", wrapped], check=True, capture_output=True, text=True).stdout
+
+    assert json.loads(run(minify_js(SCRIPT))) == json.loads(run(SCRIPT))
+
+
+def test_minify_css_drops_unused_rules_and_keeps_strings():
+    css = '.used { content: "a  b" } .unused { color: red }\n@media (max-width: 1px) { #gone { x: y } }'
+    out = minify_css(css, {"used"})
+    assert out == '.used{content:"a  b"}'
+
+
+def test_precompress_skips_unchanged_files(tmp_path):
+    page = tmp_path / "index.html"
+    small = tmp_path / "small.js"
+    page.write_text("<p>meal</p>" * 500)
+    small.write_text("x")
+    cache = BuildCache(tmp_path / "cache", root=tmp_path)
+    assert precompress([page, small], cache=cache) == 1
+    assert gzip.decompress((tmp_path / "index.html.gz").read_bytes()) == page.read_bytes()
+    assert not (tmp_path / "small.js.gz").exists()
+    assert precompress([page, small], cache=cache) == 0
+    page.unlink()
+    assert remove_stale_compressed(tmp_path) == 1
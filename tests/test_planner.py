@@ -0,0 +1,73 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import build
+from planner import _objective, budget_warning, slot_options, solve, suggest_plan
+
+
+def brute_force(coverage, calories, budget):
+    best, best_value = None, -1.0
+    for choice in itertools.product(*(range(len(k)) for k in calories)):
+        if sum(k[v] for k, v in zip(calories, choice)) <= budget:
+            value = float(_objective(sum(c[v] for c, v in zip(coverage, choice))))
+            if value > best_value:
+                best, best_value = choice, value
+    return best, best_value
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_solve_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    coverage = [rng.random((3, 4)) * 0.4 for _ in range(4)]
+    calories = [rng.uniform(300, 900, 3) for _ in range(4)]
+    budget = 2400.0
+    choice, feasible = solve(coverage, calories, budget)
+    _, best = brute_force(coverage, calories, budget)
+    assert feasible
+    assert sum(k[v] for k, v in zip(calories, choice)) <= budget
+    assert float(_objective(sum(c[v] for c, v in zip(coverage, choice)))) == pytest.approx(best)
+
+
+def test_solve_returns_the_lightest_week_when_nothing_fits():
+    calories = [np.array([900.0, 800.0]), np.array([700.0, 750.0])]
+    coverage = [np.ones((2, 1)), np.ones((2, 1))]
+    choice, feasible = solve(coverage, calories, 1000.0)
+    assert not feasible
+    assert choice.tolist() == [1, 0]
+
+
+def test_slot_options(foods, drv, scored, meal_data):
+    days, meals = ["monday", "tuesday"], ["morning", "midday", "evening"]
+    slots, versions, coverage, calories = slot_options(meal_data, days, meals, foods, scored, drv)
+    assert slots == [("monday", "morning"), ("monday", "midday")]
+    assert versions == [["1", "2"], ["1", "2"]]
+    totals = foods.totals([[(150, "yogurt"), (30, "walnut"), (40, "oats")]])[0]
+    iron = scored.index("Iron")
+    assert coverage[0][0, iron] == pytest.approx(totals[foods.column("Iron")] / (drv["Iron"] * len(days)))
+    assert calories[0][0] == pytest.approx(totals[foods.column("Energy")])
+
+
+def test_suggest_plan(foods, drv, scored, meal_data):
+    plan = suggest_plan(meal_data, ["monday"], ["morning", "midday"], foods, scored, drv, daily_kcal=5000)
+    # More yogurt in the morning; kale's vitamin C outweighs the cheddar's protein at midday.
+    assert plan["plan"] == {"monday": {"morning": "2", "midday": "2"}}
+    assert plan["feasible"] and plan["budget"] == 5000
+    assert set(plan["nutrients"]) == set(scored)
+    assert 0 < plan["coverage"] <= 100
+
+    tight = suggest_plan(meal_data, ["monday"], ["morning", "midday"], foods, scored, drv, daily_kcal=100)
+    assert not tight["feasible"]
+    assert suggest_plan({}, ["monday"], ["morning"], foods, scored, drv)["plan"] == {}
+
+
+def test_an_over_budget_plan_is_flagged(foods, drv, scored, meal_data):
+    plan = suggest_plan(meal_data, ["monday"], ["morning", "midday"], foods, scored, drv, daily_kcal=100)
+    assert budget_warning(plan) == (f"no week fits the 100 kcal budget; the suggested plan is the "
+                                    f"lightest week ({plan['calories']} kcal)")
+    assert "over budget</button>" in "".join(build.page_shell("", plan))
+
+    plan = suggest_plan(meal_data, ["monday"], ["morning", "midday"], foods, scored, drv, daily_kcal=5000)
+    assert budget_warning(plan) is None
+    assert "over budget" not in "".join(build.page_shell("", plan))
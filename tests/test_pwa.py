@@ -0,0 +1,61 @@
+import json
+import re
+
+import pytest
+
+import build
+
+DENSITIES = (1, 2)
+
+
+def thumbs(stem, widths):
+    return {
+        "thumb": {fmt: [(w, f"images/derived/{stem}.thumb-{w}.{fmt}") for w in widths] for fmt in ("avif", "webp")},
+        "popup": {fmt: [(640, f"images/derived/{stem}.popup-640.{fmt}")] for fmt in ("avif", "webp")},
+    }
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    variants = {"bowl.jpg": thumbs("bowl", (260, 520)), "small.jpg": thumbs("small", (260, 400))}
+    hashes = {url: f"h{i:011d}" for i, url in enumerate(
+        url for entry in variants.values() for formats in entry.values()
+        for widths in formats.values() for _, url in widths
+    )}
+    monkeypatch.setattr(build, "IMAGE_VARIANTS", variants)
+    monkeypatch.setattr(build, "IMAGE_HASHES", hashes)
+    (tmp_path / "images").mkdir()
+    (tmp_path / "index.html").write_text("<!DOCTYPE html>")
+    return tmp_path
+
+
+def browser_picks(picture, density):
+    """What a browser that decodes the first <source>'s type loads, per the srcset rules."""
+    source = re.search(r'<source type="([^"]+)" sizes="(\d+)px" srcset="([^"]+)">', picture)
+    slot = int(source.group(2)) * density
+    candidates = [(int(w[:-1]), url) for url, w in (c.split() for c in source.group(3).split(", "))]
+    covering = [c for c in candidates if c[0] >= slot]
+    return (min(covering) if covering else max(candidates))[1]
+
+
+def test_precache_holds_the_thumbnails_browsers_pick(site):
+    precache = build.write_pwa_assets(site / "images", "v1", dist=site)
+    wanted = set()
+    for name in ("bowl.jpg", "small.jpg"):
+        picture = build.picture_html(f"images/{name}", "thumb", 'alt=""')
+        assert picture.index('type="image/avif"') < picture.index('type="image/webp"')
+        wanted |= {f"./{browser_picks(picture, d)}" for d in DENSITIES}
+    images = {url for url in precache if url.startswith("./images/")}
+    assert images == wanted
+    assert "./images/derived/small.thumb-400.avif?v=" + build.IMAGE_HASHES[
+        "images/derived/small.thumb-400.avif"] in images
+
+    sw = (site / "sw.js").read_text()
+    assert json.loads(sw[len("const PRECACHE_MANIFEST = "):sw.index(";\n")]) == precache
+
+
+def test_images_without_variants_precache_the_originals(site, monkeypatch):
+    monkeypatch.setattr(build, "IMAGE_VARIANTS", {})
+    (site / "images" / "bowl.jpg").write_bytes(b"jpg")
+    precache = build.write_pwa_assets(site / "images", "v1", dist=site)
+    assert [url for url in precache if url.startswith("./images/")] == ["./images/bowl.jpg"]
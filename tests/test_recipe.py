@@ -0,0 +1,32 @@
+from recipe import parse_recipe, recipe_ingredients
+
+RECIPE = """# Yogurt bowl
+<!-- quick:10 -->
+
+![Bowl](images/bowl.jpg)
+
+Spoon {150g {yogurt}} into a bowl.
+<!-- tip: thick yogurt works best -->
+Top with {30g {walnut}}
+and a pinch of salt.
+"""
+
+
+def test_parse_recipe():
+    recipe = parse_recipe(RECIPE)
+    assert recipe["title"] == "Yogurt bowl"
+    assert recipe["meta"] == {"quick": "10"}
+    assert recipe_ingredients(recipe) == [(150.0, "yogurt"), (30.0, "walnut")]
+    assert [i["line"] for i in recipe["ingredients"]] == [6, 8]
+
+
+def test_a_comment_line_breaks_the_paragraph():
+    paragraphs = parse_recipe(RECIPE)["paragraphs"]
+    assert len(paragraphs) == 2
+    assert paragraphs[0][0] == "Spoon "
+    assert paragraphs[1][0] == "Top with "
+
+
+def test_an_inline_comment_does_not():
+    paragraphs = parse_recipe("# T\n\nOne <!-- aside --> two.\n")["paragraphs"]
+    assert len(paragraphs) == 1
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from score import density_label, parse_ingredients, score_meals, score_stream
+
+
+def test_score_is_drv_fractions_per_1000_kcal(foods, drv, scored):
+    result = score_meals(foods, [[(100, "spinach")], [(100, "oats")], []], drv, scored, details=True)
+    spinach = 3 / 50 + 3 / 10 + 30 / 100
+    assert result[0]["score"] == round(spinach / 23 * 1000, 1)
+    assert result[0]["calories"] == 23 and result[0]["label"] == "ultra-dense"
+    assert result[0]["drv"] == {"Protein": 6.0, "Iron": 30.0, "Vitamin C": 30.0}
+    assert result[1]["drv"]["Vitamin C"] == 0
+    assert result[2] == {"score": 0.0, "calories": 0, "ingredientCount": 0, "label": "", "drv": {
+        "Protein": 0.0, "Iron": 0.0, "Vitamin C": 0.0}}
+
+
+def test_density_label():
+    assert [density_label(s) for s in (8, 5, 3, 2.9)] == ["ultra-dense", "dense", "good", ""]
+
+
+def test_parse_ingredients():
+    assert parse_ingredients([[100, "kale"], {"quantity": "20", "foodName": "oats"}]) == [
+        (100.0, "kale"), (20.0, "oats")]
+    assert parse_ingredients({"ingredients": [], "name": "x"}) == []
+
+
+@pytest.mark.parametrize("record", [
+    "12g kale",
+    {"name": "no ingredients"},
+    ["12g kale"],
+    [[12, "kale", "extra"]],
+    [{"quantity": 12}],
+    [[True, "kale"]],
+    [[float("nan"), "kale"]],
+    [[float("inf"), "kale"]],
+    [[-5, "kale"]],
+    [["a lot", "kale"]],
+])
+def test_parse_ingredients_rejects(record):
+    with pytest.raises(ValueError):
+        parse_ingredients(record)
+
+
+def test_score_stream(foods, drv):
+    lines = [
+        json.dumps([[100, "spinach"]]),
+        "",
+        json.dumps({"id": 7, "ingredients": [[100, "kale"], [50, "unobtainium"]]}),
+        "{not json",
+        '[[NaN, "kale"]]',
+        json.dumps([[100, "oats"]]),
+    ]
+    results = list(score_stream(lines, foods, drv, batch_size=2))
+    assert len(results) == 5
+    assert results[0]["ingredientCount"] == 1 and "unknown" not in results[0]
+    assert results[1]["id"] == 7 and results[1]["unknown"] == ["unobtainium"]
+    assert results[1]["score"] == score_meals(foods, [[(100, "kale")]], drv)[0]["score"]
+    assert results[2]["line"] == 4 and "error" in results[2]
+    assert results[3] == {"line": 5, "error": 'bad ingredient [NaN, "kale"]: grams must be a finite number >= 0'}
+    assert results[4]["calories"] == 380
@@ -0,0 +1,53 @@
+import copy
+import json
+
+from shards import SHARD_DIR, write_shards
+
+
+def make_payload(foods, meal_data):
+    payload_foods = {
+        fid: {"displayName": foods.display_name(fid), "category": foods.get(fid)["category"],
+              "nutrients": foods.get(fid)["nutrients"]}
+        for fid in ("yogurt", "walnut", "spinach")
+    }
+    data = copy.deepcopy(meal_data)
+    for slots in data.values():
+        for versions in slots.values():
+            for version, item in versions.items():
+                item.update(contentHtml=f"<p>{version}</p>", swaps=[[]], similar=[])
+    return {"mealData": data, "foods": payload_foods, "nutrientNames": ["Energy", "Protein"]}
+
+
+def test_layout(tmp_path, foods, meal_data):
+    payload = make_payload(foods, meal_data)
+    original = copy.deepcopy(payload)
+    index, urls = write_shards(payload, tmp_path)
+
+    assert payload == original
+    assert set(index["shards"]["recipes"]) == {"monday/morning", "monday/midday"}
+    assert set(index["shards"]["foods"]) == {"Dairy & Eggs", "Nuts & Seeds", "Vegetables"}
+    assert urls == sorted(u for group in index["shards"].values() for u in group.values())
+    for url in urls:
+        kind, name = url.split("/")[1:]
+        assert url.startswith(f"{SHARD_DIR}/") and kind in ("recipes", "foods")
+        assert (tmp_path / url).exists() and len(name.split(".")[1]) == 12
+
+    morning = index["mealData"]["monday"]["morning"]["1"]
+    assert "contentHtml" not in morning and "swaps" not in morning
+    assert morning["ingredients"] == meal_data["monday"]["morning"]["1"]["ingredients"]
+    lazy = json.loads((tmp_path / index["shards"]["recipes"]["monday/morning"]).read_text())
+    assert lazy["2"] == {"contentHtml": "<p>2</p>", "swaps": [[]], "similar": []}
+    assert index["foods"]["walnut"] == {"displayName": "Walnut", "category": "Nuts & Seeds"}
+
+
+def test_names_are_stable_and_stale_shards_removed(tmp_path, foods, meal_data):
+    payload = make_payload(foods, meal_data)
+    _, first = write_shards(payload, tmp_path)
+    assert write_shards(payload, tmp_path)[1] == first
+
+    payload["mealData"]["monday"]["midday"]["1"]["contentHtml"] = "<p>edited</p>"
+    index, second = write_shards(payload, tmp_path)
+    changed = set(first) ^ set(second)
+    assert {url.split("/")[2].split(".")[0] for url in changed} == {"monday-midday"}
+    files = sorted(p.relative_to(tmp_path).as_posix() for p in (tmp_path / SHARD_DIR).rglob("*.json"))
+    assert files == second
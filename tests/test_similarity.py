@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from conftest import MEALS
+from similarity import _unit, meal_vectors, nearest, similarity_index
+
+
+def test_meal_vectors_are_unit_rows(foods, drv, scored):
+    ingredients, profile = meal_vectors(foods, list(MEALS.values()) + [[]], scored, drv)
+    assert ingredients.shape == (5, 6) and profile.shape == (5, 3)
+    np.testing.assert_allclose(np.linalg.norm(ingredients[:4], axis=1), 1, rtol=1e-6)
+    assert not ingredients[4].any() and not profile[4].any()
+
+
+def test_near_duplicates_and_neighbors(foods, drv, scored):
+    index = similarity_index(list(MEALS), list(MEALS.values()), foods, scored, drv, k=2)
+    assert [a for a, b, _ in index["duplicates"]] == ["monday_morning_1"]
+    a, b, pct = index["duplicates"][0]
+    assert b == "monday_morning_2" and 95 <= pct <= 100
+    neighbors = index["neighbors"]
+    assert neighbors["monday_morning_1"][0][0] == "monday_morning_2"
+    assert all(len(row) == 2 for row in neighbors.values())
+    assert all(p1 >= p2 for row in neighbors.values() for (_, p1), (_, p2) in zip(row, row[1:]))
+
+
+def test_threshold(foods, drv, scored):
+    index = similarity_index(list(MEALS), list(MEALS.values()), foods, scored, drv, threshold=1.01)
+    assert index["duplicates"] == []
+
+
+@pytest.mark.parametrize("rows, k", [(1, 3), (3, 5)])
+def test_nearest_with_few_rows(rows, k):
+    idx, sim = nearest(_unit(np.eye(rows, 4, dtype=np.float32)), k)
+    assert idx.shape == (rows, min(k, rows - 1))
+    for r, row in enumerate(idx.tolist()):
+        assert r not in row
+
+
+def test_approximate_search_probing_every_bucket_is_exact():
+    x = _unit(np.random.default_rng(1).random((64, 8)).astype(np.float32))
+    exact_idx, exact_sim = nearest(x, 5, approximate=False)
+    # sqrt(64) = 8 buckets, all probed.
+    idx, sim = nearest(x, 5, approximate=True, probes=8)
+    np.testing.assert_allclose(sim, exact_sim, rtol=1e-6)
+    np.testing.assert_array_equal(idx, exact_idx)
+    assert (np.arange(64)[:, None] != idx).all()
@@ -0,0 +1,79 @@
+import gzip
+import json
+import tracemalloc
+
+import pytest
+
+import build
+from minify import precompress
+from stream import iter_json, write_chunks
+
+PAYLOAD = {
+    "days": ["monday"],
+    "mealData": {"monday": {"morning": {"1": {"title": "Crème brûlée ☃", "ingredients": [
+        {"quantity": 150.5, "foodName": "yogurt"}], "drv": {"Iron": 12.0}}}}},
+    "foods": {"yogurt": {"displayName": "Yogurt </script>", "nutrients": {"Protein": 10}}},
+    "empty": {}, "none": None, "list": [[], [1, [2, {"a": True}]]],
+    "suggestedPlan": {"plan": {"monday": {"morning": "1"}}, "calories": 500, "budget": 2000, "coverage": 12.5},
+}
+
+
+@pytest.mark.parametrize("depth", [0, 1, 2, 4, 10])
+def test_iter_json_matches_json_dumps(depth):
+    assert "".join(iter_json(PAYLOAD, depth)) == json.dumps(PAYLOAD, separators=(",", ":"))
+
+
+def test_iter_json_chunks_are_bounded_by_depth():
+    chunks = list(iter_json({"big": ["x" * 1000] * 10}, depth=2))
+    assert max(map(len, chunks)) < 1100
+
+
+def test_write_chunks(tmp_path):
+    page = tmp_path / "index.html"
+    assert write_chunks(page, iter(["é", "x" * 100_000])) == len("é".encode()) + 100_000
+    assert page.read_text(encoding="utf-8") == "é" + "x" * 100_000
+
+
+def test_a_failed_write_keeps_the_old_file(tmp_path):
+    page = tmp_path / "index.html"
+    page.write_text("old")
+
+    def chunks():
+        yield "new"
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        write_chunks(page, chunks())
+    assert page.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["index.html"]
+
+
+def test_streamed_page_matches_the_in_memory_render(tmp_path):
+    sections = ['<section class="meal-section">', '<div class="meal">Crème</div>', "</section>"]
+    page = tmp_path / "index.html"
+    write_chunks(page, build.iter_page(".a{b:c}", iter(sections), PAYLOAD, "abc123", "run();"))
+
+    # The document as one string, the way the page used to be rendered.
+    head, tail = build.page_shell(".a{b:c}", PAYLOAD["suggestedPlan"])
+    expected = (
+        head + "".join(sections) + tail
+        + '  <script>window.__APP_VERSION__ = "abc123";</script>\n'
+        + "  <script>window.__DATA__ = " + json.dumps(PAYLOAD, separators=(",", ":")) + ";</script>\n"
+        + "  <script>run();</script>\n</body>\n</html>"
+    )
+    assert page.read_bytes() == expected.encode("utf-8")
+    assert "Suggested plan · 12.5% DRV" in expected
+
+
+def test_precompress_streams_large_pages(tmp_path):
+    page = tmp_path / "index.html"
+    write_chunks(page, (f'<div class="meal" data-id="{i}">Meal {i}</div>\n' for i in range(200_000)))
+    assert page.stat().st_size > 8_000_000
+    tracemalloc.start()
+    try:
+        assert precompress([page]) >= 1
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 2_000_000
+    assert gzip.decompress((tmp_path / "index.html.gz").read_bytes()) == page.read_bytes()
@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import MEALS
+from score import score_meal
+from substitutes import rank_swaps
+
+
+def swapped(meal, pos, swap):
+    return [(swap["grams"], swap["food"]) if i == pos else ing for i, ing in enumerate(meal)]
+
+
+def test_scores_match_scoring_the_swapped_meal(foods, drv, scored):
+    meal = MEALS["monday_morning_1"]
+    before = score_meal(foods, meal, drv)["score"]
+    result = rank_swaps(foods, [meal], scored, drv, k=3)[0]
+    assert len(result) == len(meal)
+    for pos, swaps in enumerate(result):
+        assert len(swaps) == 3
+        assert meal[pos][1] not in {s["food"] for s in swaps}
+        assert [s["score"] for s in swaps] == sorted((s["score"] for s in swaps), reverse=True)
+        for swap in swaps:
+            after = score_meal(foods, swapped(meal, pos, swap), drv)["score"]
+            assert swap["score"] == pytest.approx(after, abs=0.1)
+            assert swap["scoreDelta"] == pytest.approx(after - before, abs=0.15)
+            assert swap["grams"] == meal[pos][0]
+
+
+def test_swapping_in_spinach_wins(foods, drv, scored):
+    swaps = rank_swaps(foods, [[(100, "walnut")]], scored, drv, k=1)[0][0]
+    assert [s["food"] for s in swaps] == ["spinach"]
+    assert swaps[0]["scoreDelta"] > 0 and swaps[0]["coverageDelta"] > 0
+
+
+def test_same_category(foods, drv, scored):
+    meal = MEALS["monday_midday_1"]
+    result = rank_swaps(foods, [meal], scored, drv, same_category=True, k=5)[0]
+    assert [s["food"] for s in result[0]] == ["kale"]
+    assert {s["food"] for s in result[1]} == {"yogurt", "skyr"}
+
+
+def test_by_kcal_keeps_the_calories(foods, drv, scored):
+    meal = [(100, "cheddar")]
+    for swap in rank_swaps(foods, [meal], scored, drv, by="kcal", k=3)[0][0]:
+        kcal = swap["grams"] * foods.get(swap["food"])["nutrients"]["Energy"] / 100
+        assert kcal == pytest.approx(400, abs=0.5)
+
+
+def test_ties_are_broken_by_food_order(foods, drv, scored):
+    # yogurt and skyr have identical rows; yogurt comes first in the DB.
+    meal = [(100, "cheddar"), (100, "kale")]
+    for k in (1, 2, 5):
+        swaps = rank_swaps(foods, [meal], scored, drv, same_category=True, k=k)[0][0]
+        assert [s["food"] for s in swaps] == ["yogurt", "skyr"][:k]
+        assert len({(s["score"], s["coverageDelta"]) for s in swaps}) == 1
+
+
+def test_unknown_foods_and_modes(foods, drv, scored):
+    assert rank_swaps(foods, [[(50, "unobtainium"), (0, "kale")], []], scored, drv) == [[[], []], []]
+    with pytest.raises(ValueError, match="unknown swap mode"):
+        rank_swaps(foods, [], scored, drv, by="price")
@@ -0,0 +1,104 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import ROOT
+
+NODE = shutil.which("node")
+pytestmark = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+# Runs install + activate of sw.js for each {scope, manifest} step against one
+# shared in-memory CacheStorage, then prints every cache's keys and the URLs fetched.
+HARNESS = r"""
+const vm = require('vm');
+const [src, steps, existing] = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const stores = new Map();
+const fetched = [];
+function store(name) {
+  if (!stores.has(name)) {
+    const m = new Map();
+    stores.set(name, {
+      m,
+      async keys() { return [...m.keys()].map((url) => ({ url })); },
+      async put(r, res) { m.set(typeof r === 'string' ? r : r.url, res); },
+      async match(r) { return m.get(typeof r === 'string' ? r : r.url); },
+      async delete(r) { return m.delete(typeof r === 'string' ? r : r.url); },
+    });
+  }
+  return stores.get(name);
+}
+const caches = {
+  async open(n) { return store(n); },
+  async keys() { return [...stores.keys()]; },
+  async delete(n) { return stores.delete(n); },
+};
+for (const [name, keys] of Object.entries(existing)) keys.forEach((k) => store(name).m.set(k, {}));
+(async () => {
+  for (const { scope, manifest } of steps) {
+    const listeners = {};
+    const self = {
+      location: new URL(scope + 'sw.js'), registration: { scope },
+      addEventListener: (type, fn) => { listeners[type] = fn; },
+      skipWaiting() {}, clients: { claim: async () => {} },
+    };
+    vm.runInNewContext(`const PRECACHE_MANIFEST = ${JSON.stringify(manifest)};\n${src}`, {
+      self, caches, URL, Map, Set, Promise, Object, Error,
+      fetch: async (url) => { fetched.push(String(url)); return { ok: true, status: 200 }; },
+    });
+    for (const type of ['install', 'activate']) {
+      let done;
+      listeners[type]({ waitUntil: (p) => { done = p; } });
+      await done;
+    }
+  }
+  const out = {};
+  for (const [name, s] of stores) out[name] = [...s.m.keys()].sort();
+  console.log(JSON.stringify({ caches: out, fetched }));
+})();
+"""
+APP = "https://x.test/app/"
+VEG = "https://x.test/app/veg/"
+
+
+def run_sw(steps, existing=None):
+    src = (ROOT / "src" / "pwa" / "sw.js").read_text()
+    stdin = json.dumps([src, steps, existing or {}])
+    out = subprocess.run([NODE, "-e", HARNESS], input=stdin, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def test_install_precaches_the_manifest_under_revisioned_keys():
+    state = run_sw([{"scope": APP, "manifest": {"./index.html": "a1", "./app.js": "b2"}}])
+    assert state["caches"] == {
+        f"mealplanner-precache:{APP}": [f"{APP}app.js?__rev=b2", f"{APP}index.html?__rev=a1"],
+    }
+    assert sorted(state["fetched"]) == [f"{APP}app.js", f"{APP}index.html"]
+
+
+def test_update_only_fetches_changed_files_and_drops_stale_entries():
+    state = run_sw([
+        {"scope": APP, "manifest": {"./index.html": "a1", "./app.js": "b2"}},
+        {"scope": APP, "manifest": {"./index.html": "a2", "./app.js": "b2"}},
+    ])
+    assert state["caches"][f"mealplanner-precache:{APP}"] == [f"{APP}app.js?__rev=b2", f"{APP}index.html?__rev=a2"]
+    assert sorted(state["fetched"]) == [f"{APP}app.js", f"{APP}index.html", f"{APP}index.html"]
+
+def test_activate_keeps_other_scopes_and_foreign_caches():
+    existing = {
+        "mealplanner-59a9ed9": [f"{APP}index.html"],  # unscoped, from an older build
+        f"mealplanner-runtime:{VEG}": [f"{VEG}version.json"],
+        "other-app": [f"{APP}other.js"],
+    }
+    state = run_sw([
+        {"scope": APP, "manifest": {"./index.html": "a1"}},
+        {"scope": VEG, "manifest": {"./index.html": "v1"}},
+        {"scope": APP, "manifest": {"./index.html": "a1"}},
+    ], existing)
+    assert state["caches"] == {
+        f"mealplanner-runtime:{VEG}": [f"{VEG}version.json"],
+        "other-app": [f"{APP}other.js"],
+        f"mealplanner-precache:{APP}": [f"{APP}index.html?__rev=a1"],
+        f"mealplanner-precache:{VEG}": [f"{VEG}index.html?__rev=v1"],
+    }
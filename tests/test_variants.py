@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from conftest import FOODS
+from variants import RESERVED_NAMES, load_variants, select_meals, variant_drv
+
+DAYS = ["monday", "tuesday"]
+SLOTS = ["morning", "midday"]
+
+
+def load(tmp_path, config):
+    path = tmp_path / "variants.json"
+    path.write_text(config if isinstance(config, str) else json.dumps(config))
+    return load_variants(path, DAYS, SLOTS)
+
+
+def test_load_variants(tmp_path):
+    config = {
+        "full": {},
+        "veg": {"exclude": ["Dairy & Eggs"], "days": ["monday"], "meals": ["midday"]},
+        "iron.v2": {"drv": {"Iron": 18}, "kcal": 1800.5},
+    }
+    assert load(tmp_path, config) == config
+
+
+@pytest.mark.parametrize("config, error", [
+    ("{not json", "variants.json: Expecting property name"),
+    ([], "expected an object of {variant name: options}"),
+    ({}, "expected an object of {variant name: options}"),
+    ({"a/b": {}}, "variant name 'a/b' is not a usable directory name"),
+    ({"..": {}}, "variant name '..' is not a usable directory name"),
+    ({"-x": {}}, "variant name '-x' is not a usable directory name"),
+    ({"veg": []}, "variant 'veg' must be an object"),
+    ({"veg": {"diet": "vegan"}}, "unknown option 'diet' (expected one of days, meals, exclude, drv, kcal)"),
+    ({"veg": {"exclude": "Meat & Offal"}}, "'exclude' has the wrong type"),
+    ({"veg": {"kcal": "1800"}}, "'kcal' has the wrong type"),
+    ({"veg": {"days": ["funday"]}}, "unknown days ['funday']"),
+    ({"veg": {"meals": ["evening"]}}, "unknown meals ['evening']"),
+])
+def test_bad_configs_name_the_problem(tmp_path, config, error):
+    with pytest.raises(ValueError) as exc:
+        load(tmp_path, config)
+    assert error in str(exc.value)
+
+
+@pytest.mark.parametrize("name", sorted(RESERVED_NAMES))
+def test_names_the_regular_site_uses_are_reserved(tmp_path, name):
+    with pytest.raises(ValueError, match="not a usable directory name"):
+        load(tmp_path, {name: {}})
+
+
+def test_a_missing_file_is_a_value_error(tmp_path):
+    with pytest.raises(ValueError, match="missing.json"):
+        load_variants(tmp_path / "missing.json", DAYS, SLOTS)
+
+
+def test_select_meals(meal_data):
+    foods = {fid: {"category": category} for fid, category, *_ in FOODS}
+    assert select_meals(meal_data, {}, DAYS, SLOTS, foods) == meal_data
+    no_dairy = select_meals(meal_data, {"exclude": ["Dairy & Eggs"]}, DAYS, SLOTS, foods)
+    assert no_dairy == {"monday": {"midday": {"2": meal_data["monday"]["midday"]["2"]}}}
+    assert no_dairy["monday"]["midday"]["2"] is meal_data["monday"]["midday"]["2"]
+    no_walnut = select_meals(meal_data, {"exclude": ["walnut"]}, DAYS, ["midday"], foods)
+    assert no_walnut == {"monday": {"midday": {"1": meal_data["monday"]["midday"]["1"]}}}
+
+
+def test_variant_drv(drv):
+    meta = {name: {"unit": "mg", "drv": value} for name, value in drv.items()}
+    assert variant_drv(meta, {}) == meta
+    assert variant_drv(meta, {"drv": {"Iron": 18}})["Iron"] == {"unit": "mg", "drv": 18.0}
+    with pytest.raises(ValueError, match=r"unknown nutrients in drv overrides: \['Zinc'\]"):
+        variant_drv(meta, {"drv": {"Zinc": 11}})
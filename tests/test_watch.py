@@ -0,0 +1,129 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import watch
+
+
+class Site:
+    """A source tree and a ``rebuild`` that renders it into ``dist/``."""
+
+    def __init__(self, root):
+        self.src, self.dist = root / "meals", root / "dist"
+        self.src.mkdir()
+        (self.dist / "veg").mkdir(parents=True)
+        (self.src / "a.md").write_text("a")
+        self.builds = 0
+        self.listings = 0
+
+    def rebuild(self):
+        if (self.src / "a.md").read_text() == "fail":
+            raise SystemExit("unknown ingredient ids")
+        self.builds += 1
+        for page in (self.dist / "index.html", self.dist / "veg" / "index.html"):
+            page.write_text(f"<html><body>build {self.builds}</body></html>")
+
+    def watched(self):
+        self.listings += 1
+        return sorted(self.src.glob("*.md"))
+
+
+def run_watch(site, monkeypatch, steps):
+    """Run ``watch`` with a preview server, calling one step per poll."""
+    servers, reloads = [], []
+    connected = threading.Event()
+    serve = watch.serve
+    monkeypatch.setattr(watch, "serve", lambda *args: servers.append(serve(*args)) or servers[-1])
+
+    def listen(url):
+        with urllib.request.urlopen(url, timeout=10) as events:
+            connected.set()
+            for line in events:
+                if line.startswith(b"data: reload"):
+                    reloads.append(line)
+
+    def url(path):
+        return f"http://127.0.0.1:{servers[0].server_address[1]}{path}"
+
+    remaining = iter(steps)
+
+    def poll(_interval):
+        if not connected.is_set():
+            threading.Thread(target=listen, args=(url(watch.RELOAD_PATH),), daemon=True).start()
+            assert connected.wait(10)
+            # The handler reads the generation right after sending its headers.
+            threading.Event().wait(0.05)
+        try:
+            next(remaining)(url, reloads)
+        except StopIteration:
+            raise KeyboardInterrupt from None
+
+    monkeypatch.setattr(watch.time, "sleep", poll)
+    try:
+        watch.watch(site.rebuild, site.watched, site.dist, port=0)
+    finally:
+        servers[0].shutdown()
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode()
+
+
+def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("timed out")
+
+
+def test_rebuilds_on_change_and_reloads_clients(tmp_path, monkeypatch, capsys):
+    site = Site(tmp_path)
+
+    def serves_pages_with_the_reload_snippet(url, reloads):
+        for path in ("/", "/index.html", "/veg/"):
+            page = get(url(path))
+            assert "build 1" in page and watch.RELOAD_SNIPPET in page
+        with pytest.raises(urllib.error.HTTPError, match="404"):
+            get(url("/veg/sw.js"))
+        (site.src / "a.md").write_text("edited")
+
+    def edit_rebuilt(url, reloads):
+        assert site.builds == 2
+        wait_for(lambda: len(reloads) == 1)
+        assert "build 2" in get(url("/veg/index.html"))
+        (site.src / "b.md").write_text("new")
+
+    def new_file_rebuilt(url, reloads):
+        assert site.builds == 3
+        wait_for(lambda: len(reloads) == 2)
+        (site.src / "a.md").write_text("fail")
+
+    def failed_build_keeps_watching(url, reloads):
+        assert site.builds == 3
+        (site.src / "a.md").write_text("fixed")
+
+    def recovered(url, reloads):
+        assert site.builds == 4
+        wait_for(lambda: len(reloads) == 3)
+
+    run_watch(site, monkeypatch, [
+        serves_pages_with_the_reload_snippet, edit_rebuilt, new_file_rebuilt,
+        failed_build_keeps_watching, recovered, lambda url, reloads: None,
+    ])
+    assert "Build failed: unknown ingredient ids" in capsys.readouterr().err
+    # Files are only listed again when their directory changed (b.md added).
+    assert site.listings == 2
+
+
+def test_listing_snapshots_the_directories(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.md").write_text("a")
+    files, dirs = watch.listing(lambda: [tmp_path / "sub" / "a.md"])
+    assert files == [tmp_path / "sub" / "a.md"] and set(dirs) == {tmp_path / "sub"}
+    assert watch.snapshot(dirs) == dirs
+    (tmp_path / "sub" / "b.md").write_text("b")
+    assert watch.snapshot(dirs) != dirs